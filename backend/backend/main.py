@@ -1,251 +1,81 @@
 """
 Main Orchestration Script
-Runs the complete interview analysis pipeline
-(SEQUENTIAL STAGE 0 + PARALLEL 1A/1B/1C + SEQUENTIAL 2/3/4+5)
+Runs the complete interview analysis pipeline as an in-process DAG
+(src/pipeline): every stage starts as soon as its input artifacts exist,
+so 1B overlaps Stage 0 and 4+5 overlaps Stage 3. Stages whose inputs,
+parameters and code are unchanged since a previous run are restored from
+the stage cache (cache/); --force STAGE re-runs one anyway.
+
+Each run writes into its own results/NNN-xxxxxxxx directory with its own
+input workspace, so several runs can execute concurrently; `output` is a
+symlink to the latest successful run (src/pipeline/runs.py)
 """
 
 import sys
-import shutil
-import uuid
 import re
 import argparse
-import subprocess
-import os
-import signal
-import json
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src"))
+from pipeline import runs
+from pipeline.cache import StageCache
+from pipeline.stages import build_pipeline
 
-def run_stage_blocking(cmd, name):
-    print("=" * 80)
-    print(f"[START] {name}")
-    print("=" * 80)
-
-    proc = subprocess.Popen(
-        cmd,
-        preexec_fn=os.setsid,
-    )
-
-    try:
-        proc.wait()
-    finally:
-        try:
-            os.killpg(proc.pid, signal.SIGTERM)
-        except ProcessLookupError:
-            pass
-
-    if proc.returncode != 0:
-        raise RuntimeError(f"{name} failed")
-
-    print(f"\n[COMPLETE] {name}\n")
-
-
-def run_inline_stage(code, name, output_dir):
-    print("=" * 80)
-    print(f"[START] {name}")
-    print("=" * 80)
-
-    env = os.environ.copy()
-    proc = subprocess.Popen(
-        [sys.executable, "-c", code],
-        preexec_fn=os.setsid,
-        env=env,
-    )
-
-    try:
-        proc.wait()
-    finally:
-        try:
-            os.killpg(proc.pid, signal.SIGTERM)
-        except ProcessLookupError:
-            pass
-
-    if proc.returncode != 0:
-        raise RuntimeError(f"{name} failed")
-
-    print(f"\n[COMPLETE] {name}\n")
-
-
-def run_parallel_stages(commands_with_names, output_dir):
-    print("=" * 80)
-    stage_names = [name for _, name in commands_with_names]
-    print(f"[START] PARALLEL: {', '.join(stage_names)}")
-    print("=" * 80)
-
-    procs = []
-    for cmd, name in commands_with_names:
-        proc = subprocess.Popen(
-            cmd,
-            preexec_fn=os.setsid,
-        )
-        procs.append((proc, name))
-        print(f"Launched: {name}")
-
-    print("\nWaiting for all parallel stages to complete...\n")
-
-    for proc, name in procs:
-        try:
-            proc.wait()
-        finally:
-            try:
-                os.killpg(proc.pid, signal.SIGTERM)
-            except ProcessLookupError:
-                pass
-
-        if proc.returncode != 0:
-            raise RuntimeError(f"{name} failed")
-        print(f"Completed: {name}")
-
-    print(f"\n[COMPLETE] PARALLEL: {', '.join(stage_names)}\n")
-
-
-def get_next_run_number(results_dir: Path) -> int:
-    if not results_dir.exists():
-        return 1
-    nums = []
-    for d in results_dir.iterdir():
-        if d.is_dir():
-            try:
-                nums.append(int(d.name.split("-")[0]))
-            except:
-                pass
-    return max(nums) + 1 if nums else 1
-
-
-def backup_output_dir(output_dir: Path, results_dir: Path):
-    run_number = get_next_run_number(results_dir)
-    run_uuid = str(uuid.uuid4())[:8]
-    backup_path = results_dir / f"{run_number:03d}-{run_uuid}"
-
-    if output_dir.exists() and any(output_dir.iterdir()):
-        print(f"Backing up output to: {backup_path}")
-        shutil.copytree(output_dir, backup_path)
-    else:
-        print("Output directory empty, no backup needed")
+STAGE_KEYS = ["0", "1A", "1B", "1A+1B", "1C", "2A", "2B", "3", "4+5", "all"]
 
-    return backup_path
 
-
-def clean_output_dir(output_dir: Path):
-    if output_dir.exists():
-        for item in output_dir.iterdir():
-            if item.is_file():
-                item.unlink()
-            else:
-                shutil.rmtree(item)
-    else:
-        output_dir.mkdir(parents=True)
-
-
-def run_pipeline(video, candidate_audio, interviewer_audio, jd):
+def run_pipeline(video, candidate_audio, interviewer_audio, jd,
+                 transcribe_workers=1, whisper_threads=4,
+                 shared_whisper=False, whisper_batch_size=8, frame_reader="grab",
+                 detect_workers=4, face_tracking=False, detect_width=0,
+                 speech_gated_video=False, silence_sample_interval=0, compact_json=False,
+                 use_cache=True, force=(), run_id=None, vad_levels=None):
     root = Path(__file__).parent
     output = root / "output"
     results = root / "results"
-    temp = root / "temp_input"
-
-    results.mkdir(exist_ok=True)
+    cache = StageCache(root / "cache", root / "src") if use_cache else None
 
     print("=" * 80)
     print("INTERVIEW ANALYSIS PIPELINE")
     print("=" * 80)
 
-    backup_output_dir(output, results)
-    clean_output_dir(output)
-
     match = re.match(r"^(\d+)_", Path(video).name)
     dataset_id = match.group(1) if match else "unknown"
 
-    temp.mkdir(exist_ok=True)
-
-    for f in temp.iterdir():
-        f.unlink()
-
-    (temp / f"{dataset_id}_candidate_video.mp4").symlink_to(Path(video).resolve())
-    (temp / f"{dataset_id}_candidate_audio.wav").symlink_to(Path(candidate_audio).resolve())
-    (temp / f"{dataset_id}_interviewer_audio.wav").symlink_to(Path(interviewer_audio).resolve())
-
-    py = sys.executable
-
-    # ----------------------------
-    # STAGE 0 — TIMEBASE (SEQUENTIAL)
-    # ----------------------------
-    run_stage_blocking(
-        [py, "src/stage0_timebase/timebase.py", str(temp), str(output), dataset_id],
-        "STAGE 0 — TIMEBASE"
-    )
-
-    # ----------------------------
-    # STAGES 1A, 1B, 1C — PARALLEL
-    # ----------------------------
-    output_str = str(output)
-
-    code_1a = f"""
-import sys
-from pathlib import Path
-sys.path.insert(0, 'src')
-from stage1_extraction import candidate_audio
-import json
-with open('{output_str}/timeline.json') as f:
-    timeline = json.load(f)
-candidate_audio.run('{candidate_audio}', '{output_str}', timeline)
-"""
-
-    code_1b = f"""
-import sys
-from pathlib import Path
-sys.path.insert(0, 'src')
-from stage1_extraction import interviewer_audio
-interviewer_audio.run('{interviewer_audio}', '{output_str}')
-"""
-
-    code_1c = f"""
-import sys
-from pathlib import Path
-sys.path.insert(0, 'src')
-from stage1_extraction import candidate_video
-import json
-with open('{output_str}/timeline.json') as f:
-    timeline = json.load(f)
-candidate_video.run('{video}', '{output_str}', timeline)
-"""
-
-    commands_with_names = [
-        ([py, "-c", code_1a], "STAGE 1A — CANDIDATE AUDIO"),
-        ([py, "-c", code_1b], "STAGE 1B — INTERVIEWER AUDIO"),
-        ([py, "-c", code_1c], "STAGE 1C — CANDIDATE VIDEO"),
-    ]
-
-    run_parallel_stages(commands_with_names, output)
-
-    # ----------------------------
-    # STAGE 2 — TEMPORAL GROUPING
-    # ----------------------------
-    run_stage_blocking(
-        [py, "src/stage2_temporal/segmentation.py", str(output)],
-        "STAGE 2 — TEMPORAL GROUPING"
-    )
-
-    # ----------------------------
-    # STAGE 3 — BEHAVIOR METRICS
-    # ----------------------------
-    run_stage_blocking(
-        [py, "src/stage3_behavior/metrics.py", str(output)],
-        "STAGE 3 — BEHAVIOR METRICS"
-    )
-
-    # ----------------------------
-    # STAGE 4+5 — SEMANTIC + VERDICT
-    # ----------------------------
-    run_stage_blocking(
-        [py, "src/stage4+5/4+5.py", str(output), jd],
-        "STAGE 4+5 — SCORING & VERDICT"
-    )
-
-    shutil.rmtree(temp)
+    runs.migrate_output_dir(output, results)
+    run_dir = runs.create_run(results, run_id=run_id, dataset_id=dataset_id)
+    print(f"Run directory: {run_dir}")
+
+    with runs.use_workspace(
+        root / "temp_input", dataset_id, video, candidate_audio, interviewer_audio, cache
+    ) as workspace:
+        pipeline = build_pipeline(
+            workspace, run_dir, dataset_id, video, candidate_audio, interviewer_audio, jd,
+            cache=cache, force=force,
+            audio_options=dict(transcribe_workers=transcribe_workers, whisper_threads=whisper_threads),
+            video_options=dict(
+                reader=frame_reader, workers=detect_workers, tracking=face_tracking,
+                detect_width=detect_width, speech_gating=speech_gated_video,
+                silence_sample_interval=silence_sample_interval
+            ),
+            shared_whisper=shared_whisper,
+            shared_options=dict(batch_size=whisper_batch_size, cpu_threads=whisper_threads),
+            json_frames=not compact_json,
+            vad_levels=vad_levels
+        )
+        try:
+            timings = pipeline.run()
+        except BaseException:
+            runs.finish_run(results, run_dir, output, success=False)
+            raise
+        runs.finish_run(results, run_dir, output, success=True)
 
     print("=" * 80)
     print("PIPELINE COMPLETE")
     print("=" * 80)
+    for name, seconds in timings.items():
+        status = "cached" if name in pipeline.cached else ""
+        print(f"  {name:<40} {seconds:8.1f}s {status}")
 
 
 def main():
@@ -254,13 +84,59 @@ def main():
     parser.add_argument("--candidate-audio", required=True)
     parser.add_argument("--interviewer-audio", required=True)
     parser.add_argument("--jd", required=True)
+    parser.add_argument("--transcribe-workers", type=int, default=1,
+                        help="Whisper process-pool size per channel (1 = single stream)")
+    parser.add_argument("--whisper-threads", type=int, default=4,
+                        help="CTranslate2 threads per Whisper worker")
+    parser.add_argument("--shared-whisper", action="store_true",
+                        help="Run 1A and 1B in one process on a single batched Whisper model")
+    parser.add_argument("--whisper-batch-size", type=int, default=8,
+                        help="Batch size for --shared-whisper")
+    parser.add_argument("--vad-levels", type=int, nargs="+", choices=range(4), metavar="LEVEL",
+                        help="Stage 1A: also record candidate VAD segments at these webrtcvad "
+                             "aggressiveness levels (0-3, one pass; vad_segments_by_level)")
+    parser.add_argument("--frame-reader", choices=["grab", "av"], default="grab",
+                        help="Stage 1C sampled-frame reader (OpenCV grab() or PyAV)")
+    parser.add_argument("--detect-workers", type=int, default=4,
+                        help="Stage 1C face-detector threads")
+    parser.add_argument("--face-tracking", action="store_true",
+                        help="Stage 1C ROI tracking + motion gating (single detector thread)")
+    parser.add_argument("--detect-width", type=int, default=0,
+                        help="Stage 1C face-detection working width in px (0 = source resolution)")
+    parser.add_argument("--speech-gated-video", action="store_true",
+                        help="Stage 1C: detect faces only inside candidate speaking intervals")
+    parser.add_argument("--silence-sample-interval", type=int, default=0,
+                        help="With --speech-gated-video, sample every Nth frame outside speech (0 = none)")
+    parser.add_argument("--compact-json", action="store_true",
+                        help="Keep Stage 1 per-frame data only in the .npz columns, not in the JSON")
+    parser.add_argument("--force", action="append", default=[], choices=STAGE_KEYS, metavar="STAGE",
+                        help=f"Re-run STAGE even if cached (repeatable; one of {', '.join(STAGE_KEYS)})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Neither read nor write the stage cache")
+    parser.add_argument("--run-id",
+                        help="Suffix for the results/NNN-<run-id> directory (default: random)")
     args = parser.parse_args()
 
     run_pipeline(
         args.video,
         args.candidate_audio,
         args.interviewer_audio,
-        args.jd
+        args.jd,
+        transcribe_workers=args.transcribe_workers,
+        whisper_threads=args.whisper_threads,
+        shared_whisper=args.shared_whisper,
+        whisper_batch_size=args.whisper_batch_size,
+        frame_reader=args.frame_reader,
+        detect_workers=args.detect_workers,
+        face_tracking=args.face_tracking,
+        detect_width=args.detect_width,
+        speech_gated_video=args.speech_gated_video,
+        silence_sample_interval=args.silence_sample_interval,
+        compact_json=args.compact_json,
+        use_cache=not args.no_cache,
+        force=args.force,
+        run_id=args.run_id,
+        vad_levels=args.vad_levels
     )
 
 
@@ -0,0 +1 @@
+# LLM Service: Shared Scoring Model
@@ -0,0 +1,90 @@
+"""
+LLM Service: Client
+What Stages 4 and 5 call. Talks to the model server when one is running
+(LLM_SERVICE_URL, default http://127.0.0.1:8765); otherwise loads the model
+in this process on the first request, so the stages still work stand-alone.
+"""
+import json
+import os
+import urllib.error
+import urllib.request
+from llm_service import model
+from llm_service.server import DEFAULT_HOST, DEFAULT_PORT
+
+SERVICE_URL = os.environ.get("LLM_SERVICE_URL", f"http://{DEFAULT_HOST}:{DEFAULT_PORT}")
+HEALTH_TIMEOUT_SEC = 1.0
+REQUEST_TIMEOUT_SEC = 600.0
+
+class LLMClient:
+    def __init__(self, url: str = SERVICE_URL):
+        self.url = url.rstrip("/")
+        self.remote = self._server_up()
+        where = f"model server at {self.url}" if self.remote else "in-process model (no server running)"
+        print(f"LLM client: using {where}", flush=True)
+
+    def _server_up(self) -> bool:
+        try:
+            with urllib.request.urlopen(f"{self.url}/health", timeout=HEALTH_TIMEOUT_SEC) as r:
+                return json.load(r).get("status") == "ok"
+        except (OSError, ValueError):
+            return False
+
+    def _post(self, path: str, payload: dict) -> dict:
+        request = urllib.request.Request(
+            f"{self.url}{path}",
+            data=json.dumps(payload).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_SEC) as r:
+                return json.load(r)
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"LLM service {path} failed: {e.read().decode(errors='replace')}") from e
+
+    def count_tokens(self, text: str) -> int:
+        if self.remote:
+            return self._post("/count_tokens", {"text": text})["tokens"]
+        return model.count_tokens(text)
+
+    def truncate_tail(self, text: str, max_tokens: int) -> str:
+        if self.remote:
+            return self._post("/truncate", {"text": text, "max_tokens": max_tokens})["text"]
+        return model.truncate_tail(text, max_tokens)
+
+    def generate(self, prompt: str, max_new_tokens: int, prefix: str = None) -> str:
+        """`prefix`: invariant start of `prompt` whose KV cache is reused (see model.generate)."""
+        if self.remote:
+            return self._post("/generate", {
+                "prompt": prompt, "max_new_tokens": max_new_tokens, "prefix": prefix
+            })["text"]
+        return model.generate(prompt, max_new_tokens, prefix)
+
+    def generate_batch(self, prompts: list, max_new_tokens: int) -> list:
+        if self.remote:
+            return self._post("/generate_batch", {"prompts": prompts, "max_new_tokens": max_new_tokens})["texts"]
+        return model.generate_batch(prompts, max_new_tokens)
+
+    def iter_generate(self, prompts: list, lengths: list, max_new_tokens: int,
+                      max_batch_size: int = model.MAX_BATCH_SIZE,
+                      token_budget: int = model.TOKEN_BUDGET):
+        """
+        Generate for many prompts in length-grouped micro-batches (see
+        model.plan_batches); yields (index, text) as each micro-batch finishes.
+        `lengths` are the prompts' token counts.
+        """
+        for batch in model.plan_batches(lengths, max_new_tokens, max_batch_size, token_budget):
+            texts = self.generate_batch([prompts[i] for i in batch], max_new_tokens)
+            yield from zip(batch, texts)
+
+    def release(self):
+        """Free GPU memory held by an in-process model (no-op against a server)."""
+        if not self.remote and model.is_loaded():
+            model.clear_gpu_memory()
+
+_client = None
+
+def get_client() -> LLMClient:
+    global _client
+    if _client is None:
+        _client = LLMClient()
+    return _client
@@ -0,0 +1,260 @@
+"""
+LLM Service: Local Model
+Qwen2.5-3B-Instruct (4-bit NF4 by default), loaded on first use instead of
+at import time. Used in-process by the model server, and by the client as
+a fallback when no server is running.
+
+Prompts that share an invariant prefix (instructions + job description)
+can pass it as `prefix`: its KV cache is prefilled once and kept on the
+GPU, each generate() call extends it and then crops it back, so prefill
+only covers the per-question part. The cache is LRU, bounded by entries
+(PREFIX_CACHE_SIZE: one per prompt family of a run - relevance, answer
+assessment, final verdict) and by total tokens (PREFIX_CACHE_MAX_TOKENS;
+~36KB of fp16 KV per token on this model). Both can be set through
+LLM_PREFIX_CACHE_SIZE / LLM_PREFIX_CACHE_TOKENS.
+"""
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MODEL_ID = "Qwen/Qwen2.5-3B-Instruct"
+MAX_CONTEXT_TOKENS = 8192
+MAX_BATCH_SIZE = 8
+TOKEN_BUDGET = 16384        # per micro-batch: rows x (longest prompt + max_new_tokens)
+SORT_WINDOW_BATCHES = 4     # length-sort within windows of this many batches, so output can stream
+# Prefilled prompt prefixes kept (LRU); a prefix longer than the context is never cached
+PREFIX_CACHE_SIZE = int(os.environ.get("LLM_PREFIX_CACHE_SIZE", 3))
+# Total prefix tokens kept: two full-context prefixes (~600MB of KV)
+PREFIX_CACHE_MAX_TOKENS = int(os.environ.get("LLM_PREFIX_CACHE_TOKENS", 2 * MAX_CONTEXT_TOKENS))
+
+_tokenizer = None
+_model = None
+_load_lock = threading.Lock()
+_generate_lock = threading.Lock()   # one generate() at a time on the GPU
+_prefix_cache = OrderedDict()       # templated prefix text -> (input_ids, KV cache); under _generate_lock
+
+def clear_gpu_memory():
+    """Release cached CUDA memory and report usage."""
+    import torch
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+        torch.cuda.ipc_collect()
+        total_mem = torch.cuda.get_device_properties(0).total_memory / 1024**3
+        allocated = torch.cuda.memory_allocated(0) / 1024**3
+        reserved = torch.cuda.memory_reserved(0) / 1024**3
+        print(f"GPU Memory - Total: {total_mem:.2f}GB, Allocated: {allocated:.2f}GB, Reserved: {reserved:.2f}GB", flush=True)
+
+def get_tokenizer():
+    global _tokenizer
+    with _load_lock:
+        if _tokenizer is None:
+            from transformers import AutoTokenizer
+            print("Loading tokenizer...", flush=True)
+            _tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, trust_remote_code=True)
+            _tokenizer.model_max_length = MAX_CONTEXT_TOKENS
+            # Decoder-only batching: pad on the left so every row ends at the generation point
+            _tokenizer.padding_side = "left"
+            if _tokenizer.pad_token is None:
+                _tokenizer.pad_token = _tokenizer.eos_token
+        return _tokenizer
+
+def get_model(quantize: bool = True):
+    """
+    Return the process-wide model, loading it on first use.
+    `quantize` (4-bit NF4, ~2-3GB VRAM) only applies to that first load.
+    """
+    global _model
+    get_tokenizer()
+    with _load_lock:
+        if _model is None:
+            import torch
+            from transformers import AutoModelForCausalLM, BitsAndBytesConfig
+            clear_gpu_memory()
+            start = time.time()
+            if quantize:
+                print("Loading model (4-bit quantized with memory optimization)...", flush=True)
+                _model = AutoModelForCausalLM.from_pretrained(
+                    MODEL_ID,
+                    quantization_config=BitsAndBytesConfig(
+                        load_in_4bit=True,
+                        bnb_4bit_compute_dtype=torch.float16,
+                        bnb_4bit_use_double_quant=True,
+                        bnb_4bit_quant_type="nf4"
+                    ),
+                    device_map="auto",
+                    torch_dtype=torch.float16,
+                    low_cpu_mem_usage=True,
+                    max_memory={0: "3.0GB", "cpu": "12GB"}
+                )
+            else:
+                print("Loading model (float16)...", flush=True)
+                _model = AutoModelForCausalLM.from_pretrained(
+                    MODEL_ID,
+                    device_map="auto",
+                    torch_dtype=torch.float16
+                )
+            print(f"Model ready in {time.time() - start:.1f}s", flush=True)
+            if torch.cuda.is_available():
+                allocated = torch.cuda.memory_allocated(0) / 1024**3
+                reserved = torch.cuda.memory_reserved(0) / 1024**3
+                print(f"After loading - Allocated: {allocated:.2f}GB, Reserved: {reserved:.2f}GB", flush=True)
+        return _model
+
+def is_loaded() -> bool:
+    return _model is not None
+
+def count_tokens(text: str) -> int:
+    return len(get_tokenizer().encode(text, add_special_tokens=False))
+
+def truncate_tail(text: str, max_tokens: int) -> str:
+    """Keep the LAST max_tokens of text (tail-preserving truncation)."""
+    tokenizer = get_tokenizer()
+    ids = tokenizer.encode(text, add_special_tokens=False)
+    if len(ids) <= max_tokens:
+        return text
+    return tokenizer.decode(ids[-max_tokens:], skip_special_tokens=True)
+
+def _evict_prefixes(keep_tokens: int):
+    """Make room for one more prefix: LRU-evict down to `keep_tokens` cached tokens."""
+    cached = sum(ids.shape[1] for ids, _ in _prefix_cache.values())
+    evicted = False
+    while _prefix_cache and (cached > keep_tokens or len(_prefix_cache) >= PREFIX_CACHE_SIZE):
+        _, (ids, _) = _prefix_cache.popitem(last=False)
+        cached -= ids.shape[1]
+        evicted = True
+    if evicted:
+        import torch
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+def _prefix_kv(chat_prefix: str):
+    """
+    (input_ids, KV cache) for a templated prompt prefix, prefilled on first
+    use; None when the prefix alone exceeds the context or PREFIX_CACHE_MAX_TOKENS.
+    """
+    import torch
+    from transformers import DynamicCache
+    entry = _prefix_cache.get(chat_prefix)
+    if entry is not None:
+        _prefix_cache.move_to_end(chat_prefix)
+        return entry
+    
+    tokenizer = get_tokenizer()
+    model = get_model()
+    ids = tokenizer(chat_prefix, return_tensors="pt")["input_ids"].to(model.device)
+    n = ids.shape[1]
+    limit = min(MAX_CONTEXT_TOKENS, PREFIX_CACHE_MAX_TOKENS)
+    if n > limit:
+        print(f"Prefix cache: {n} prefix tokens exceed {limit}, not cached", flush=True)
+        return None
+    _evict_prefixes(PREFIX_CACHE_MAX_TOKENS - n)
+    
+    start = time.time()
+    cache = DynamicCache()
+    with torch.no_grad():
+        model(input_ids=ids, past_key_values=cache, use_cache=True)
+    print(f"Prefix cache: prefilled {n} tokens in {time.time() - start:.2f}s", flush=True)
+    
+    _prefix_cache[chat_prefix] = (ids, cache)
+    return ids, cache
+
+def generate(prompt: str, max_new_tokens: int, prefix: str = None) -> str:
+    """
+    Greedy completion of a single user message; returns only the generated text.
+    If `prompt` starts with `prefix`, the prefix's cached KV is reused and only
+    the remaining tokens are prefilled (falls back to a full prefill when the
+    tokenisation does not split cleanly at the prefix boundary).
+    """
+    import torch
+    tokenizer = get_tokenizer()
+    model = get_model()
+    chat = tokenizer.apply_chat_template(
+        [{"role": "user", "content": prompt}],
+        tokenize=False,
+        add_generation_prompt=True
+    )
+    with _generate_lock:
+        inputs = tokenizer(chat, return_tensors="pt").to(model.device)
+        prompt_len = inputs["input_ids"].shape[1]
+        
+        past = None
+        cut = chat.find(prefix) if prefix and prompt.startswith(prefix) else -1
+        entry = _prefix_kv(chat[:cut + len(prefix)]) if cut >= 0 else None
+        if entry is not None:
+            prefix_ids, cache = entry
+            n = prefix_ids.shape[1]
+            if n < prompt_len and torch.equal(inputs["input_ids"][0, :n], prefix_ids[0]):
+                past = cache
+            else:
+                print("Prefix cache: token boundary mismatch, full prefill", flush=True)
+        
+        try:
+            with torch.no_grad():
+                outputs = model.generate(
+                    **inputs,
+                    past_key_values=past,
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id
+                )
+        finally:
+            if past is not None:
+                # generate() extended the shared cache in place; back to just the prefix
+                past.crop(n)
+        del inputs, past
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    return tokenizer.decode(outputs[0][prompt_len:], skip_special_tokens=True).strip()
+
+def plan_batches(lengths: list, max_new_tokens: int, max_batch_size: int = MAX_BATCH_SIZE,
+                 token_budget: int = TOKEN_BUDGET) -> list:
+    """
+    Group prompt indices into micro-batches of similar length (less padding),
+    each within `max_batch_size` rows and `token_budget` padded tokens.
+    Prompts are length-sorted only inside windows of consecutive indices, so
+    early questions finish early and results can be written in order.
+    """
+    batches = []
+    window = max(1, max_batch_size * SORT_WINDOW_BATCHES)
+    for w in range(0, len(lengths), window):
+        order = sorted(range(w, min(w + window, len(lengths))), key=lambda i: -lengths[i])
+        batch = []
+        for i in order:
+            # Longest first, so batch[0] sets the padded width
+            width = (lengths[batch[0]] if batch else lengths[i]) + max_new_tokens
+            if batch and (len(batch) >= max_batch_size or (len(batch) + 1) * width > token_budget):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+    return batches
+
+def generate_batch(prompts: list, max_new_tokens: int) -> list:
+    """Greedy completion of several user messages in one left-padded generate() call."""
+    import torch
+    tokenizer = get_tokenizer()
+    model = get_model()
+    chats = [
+        tokenizer.apply_chat_template(
+            [{"role": "user", "content": p}], tokenize=False, add_generation_prompt=True
+        )
+        for p in prompts
+    ]
+    with _generate_lock:
+        inputs = tokenizer(chats, return_tensors="pt", padding=True).to(model.device)
+        prompt_len = inputs["input_ids"].shape[1]
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=tokenizer.pad_token_id
+            )
+        del inputs
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    return [t.strip() for t in tokenizer.batch_decode(outputs[:, prompt_len:], skip_special_tokens=True)]
@@ -0,0 +1,99 @@
+"""
+LLM Service: Model Server
+Keeps the scoring model resident in one long-lived process and serves
+Stage 4/5 requests over localhost HTTP (JSON in, JSON out):
+
+    GET  /health                              -> {"status", "model", "loaded"}
+    POST /count_tokens {"text"}               -> {"tokens"}
+    POST /truncate     {"text", "max_tokens"} -> {"text"}
+    POST /generate     {"prompt", "max_new_tokens", "prefix"?} -> {"text", "elapsed_sec"}
+    POST /generate_batch {"prompts", "max_new_tokens"} -> {"texts", "elapsed_sec"}
+
+Start once per machine, then run the pipeline as usual:
+    python -m llm_service.server [--host 127.0.0.1] [--port 8765] [--no-quantize]
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from llm_service import model
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+def _count_tokens(body: dict) -> dict:
+    return {"tokens": model.count_tokens(body["text"])}
+
+def _truncate(body: dict) -> dict:
+    return {"text": model.truncate_tail(body["text"], int(body["max_tokens"]))}
+
+def _generate(body: dict) -> dict:
+    start = time.time()
+    text = model.generate(body["prompt"], int(body.get("max_new_tokens", 500)), body.get("prefix"))
+    return {"text": text, "elapsed_sec": round(time.time() - start, 3)}
+
+def _generate_batch(body: dict) -> dict:
+    start = time.time()
+    texts = model.generate_batch(list(body["prompts"]), int(body.get("max_new_tokens", 500)))
+    return {"texts": texts, "elapsed_sec": round(time.time() - start, 3)}
+
+ROUTES = {
+    "/count_tokens": _count_tokens,
+    "/truncate": _truncate,
+    "/generate": _generate,
+    "/generate_batch": _generate_batch
+}
+
+class Handler(BaseHTTPRequestHandler):
+    def _reply(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._reply(404, {"error": f"Unknown path: {self.path}"})
+            return
+        self._reply(200, {"status": "ok", "model": model.MODEL_ID, "loaded": model.is_loaded()})
+
+    def do_POST(self):
+        route = ROUTES.get(self.path)
+        if route is None:
+            self._reply(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            self._reply(200, route(body))
+        except (KeyError, ValueError) as e:
+            self._reply(400, {"error": f"Bad request: {e}"})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+
+    def log_message(self, fmt, *args):
+        pass    # one line per request is noise next to the model's own output
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, quantize: bool = True):
+    model.get_model(quantize=quantize)     # load up front; requests never pay for it
+    # Prefilled JD prefixes (one per prompt family) stay resident too, so repeat runs
+    # against the same JD skip their prefill; see model.PREFIX_CACHE_SIZE
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"LLM service listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--no-quantize", action="store_true",
+                        help="Load float16 weights instead of 4-bit NF4")
+    args = parser.parse_args()
+    serve(args.host, args.port, quantize=not args.no_quantize)
@@ -0,0 +1 @@
+# Pipeline: DAG Scheduler Module
@@ -0,0 +1,179 @@
+"""
+Pipeline: Content-addressed Stage Cache
+A stage's fingerprint is a hash of everything its outputs depend on:
+
+- the content of its input artifacts (upstream outputs) and source files
+  (media, JD); never their paths
+- its parameters (Stage.params)
+- its code: the stage function plus the source packages it declares
+
+After a stage runs, read-only copies of its outputs are stored under
+<cache_dir>/<stage key>/<fingerprint>/ with their digests in manifest.json.
+A later run whose fingerprint matches restores them (hardlinks, copy
+fallback) instead of re-running; an entry whose files no longer match
+their digests (written through a hardlink) counts as a miss and is dropped.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+
+CHUNK_SIZE = 1 << 20
+KEEP_PER_STAGE = 5          # cached entries kept per stage (oldest pruned)
+DIGESTS_FILE = "file_digests.json"
+MANIFEST_FILE = "manifest.json"
+READ_ONLY = 0o444
+
+def _slug(key: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in key)
+
+def _place(src: Path, dst: Path):
+    """Hardlink src to dst (same filesystem), else copy."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+class StageCache:
+    def __init__(self, cache_dir, src_dir):
+        self.cache_dir = Path(cache_dir)
+        self.src_dir = Path(src_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._code_digests = {}
+        # Media hashes survive across runs, keyed by (path, inode, size, mtime)
+        self._digests_path = self.cache_dir / DIGESTS_FILE
+        try:
+            with open(self._digests_path) as f:
+                self._source_digests = json.load(f)
+        except (OSError, ValueError):
+            self._source_digests = {}
+
+    # ----------------------------
+    # Hashing
+    # ----------------------------
+    @staticmethod
+    def file_digest(path) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            while chunk := f.read(CHUNK_SIZE):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def source_digest(self, path) -> str:
+        path = Path(path).resolve()
+        st = path.stat()
+        memo_key = f"{path}|{st.st_ino}|{st.st_size}|{st.st_mtime_ns}"
+        digest = self._source_digests.get(memo_key)
+        if digest is None:
+            digest = self.file_digest(path)
+            self._source_digests[memo_key] = digest
+            tmp = self._digests_path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(self._source_digests, f)
+            os.replace(tmp, self._digests_path)
+        return digest
+
+    def code_digest(self, stage) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        h.update(inspect.getsource(stage.fn).encode())
+        for rel in stage.code:
+            if rel not in self._code_digests:
+                root = self.src_dir / rel
+                files = sorted(root.rglob("*.py")) if root.is_dir() else [root]
+                part = hashlib.blake2b(digest_size=20)
+                for file in files:
+                    part.update(str(file.relative_to(self.src_dir)).encode())
+                    part.update(file.read_bytes())
+                self._code_digests[rel] = part.hexdigest()
+            h.update(self._code_digests[rel].encode())
+        return h.hexdigest()
+
+    def fingerprint(self, stage, output_dir) -> str:
+        output_dir = Path(output_dir)
+        record = {
+            "stage": stage.key,
+            "code": self.code_digest(stage),
+            "params": stage.params,
+            "inputs": {a: self.file_digest(output_dir / a) for a in stage.inputs},
+            "sources": [self.source_digest(p) for p in stage.sources]
+        }
+        blob = json.dumps(record, sort_keys=True, default=str).encode()
+        return hashlib.blake2b(blob, digest_size=20).hexdigest()
+
+    # ----------------------------
+    # Entries
+    # ----------------------------
+    def _entry(self, stage, fingerprint: str) -> Path:
+        return self.cache_dir / _slug(stage.key) / fingerprint
+
+    def restore(self, stage, fingerprint: str, output_dir) -> bool:
+        """Place cached outputs into output_dir; False on a miss."""
+        entry = self._entry(stage, fingerprint)
+        if not all((entry / a).exists() for a in stage.outputs):
+            return False
+        try:
+            with open(entry / MANIFEST_FILE) as f:
+                digests = json.load(f).get("digests", {})
+        except (OSError, ValueError):
+            digests = {}
+        if any(digests.get(a) != self.file_digest(entry / a) for a in stage.outputs):
+            print(f"  Cache entry for {stage.name} was modified; dropping it")
+            stale = entry.parent / f".{fingerprint}.{uuid.uuid4().hex[:8]}.stale"
+            try:
+                entry.rename(stale)
+            except OSError:
+                pass            # another run dropped it first
+            shutil.rmtree(stale, ignore_errors=True)
+            return False
+        for artifact in stage.outputs:
+            target = Path(output_dir) / artifact
+            if target.exists():
+                target.unlink()
+            _place(entry / artifact, target)
+        os.utime(entry)         # recently used; see _prune
+        return True
+
+    def store(self, stage, fingerprint: str, output_dir, replace: bool = False):
+        """Save the stage's outputs; `replace` overwrites an existing entry (--force)."""
+        entry = self._entry(stage, fingerprint)
+        if entry.exists():
+            if not replace:
+                return
+            stale = entry.parent / f".{fingerprint}.{uuid.uuid4().hex[:8]}.stale"
+            entry.rename(stale)
+            shutil.rmtree(stale, ignore_errors=True)
+        tmp = entry.parent / f".{fingerprint}.{uuid.uuid4().hex[:8]}"
+        tmp.mkdir(parents=True)
+        digests = {}
+        for artifact in stage.outputs:
+            # A copy, not a link: later writes to the run's file must not reach the entry
+            digests[artifact] = self.file_digest(Path(output_dir) / artifact)
+            shutil.copyfile(Path(output_dir) / artifact, tmp / artifact)
+            os.chmod(tmp / artifact, READ_ONLY)
+        with open(tmp / MANIFEST_FILE, "w") as f:
+            json.dump({
+                "stage": stage.name,
+                "fingerprint": fingerprint,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "params": stage.params,
+                "outputs": list(stage.outputs),
+                "digests": digests
+            }, f, indent=2, default=str)
+        try:
+            tmp.rename(entry)
+        except OSError:
+            # Another run stored the same fingerprint first
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._prune(entry.parent)
+
+    def _prune(self, stage_dir: Path):
+        entries = sorted(
+            (d for d in stage_dir.iterdir() if d.is_dir() and not d.name.startswith(".")),
+            key=lambda d: d.stat().st_mtime
+        )
+        for old in entries[:-KEEP_PER_STAGE]:
+            shutil.rmtree(old, ignore_errors=True)
@@ -0,0 +1,164 @@
+"""
+Pipeline: In-process DAG Scheduler
+Stages are nodes that declare the artifacts (file names in the output
+directory) they read and write. A stage starts as soon as every input
+artifact exists, so independent branches overlap instead of running in
+a fixed serial order.
+
+- executor="thread":  runs in this process (light NumPy/JSON stages; no
+  re-import of heavy libraries)
+- executor="process": runs in a spawned worker (GIL-bound or model-heavy
+  stages); each worker serves one stage so its memory is returned on exit
+
+With a StageCache, a stage whose fingerprint (input content, params, code)
+matches a previous run restores its outputs instead of running.
+"""
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+EXECUTORS = ("thread", "process")
+
+class Stage:
+    """
+    One pipeline node: fn(*args, **kwargs) reads `inputs` and writes `outputs`.
+    For caching, positional args are paths (not fingerprinted); `kwargs` are
+    the parameters, `sources` the external files it reads and `code` the
+    source paths (relative to src/) its behaviour depends on.
+    """
+
+    def __init__(self, name: str, fn, args=(), kwargs=None, inputs=(), outputs=(),
+                 executor: str = "thread", key: str = None, sources=(), code=()):
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown executor: {executor} (expected one of {EXECUTORS})")
+        self.name = name
+        self.key = key or name
+        self.fn = fn
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.executor = executor
+        self.sources = tuple(str(p) for p in sources)
+        self.code = tuple(code)
+
+    @property
+    def params(self) -> dict:
+        return self.kwargs
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+class Pipeline:
+    """A set of stages over one output directory."""
+
+    def __init__(self, output_dir, cache=None, force=()):
+        self.output_dir = Path(output_dir)
+        self.stages = []
+        self.timings = {}
+        self.cache = cache
+        self.force = set(force)     # stage keys to re-run regardless of cache ("all" for every stage)
+        self.cached = []
+
+    def add(self, stage: Stage) -> Stage:
+        if any(s.name == stage.name or s.key == stage.key for s in self.stages):
+            raise ValueError(f"Duplicate stage: {stage.name}")
+        self.stages.append(stage)
+        return stage
+
+    def validate(self, provided=()):
+        """Every input must be provided up front or produced by exactly one stage."""
+        producers = {}
+        for stage in self.stages:
+            for artifact in stage.outputs:
+                if artifact in producers:
+                    raise ValueError(
+                        f"Artifact {artifact} produced by both {producers[artifact]} and {stage.name}"
+                    )
+                producers[artifact] = stage.name
+        for stage in self.stages:
+            missing = [a for a in stage.inputs if a not in producers and a not in provided]
+            if missing:
+                raise ValueError(f"{stage.name}: no stage produces {missing}")
+        unknown = self.force - {s.key for s in self.stages} - {"all"}
+        if unknown:
+            raise ValueError(f"--force: unknown stage(s) {sorted(unknown)}")
+
+    def _use_cache(self, stage) -> bool:
+        return self.cache is not None and not ({stage.key, "all"} & self.force)
+
+    def run(self, max_threads: int = 4, max_processes: int = 3, provided=()) -> dict:
+        """Run every stage once its inputs are ready. Returns {stage: seconds}."""
+        self.validate(provided)
+        available = set(provided)
+        pending = list(self.stages)
+        running = {}
+        started = {}
+        fingerprints = {}
+        pipeline_start = time.perf_counter()
+
+        threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="stage")
+        processes = ProcessPoolExecutor(
+            max_workers=max_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=1
+        )
+        try:
+            while pending or running:
+                # Restored stages can make further stages ready straight away
+                while ready := [s for s in pending if all(a in available for a in s.inputs)]:
+                    for stage in ready:
+                        pending.remove(stage)
+                        if self.cache is not None:
+                            fingerprints[stage.name] = self.cache.fingerprint(stage, self.output_dir)
+                            if self._use_cache(stage) and self.cache.restore(
+                                    stage, fingerprints[stage.name], self.output_dir):
+                                print(f"[CACHED] {stage.name} ({fingerprints[stage.name][:12]})")
+                                self.cached.append(stage.name)
+                                self.timings[stage.name] = 0.0
+                                available.update(stage.outputs)
+                                continue
+                        pool = processes if stage.executor == "process" else threads
+                        print("=" * 80)
+                        print(f"[START] {stage.name}")
+                        print("=" * 80)
+                        started[stage.name] = time.perf_counter()
+                        running[pool.submit(stage.fn, *stage.args, **stage.kwargs)] = stage
+
+                if not running:
+                    if not pending:
+                        break       # the rest was restored from cache
+                    names = [s.name for s in pending]
+                    raise RuntimeError(f"Pipeline stalled; inputs never became ready for {names}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        raise RuntimeError(f"{stage.name} failed") from error
+
+                    missing = [a for a in stage.outputs if not (self.output_dir / a).exists()]
+                    if missing:
+                        raise RuntimeError(f"{stage.name} finished without writing {missing}")
+
+                    self.timings[stage.name] = round(time.perf_counter() - started[stage.name], 3)
+                    if self.cache is not None:
+                        self.cache.store(stage, fingerprints[stage.name], self.output_dir,
+                                         replace=not self._use_cache(stage))
+                    available.update(stage.outputs)
+                    print(f"\n[COMPLETE] {stage.name} ({self.timings[stage.name]:.1f}s)\n")
+        except BaseException:
+            for future in running:
+                future.cancel()
+            # Don't wait on still-running workers; the caller is about to fail anyway
+            for proc in list(getattr(processes, "_processes", {}).values()):
+                proc.terminate()
+            raise
+        finally:
+            threads.shutdown(wait=True, cancel_futures=True)
+            processes.shutdown(wait=True, cancel_futures=True)
+
+        self.timings["total"] = round(time.perf_counter() - pipeline_start, 3)
+        return self.timings
@@ -0,0 +1,256 @@
+"""
+Pipeline: Run Snapshots
+Every run writes straight into its own directory under results/
+(NNN-xxxxxxxx, as the old copytree backups were named) and `output` is a
+symlink to the latest successful run, so nothing is copied before work
+starts. When a run is superseded, its artifacts identical to the run
+before it are hardlinked to that run and made read-only. The run behind
+`output` never shares an inode with a snapshot or the stage cache, so
+editing a file through `output/` cannot change an older run.
+
+results/index.json records the runs and the next run number, replacing a
+scan of results/ on every start. It is only read-modified-written under an
+exclusive lock (results/index.lock), so several pipelines can run at once;
+each also gets its own input workspace (see use_workspace), removed when
+the run ends.
+"""
+import fcntl
+import filecmp
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+
+def get_next_run_number(results_dir: Path) -> int:
+    """Directory scan; only used to bootstrap an index for an existing results/."""
+    if not results_dir.exists():
+        return 1
+    nums = []
+    for d in results_dir.iterdir():
+        if d.is_dir():
+            try:
+                nums.append(int(d.name.split("-")[0]))
+            except ValueError:
+                pass
+    return max(nums) + 1 if nums else 1
+
+def load_index(results_dir: Path) -> dict:
+    path = Path(results_dir) / INDEX_FILE
+    if path.exists():
+        with open(path) as f:
+            return json.load(f)
+    return {"next_run": get_next_run_number(Path(results_dir)), "latest": None, "runs": []}
+
+def save_index(results_dir: Path, index: dict):
+    path = Path(results_dir) / INDEX_FILE
+    tmp = path.with_suffix(f".{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=2)
+    os.replace(tmp, path)
+
+@contextmanager
+def locked_index(results_dir: Path):
+    """The run index, held under an exclusive lock and saved on exit."""
+    results_dir = Path(results_dir)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    with open(results_dir / LOCK_FILE, "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            index = load_index(results_dir)
+            yield index
+            save_index(results_dir, index)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _register(results_dir: Path, index: dict, status: str, run_id: str = None, **info) -> Path:
+    name = f"{index['next_run']:03d}-{run_id or str(uuid.uuid4())[:8]}"
+    index["next_run"] += 1
+    index["runs"].append({
+        "name": name,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "status": status,
+        **info
+    })
+    return Path(results_dir) / name
+
+def _set_status(index: dict, name: str, status: str):
+    for run in index["runs"]:
+        if run["name"] == name:
+            run["status"] = status
+
+def migrate_output_dir(output_dir: Path, results_dir: Path):
+    """A pre-snapshot `output/` directory is moved (not copied) into results/."""
+    output_dir = Path(output_dir)
+    if output_dir.is_symlink() or not output_dir.exists():
+        return
+    with locked_index(results_dir) as index:
+        if output_dir.is_symlink() or not output_dir.exists():
+            return              # another run migrated it first
+        if not any(output_dir.iterdir()):
+            output_dir.rmdir()
+            return
+        target = _register(results_dir, index, "migrated")
+        output_dir.rename(target)
+        index["latest"] = target.name
+    print(f"Moved previous output to: {target}")
+
+def create_run(results_dir: Path, run_id: str = None, **info) -> Path:
+    """
+    Allocate and create the directory the new run writes into:
+    results/NNN-<run_id or random>.
+    """
+    with locked_index(results_dir) as index:
+        run_dir = _register(results_dir, index, "running", run_id=run_id, **info)
+        run_dir.mkdir()
+    return run_dir
+
+def _workspace_sources(dataset_id: str, video: str, candidate_audio: str,
+                       interviewer_audio: str) -> dict:
+    return {
+        f"{dataset_id}_candidate_video.mp4": video,
+        f"{dataset_id}_candidate_audio.wav": candidate_audio,
+        f"{dataset_id}_interviewer_audio.wav": interviewer_audio
+    }
+
+def workspace_path(workspace_root: Path, dataset_id: str, video: str, candidate_audio: str,
+                   interviewer_audio: str, cache=None) -> Path:
+    """
+    With a stage cache the workspace is named after the media content, so the
+    paths recorded in timeline.json (and every fingerprint downstream) are the
+    same for every run of the same recording; otherwise it is unique to this run.
+    """
+    if cache is not None:
+        digest = hashlib.blake2b(digest_size=8)
+        for path in _workspace_sources(dataset_id, video, candidate_audio, interviewer_audio).values():
+            digest.update(cache.source_digest(path).encode())
+        return Path(workspace_root) / f"{dataset_id}-{digest.hexdigest()}"
+    return Path(workspace_root) / f"{dataset_id}-{uuid.uuid4().hex[:16]}"
+
+def _link_sources(workspace: Path, sources: dict) -> Path:
+    workspace.mkdir(parents=True, exist_ok=True)
+    for name, path in sources.items():
+        # Replace atomically: a concurrent run of the same recording may share the directory
+        tmp = workspace / f".{name}.{uuid.uuid4().hex[:8]}"
+        os.symlink(Path(path).resolve(), tmp)
+        os.replace(tmp, workspace / name)
+    return workspace
+
+def _lock_shared(lock_path: Path):
+    """Shared flock on lock_path, retried if the last user removed the file meanwhile."""
+    while True:
+        lock = open(lock_path, "a")
+        fcntl.flock(lock, fcntl.LOCK_SH)
+        try:
+            if os.fstat(lock.fileno()).st_ino == os.stat(lock_path).st_ino:
+                return lock
+        except FileNotFoundError:
+            pass
+        lock.close()
+
+@contextmanager
+def use_workspace(workspace_root: Path, dataset_id: str, video: str, candidate_audio: str,
+                  interviewer_audio: str, cache=None):
+    """
+    Per-run input directory holding the <id>_candidate_video.mp4 / ... names
+    Stage 0 expects, as symlinks to the given files (see workspace_path);
+    removed again when the run ends. Runs of the same recording share the content-named directory: each holds
+    a shared lock on .<name>.lock and the last one out deletes it. Nothing in
+    the stage cache links into a workspace, and a later run recreates it
+    under the same name, so removing it does not invalidate cache entries.
+    """
+    workspace_root = Path(workspace_root)
+    workspace_root.mkdir(parents=True, exist_ok=True)
+    workspace = workspace_path(workspace_root, dataset_id, video, candidate_audio,
+                               interviewer_audio, cache)
+    lock_path = workspace_root / f".{workspace.name}.lock"
+    lock = _lock_shared(lock_path)
+    try:
+        yield _link_sources(workspace, _workspace_sources(dataset_id, video, candidate_audio,
+                                                          interviewer_audio))
+    finally:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            pass                    # another run still uses it; the last one removes it
+        else:
+            shutil.rmtree(workspace, ignore_errors=True)
+            lock_path.unlink(missing_ok=True)
+        lock.close()
+
+READ_ONLY = 0o444
+
+def unshare(run_dir: Path) -> int:
+    """Give run_dir private, writable copies of files hardlinked elsewhere (cache, snapshots)."""
+    copied = 0
+    for file in Path(run_dir).iterdir():
+        if file.is_symlink() or not file.is_file() or file.stat().st_nlink == 1:
+            continue
+        tmp = file.with_name(f".{file.name}.{uuid.uuid4().hex[:8]}")
+        shutil.copyfile(file, tmp)
+        os.replace(tmp, file)
+        copied += 1
+    return copied
+
+def link_unchanged(previous_dir: Path, run_dir: Path) -> int:
+    """
+    Replace files identical to the previous run's with hardlinks to them.
+    The shared inodes are made read-only: both runs are snapshots by now.
+    """
+    if previous_dir is None or not Path(previous_dir).is_dir():
+        return 0
+    linked = 0
+    for file in Path(run_dir).iterdir():
+        old = Path(previous_dir) / file.name
+        if not file.is_file() or not old.is_file():
+            continue
+        if os.path.samefile(file, old):
+            continue                # already shared
+        if file.stat().st_size != old.stat().st_size or not filecmp.cmp(file, old, shallow=False):
+            continue
+        os.chmod(old, READ_ONLY)
+        tmp = file.with_name(f".{file.name}.{uuid.uuid4().hex[:8]}")
+        os.link(old, tmp)
+        os.replace(tmp, file)
+        linked += 1
+    return linked
+
+def _successful_before(index: dict, name: str):
+    """The successful (or migrated) run recorded before `name`, if any."""
+    names = [r["name"] for r in index["runs"] if r["status"] in ("complete", "migrated")]
+    i = names.index(name) if name in names else 0
+    return names[i - 1] if i > 0 else None
+
+def finish_run(results_dir: Path, run_dir: Path, output_link: Path, success: bool):
+    """
+    Record the outcome. On success run_dir replaces the latest run behind
+    `output`, and the superseded run is deduped against the one before it.
+    """
+    results_dir = Path(results_dir)
+    with locked_index(results_dir) as index:
+        if success:
+            # Files restored from / stored into the stage cache are hardlinks
+            unshare(run_dir)
+            previous = index.get("latest")
+            older = _successful_before(index, previous) if previous else None
+            if older and (results_dir / previous).is_dir():
+                linked = link_unchanged(results_dir / older, results_dir / previous)
+                if linked:
+                    print(f"Hardlinked {linked} unchanged artifact(s) of {previous} to {older}")
+            point_output_to(output_link, run_dir)
+            index["latest"] = run_dir.name
+        _set_status(index, run_dir.name, "complete" if success else "failed")
+
+def point_output_to(output_link: Path, run_dir: Path):
+    """Atomically repoint the `output` symlink at run_dir."""
+    output_link = Path(output_link)
+    target = os.path.relpath(run_dir, output_link.parent)
+    tmp = output_link.with_name(f".{output_link.name}.{uuid.uuid4().hex[:8]}")
+    os.symlink(target, tmp, target_is_directory=True)
+    os.replace(tmp, output_link)
@@ -0,0 +1,171 @@
+"""
+Pipeline: Interview Analysis Stage Graph
+Declares Stages 0-5 as DAG nodes with their input/output artifacts:
+
+    0 timebase ──┬─ 1A candidate audio ──┬─ 2a speaking segments ── 3 metrics
+                 ├─ 1C candidate video ──┘
+    1B interviewer audio ────────────────┴─ 2b Q&A pairs ── 4+5 scoring
+
+Stage functions live at module level so spawned workers can unpickle them;
+heavy imports happen inside them, in whichever process runs the stage.
+Stage keys (0, 1A, 1B, 1A+1B, 1C, 2A, 2B, 3, 4+5) name cache entries and
+are what `main.py --force` accepts.
+"""
+import importlib.util
+import json
+from pathlib import Path
+from pipeline.dag import Pipeline, Stage
+
+SRC_DIR = Path(__file__).resolve().parents[1]
+
+TIMELINE = "timeline.json"
+CANDIDATE_AUDIO = "candidate_audio_raw.json"
+AUDIO_COLUMNS = "candidate_audio_features.npz"
+INTERVIEWER = "interviewer_transcript.json"
+CANDIDATE_VIDEO = "candidate_video_raw.json"
+VIDEO_COLUMNS = "candidate_video_frames.npz"
+SPEAKING_SEGMENTS = "speaking_segments.json"
+QA_PAIRS = "qa_pairs.json"
+BEHAVIOR_METRICS = "candidate_behavior_metrics.json"
+BEHAVIOR_SERIES = "candidate_behavior_series.json"
+RELEVANCE_SCORES = "relevance_scores.json"
+SCORE_TIMELINE = "candidate_score_timeline.json"
+
+def _load_timeline(output_dir: str) -> dict:
+    with open(Path(output_dir) / TIMELINE) as f:
+        return json.load(f)
+
+def run_timebase(input_dir: str, output_dir: str, dataset_id: str = "unknown"):
+    from stage0_timebase import timebase
+    timebase.run(input_dir, output_dir, dataset_id)
+
+def run_candidate_audio(path: str, output_dir: str, **options):
+    from stage1_extraction import candidate_audio
+    candidate_audio.run(path, output_dir, _load_timeline(output_dir), **options)
+
+def run_interviewer_audio(path: str, output_dir: str, **options):
+    from stage1_extraction import interviewer_audio
+    interviewer_audio.run(path, output_dir, **options)
+
+def run_shared_audio(candidate_path: str, interviewer_path: str, output_dir: str, **options):
+    from stage1_extraction import whisper_service
+    whisper_service.run_shared(candidate_path, interviewer_path, output_dir,
+                               _load_timeline(output_dir), **options)
+
+def run_candidate_video(path: str, output_dir: str, **options):
+    from stage1_extraction import candidate_video
+    candidate_video.run(path, output_dir, _load_timeline(output_dir), **options)
+
+def run_speaking_segments(output_dir: str):
+    from stage2_temporal import segmentation
+    segmentation.run_speaking_segments(output_dir)
+
+def run_qa_pairs(output_dir: str):
+    from stage2_temporal import segmentation
+    segmentation.run_qa_pairs(output_dir)
+
+def run_metrics(output_dir: str):
+    from stage3_behavior import metrics
+    metrics.run(output_dir)
+
+def run_scoring(output_dir: str, jd_path: str):
+    # "4+5.py" is not an importable module name
+    spec = importlib.util.spec_from_file_location("stage4_5", SRC_DIR / "stage4+5" / "4+5.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.run(output_dir, jd_path)
+
+def build_pipeline(
+    input_dir: str,
+    output_dir: str,
+    dataset_id: str,
+    video: str,
+    candidate_audio: str,
+    interviewer_audio: str,
+    jd: str,
+    cache=None,
+    force=(),
+    audio_options: dict = None,
+    video_options: dict = None,
+    shared_whisper: bool = False,
+    shared_options: dict = None,
+    json_frames: bool = True,
+    vad_levels=None
+) -> Pipeline:
+    """
+    The full interview pipeline as a DAG over `output_dir` artifacts.
+    `audio_options` go to 1A and 1B, `video_options` to 1C and
+    `shared_options` to the shared-Whisper 1A+1B node; `vad_levels` adds
+    candidate VAD segments at those webrtcvad levels (1A). With a StageCache,
+    stages whose inputs, parameters and code are unchanged are restored
+    (`force` lists stage keys to re-run anyway).
+    """
+    out = str(output_dir)
+    audio_options = audio_options or {}
+    # Only set when requested, so default runs keep their cache fingerprints
+    candidate_options = {"vad_levels": sorted(vad_levels)} if vad_levels else {}
+    pipeline = Pipeline(out, cache=cache, force=force)
+
+    pipeline.add(Stage(
+        "STAGE 0 — TIMEBASE", run_timebase, (str(input_dir), out), {"dataset_id": dataset_id},
+        outputs=[TIMELINE], key="0",
+        sources=[video, candidate_audio, interviewer_audio], code=["stage0_timebase"]
+    ))
+
+    if shared_whisper:
+        pipeline.add(Stage(
+            "STAGE 1A+1B — AUDIO (SHARED WHISPER)", run_shared_audio,
+            (candidate_audio, interviewer_audio, out),
+            {**(shared_options or {}), **candidate_options, "json_frames": json_frames},
+            inputs=[TIMELINE], outputs=[CANDIDATE_AUDIO, AUDIO_COLUMNS, INTERVIEWER],
+            executor="process", key="1A+1B", sources=[candidate_audio, interviewer_audio],
+            code=["stage1_extraction"]
+        ))
+    else:
+        pipeline.add(Stage(
+            "STAGE 1A — CANDIDATE AUDIO", run_candidate_audio, (candidate_audio, out),
+            {**audio_options, **candidate_options, "json_frames": json_frames}, inputs=[TIMELINE],
+            outputs=[CANDIDATE_AUDIO, AUDIO_COLUMNS], executor="process", key="1A",
+            sources=[candidate_audio], code=["stage1_extraction"]
+        ))
+        # Interviewer transcription does not read the timeline; start it immediately
+        pipeline.add(Stage(
+            "STAGE 1B — INTERVIEWER AUDIO", run_interviewer_audio, (interviewer_audio, out),
+            audio_options, outputs=[INTERVIEWER], executor="process", key="1B",
+            sources=[interviewer_audio], code=["stage1_extraction"]
+        ))
+
+    video_options = video_options or {}
+    # Speech gating runs its own VAD over the candidate audio (not 1A's output),
+    # so that file is part of 1C's fingerprint but 1C need not wait for 1A
+    video_sources = [video, candidate_audio] if video_options.get("speech_gating") else [video]
+    pipeline.add(Stage(
+        "STAGE 1C — CANDIDATE VIDEO", run_candidate_video, (video, out),
+        {**video_options, "json_frames": json_frames},
+        inputs=[TIMELINE], outputs=[CANDIDATE_VIDEO, VIDEO_COLUMNS], executor="process",
+        key="1C", sources=video_sources, code=["stage1_extraction"]
+    ))
+
+    pipeline.add(Stage(
+        "STAGE 2A — SPEAKING SEGMENTS", run_speaking_segments, (out,),
+        inputs=[TIMELINE, CANDIDATE_AUDIO, AUDIO_COLUMNS, CANDIDATE_VIDEO, VIDEO_COLUMNS],
+        outputs=[SPEAKING_SEGMENTS], key="2A", code=["stage1_extraction", "stage2_temporal"]
+    ))
+    pipeline.add(Stage(
+        "STAGE 2B — Q&A PAIRS", run_qa_pairs, (out,),
+        inputs=[CANDIDATE_AUDIO, INTERVIEWER], outputs=[QA_PAIRS], key="2B",
+        code=["stage2_temporal"]
+    ))
+    pipeline.add(Stage(
+        "STAGE 3 — BEHAVIOR METRICS", run_metrics, (out,),
+        inputs=[SPEAKING_SEGMENTS, CANDIDATE_AUDIO, AUDIO_COLUMNS, CANDIDATE_VIDEO, VIDEO_COLUMNS],
+        outputs=[BEHAVIOR_METRICS, BEHAVIOR_SERIES], key="3",
+        code=["stage1_extraction/columnar.py", "stage2_temporal/intervals.py", "stage3_behavior"]
+    ))
+    # Scoring only reads the Q&A pairs, so it overlaps Stage 3 (and a slow 1C)
+    pipeline.add(Stage(
+        "STAGE 4+5 — SCORING & VERDICT", run_scoring, (out, jd),
+        inputs=[QA_PAIRS], outputs=[RELEVANCE_SCORES, SCORE_TIMELINE], executor="process",
+        key="4+5", sources=[jd], code=["stage4+5/4+5.py", "llm_service"]
+    ))
+    return pipeline
@@ -0,0 +1,34 @@
+"""
+Stage 1: Shared Audio Buffer
+Decodes a WAV once into the float32 16 kHz mono buffer that feature
+extraction, VAD and Whisper all consume.
+"""
+import time
+import librosa
+import numpy as np
+
+# faster-whisper only accepts raw arrays at this rate
+ANALYSIS_SAMPLE_RATE = 16000
+
+# Process-wide decode counter (calls + cumulative seconds spent decoding)
+DECODE_STATS = {"calls": 0, "seconds": 0.0}
+
+def load_audio(audio_path: str, sample_rate: int = ANALYSIS_SAMPLE_RATE) -> np.ndarray:
+    """Decode and resample audio into a contiguous float32 mono buffer."""
+    start = time.perf_counter()
+    y, _ = librosa.load(audio_path, sr=sample_rate, mono=True, dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    elapsed = time.perf_counter() - start
+
+    DECODE_STATS["calls"] += 1
+    DECODE_STATS["seconds"] += elapsed
+
+    print(f"Decoded {audio_path}: {len(y) / sample_rate:.1f}s audio in {elapsed:.2f}s")
+    return y
+
+def decode_stats() -> dict:
+    """Snapshot of the decode counter, rounded for JSON output."""
+    return {
+        "calls": DECODE_STATS["calls"],
+        "seconds": round(DECODE_STATS["seconds"], 3)
+    }
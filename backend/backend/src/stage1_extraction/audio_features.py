@@ -0,0 +1,151 @@
+"""
+Stage 1A: Block-wise Audio Feature Engine
+Computes RMS energy and F0 only at the decimated output rate (every 10th
+10 ms hop), one fixed-size block at a time, so peak memory does not grow
+with interview length.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+FRAME_SEC = 0.025        # RMS analysis window (same as the old librosa.feature.rms call)
+HOP_SEC = 0.010          # base hop; frame_idx is counted in these units
+DECIMATION = 10          # keep every 10th hop -> 100 ms output rate
+PITCH_FRAME_SEC = 0.064  # YIN window, long enough for FMIN
+FMIN = 65.0
+FMAX = 500.0
+YIN_THRESHOLD = 0.15
+VOICING_RMS = 0.001      # frames quieter than this never reach YIN
+BLOCK_FRAMES = 300       # output frames per block (30 s at 100 ms)
+
+def _frame_block(y: np.ndarray, centers: np.ndarray, frame_length: int) -> np.ndarray:
+    """Zero-padded frames of `frame_length` centred on evenly spaced `centers` (strided view)."""
+    half = frame_length // 2
+    first = int(centers[0]) - half
+    last = int(centers[-1]) - half + frame_length
+
+    seg = np.zeros(last - first, dtype=np.float32)
+    lo, hi = max(first, 0), min(last, len(y))
+    if hi > lo:
+        seg[lo - first:hi - first] = y[lo:hi]
+
+    step = int(centers[1] - centers[0]) if len(centers) > 1 else 1
+    return sliding_window_view(seg, frame_length)[::step]
+
+def _yin(frames: np.ndarray, sample_rate: int, fmin: float, fmax: float, threshold: float) -> np.ndarray:
+    """Vectorised YIN over a (n, L) frame matrix. Returns F0 in Hz, 0 where unvoiced."""
+    n, frame_length = frames.shape
+    f0 = np.zeros(n, dtype=np.float64)
+    if n == 0:
+        return f0
+
+    tau_min = max(1, int(np.floor(sample_rate / fmax)))
+    tau_max = min(frame_length // 2, int(np.ceil(sample_rate / fmin)))
+    window = frame_length - tau_max
+    x = frames.astype(np.float64)
+
+    # Difference function d(tau) = E(0) + E(tau) - 2 r(tau), r via FFT cross-correlation
+    n_fft = 1 << int(np.ceil(np.log2(frame_length + window)))
+    spec = np.fft.rfft(x, n_fft, axis=1)
+    spec_w = np.fft.rfft(x[:, :window], n_fft, axis=1)
+    acf = np.fft.irfft(spec * np.conj(spec_w), n_fft, axis=1)[:, :tau_max + 1]
+
+    taus = np.arange(tau_max + 1)
+    sq = np.zeros((n, frame_length + 1))
+    np.cumsum(x * x, axis=1, out=sq[:, 1:])
+    energy = sq[:, taus + window] - sq[:, taus]
+    diff = np.maximum(energy[:, :1] + energy - 2.0 * acf, 0.0)
+
+    # Cumulative mean normalised difference
+    cmnd = np.ones_like(diff)
+    running = np.cumsum(diff[:, 1:], axis=1)
+    cmnd[:, 1:] = diff[:, 1:] * taus[1:] / np.maximum(running, np.finfo(np.float64).tiny)
+
+    # First trough below threshold in [tau_min, tau_max)
+    mid = cmnd[:, tau_min:tau_max]
+    prev = cmnd[:, tau_min - 1:tau_max - 1]
+    nxt = cmnd[:, tau_min + 1:tau_max + 1]
+    candidates = (mid < threshold) & (mid <= prev) & (mid <= nxt)
+    voiced = candidates.any(axis=1)
+    if not voiced.any():
+        return f0
+
+    rows = np.nonzero(voiced)[0]
+    tau = candidates[rows].argmax(axis=1) + tau_min
+
+    # Parabolic interpolation around the trough, on the raw difference function:
+    # the cumulative-mean normalisation skews the parabola at short periods
+    a = diff[rows, tau - 1]
+    b = diff[rows, tau]
+    c = diff[rows, tau + 1]
+    denom = a - 2.0 * b + c
+    shift = np.where(np.abs(denom) > 1e-12, 0.5 * (a - c) / np.where(denom == 0, 1.0, denom), 0.0)
+    period = tau + np.clip(shift, -1.0, 1.0)
+
+    pitch = sample_rate / period
+    pitch[(pitch < fmin) | (pitch > fmax)] = 0.0
+    f0[rows] = pitch
+    return f0
+
+def iter_feature_blocks(
+    y: np.ndarray,
+    sample_rate: int,
+    decimation: int = DECIMATION,
+    block_frames: int = BLOCK_FRAMES,
+    fmin: float = FMIN,
+    fmax: float = FMAX
+):
+    """Yield (frame_idx, rms, f0) arrays, one block of output frames at a time."""
+    hop = int(HOP_SEC * sample_rate)
+    frame_length = int(FRAME_SEC * sample_rate)
+    pitch_length = int(PITCH_FRAME_SEC * sample_rate)
+
+    # Same frame count as librosa's centred framing: 1 + len(y) // hop
+    n_hops = 1 + len(y) // hop
+    out_idx = np.arange(0, n_hops, decimation)
+
+    for b0 in range(0, len(out_idx), block_frames):
+        frame_idx = out_idx[b0:b0 + block_frames]
+        centers = frame_idx * hop
+
+        frames = _frame_block(y, centers, frame_length)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+
+        pitch_frames = _frame_block(y, centers, pitch_length)
+        loud = np.sqrt(np.mean(np.square(pitch_frames, dtype=np.float64), axis=1)) >= VOICING_RMS
+        f0 = np.zeros(len(frame_idx))
+        if loud.any():
+            f0[loud] = _yin(pitch_frames[loud], sample_rate, fmin, fmax, YIN_THRESHOLD)
+
+        yield frame_idx, rms, f0
+
+def compute_feature_columns(y: np.ndarray, sample_rate: int, decimation: int = DECIMATION,
+                            block_frames: int = BLOCK_FRAMES) -> dict:
+    """Stage 1A features as parallel arrays (frame_idx, rms_energy, pitch_hz) plus hop_sec."""
+    blocks = list(iter_feature_blocks(y, sample_rate, decimation, block_frames))
+    hop = int(HOP_SEC * sample_rate)
+    return {
+        "frame_idx": np.concatenate([b[0] for b in blocks]).astype(np.int32),
+        "rms_energy": np.concatenate([b[1] for b in blocks]),
+        "pitch_hz": np.concatenate([b[2] for b in blocks]),
+        "hop_sec": hop / sample_rate
+    }
+
+def features_to_list(columns: dict) -> list:
+    """JSON view of the feature columns (the original per-frame dict list)."""
+    hop_sec = columns["hop_sec"]
+    return [
+        {
+            "frame_idx": i,
+            "timestamp_sec": round(i * hop_sec, 3),
+            "rms_energy": round(energy, 4),
+            "pitch_hz": round(pitch, 2) if pitch > 0 else 0
+        }
+        for i, energy, pitch in zip(columns["frame_idx"].tolist(),
+                                    columns["rms_energy"].tolist(),
+                                    columns["pitch_hz"].tolist())
+    ]
+
+def compute_features(y: np.ndarray, sample_rate: int, decimation: int = DECIMATION,
+                     block_frames: int = BLOCK_FRAMES) -> list:
+    """Build the Stage 1A `features` list (frame_idx, timestamp_sec, rms_energy, pitch_hz)."""
+    return features_to_list(compute_feature_columns(y, sample_rate, decimation, block_frames))
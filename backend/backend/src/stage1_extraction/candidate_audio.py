@@ -2,85 +2,24 @@
 Stage 1A: Candidate Audio Feature Extraction (DIRECT PATH VERSION)
 """
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import librosa
 import numpy as np
-import webrtcvad
-from faster_whisper import WhisperModel
+from stage1_extraction.audio_buffer import ANALYSIS_SAMPLE_RATE, load_audio, decode_stats
+from stage1_extraction.audio_features import compute_features, compute_feature_columns, features_to_list
+from stage1_extraction.columnar import AUDIO_COLUMNS_FILE, save_audio_columns
+from stage1_extraction.vad import DEFAULT_LEVEL, iter_speaking_segments, detect_levels
+from stage1_extraction.transcription import segments_to_dicts, transcribe_chunked
+from stage1_extraction.whisper_service import get_model, transcribe_batched
 
-def extract_features(audio_path: str, sample_rate: int = 16000) -> dict:
-    """Extract low-level audio features."""
-    y, sr = librosa.load(audio_path, sr=sample_rate)
-    
-    features = []
-    frame_length = int(0.025 * sample_rate)
-    hop_length = int(0.010 * sample_rate)
-    
-    rms = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-    pitches, magnitudes = librosa.piptrack(y=y, sr=sr, hop_length=hop_length)
-    
-    for i in range(0, len(rms), 10):
-        if i >= len(rms):
-            break
-        timestamp = i * hop_length / sample_rate
-        
-        pitch_values = pitches[:, i]
-        pitch = pitch_values[pitch_values > 0].mean() if np.any(pitch_values > 0) else 0
-        
-        features.append({
-            "frame_idx": i,
-            "timestamp_sec": round(timestamp, 3),
-            "rms_energy": round(float(rms[i]), 4),
-            "pitch_hz": round(float(pitch), 2) if pitch > 0 else 0
-        })
-    
-    return features
+def extract_features(y: np.ndarray, sample_rate: int = ANALYSIS_SAMPLE_RATE) -> list:
+    """Extract low-level audio features (RMS + F0 at 100 ms) in fixed-size blocks."""
+    return compute_features(y, sample_rate)
 
-def voice_activity_detection(audio_path: str, sample_rate: int = 16000) -> list:
-    """Detect voice activity using webrtcvad."""
-    vad = webrtcvad.Vad(2)
-    
-    y, sr = librosa.load(audio_path, sr=sample_rate)
-    y_int16 = (y * 32767).astype(np.int16)
-    
-    frame_duration_ms = 30
-    frame_samples = int(sample_rate * frame_duration_ms / 1000)
-    
-    segments = []
-    is_speaking = False
-    segment_start = 0
-    
-    for i in range(0, len(y_int16), frame_samples):
-        frame = y_int16[i:i + frame_samples]
-        if len(frame) < frame_samples:
-            break
-        
-        try:
-            is_speech = vad.is_speech(frame.tobytes(), sample_rate)
-        except:
-            is_speech = False
-        
-        timestamp = i / sample_rate
-        
-        if is_speech and not is_speaking:
-            segment_start = timestamp
-            is_speaking = True
-        elif not is_speech and is_speaking:
-            segments.append({
-                "start_sec": round(segment_start, 3),
-                "end_sec": round(timestamp, 3),
-                "type": "speaking"
-            })
-            is_speaking = False
-    
-    if is_speaking:
-        segments.append({
-            "start_sec": round(segment_start, 3),
-            "end_sec": round(len(y_int16) / sample_rate, 3),
-            "type": "speaking"
-        })
-    
-    return segments
+def voice_activity_detection(y: np.ndarray, sample_rate: int = ANALYSIS_SAMPLE_RATE) -> list:
+    """Detect voice activity using webrtcvad on a decoded buffer."""
+    return list(iter_speaking_segments(y, sample_rate, DEFAULT_LEVEL))
 
 def split_long_segments(segments, min_gap=1.5):
     """Split segments at any gap >= min_gap seconds between words."""
@@ -122,56 +61,66 @@ def split_long_segments(segments, min_gap=1.5):
     
     return result
 
-def transcribe(audio_path: str) -> dict:
-    """Transcribe audio with enhanced sensitivity and better segmentation."""
-    print("Loading Whisper model...")
-    model = WhisperModel("small", device="cpu", compute_type="int8")
-    
-    print("Transcribing...")
-    segments, info = model.transcribe(
-        audio_path, 
-        word_timestamps=True,
-        vad_filter=True,
-        vad_parameters=dict(
-            min_silence_duration_ms=700,
-            speech_pad_ms=200
-        ),
-        condition_on_previous_text=False,
-        compression_ratio_threshold=2.0,
-        log_prob_threshold=-0.8,
-        no_speech_threshold=0.5,
-        initial_prompt="This is an interview response with clear pauses between sentences."
-    )
-    
-    raw_segments = []
-    for seg in segments:
-        raw_segments.append({
-            "start_sec": round(seg.start, 3),
-            "end_sec": round(seg.end, 3),
-            "text": seg.text.strip(),
-            "words": [
-                {
-                    "word": w.word,
-                    "start_sec": round(w.start, 3),
-                    "end_sec": round(w.end, 3),
-                    "probability": w.probability
-                }
-                for w in (seg.words or [])
-            ]
-        })
+TRANSCRIBE_OPTIONS = dict(
+    word_timestamps=True,
+    vad_filter=True,
+    vad_parameters=dict(
+        min_silence_duration_ms=700,
+        speech_pad_ms=200
+    ),
+    condition_on_previous_text=False,
+    compression_ratio_threshold=2.0,
+    log_prob_threshold=-0.8,
+    no_speech_threshold=0.5,
+    initial_prompt="This is an interview response with clear pauses between sentences."
+)
+
+def transcribe(audio, vad_segments: list = None, workers: int = 1, cpu_threads: int = 4,
+               batch_size: int = 0) -> dict:
+    """
+    Transcribe audio with enhanced sensitivity and better segmentation.
+    `audio` is a path or a float32 16 kHz mono buffer (skips Whisper's own decode).
+    batch_size > 0 uses batched inference on the shared model; otherwise, with
+    workers > 1 and VAD segments, chunks are transcribed in a process pool.
+    """
+    if batch_size > 0:
+        print("Transcribing (batched, shared model)...")
+        raw_segments, info = transcribe_batched(audio, TRANSCRIBE_OPTIONS, batch_size)
+    elif workers > 1 and vad_segments is not None and not isinstance(audio, str):
+        print("Transcribing (chunked)...")
+        raw_segments, info = transcribe_chunked(
+            audio, vad_segments, TRANSCRIBE_OPTIONS,
+            sample_rate=ANALYSIS_SAMPLE_RATE, workers=workers, cpu_threads=cpu_threads
+        )
+    else:
+        model = get_model(cpu_threads=cpu_threads)
+        
+        print("Transcribing...")
+        segments, info = model.transcribe(audio, **TRANSCRIBE_OPTIONS)
+        raw_segments = segments_to_dicts(segments)
+        info = {
+            "language": info.language if hasattr(info, 'language') else "unknown",
+            "language_probability": info.language_probability if hasattr(info, 'language_probability') else 0
+        }
     
     final_segments = split_long_segments(raw_segments, min_gap=1.5)
     
     result = {
-        "language": info.language if hasattr(info, 'language') else "unknown",
-        "language_probability": info.language_probability if hasattr(info, 'language_probability') else 0,
+        "language": info["language"],
+        "language_probability": info["language_probability"],
         "segments": final_segments
     }
     
     return result
 
-def run(candidate_audio_path: str, output_dir: str, timeline: dict) -> dict:
-    """Execute Stage 1A: Candidate Audio Extraction (DIRECT PATH)."""
+def run(candidate_audio_path: str, output_dir: str, timeline: dict, vad_levels=None,
+        transcribe_workers: int = 1, whisper_threads: int = 4, batch_size: int = 0,
+        json_frames: bool = True) -> dict:
+    """
+    Execute Stage 1A: Candidate Audio Extraction (DIRECT PATH).
+    Features always go to the columnar .npz; `json_frames` also writes them
+    into the JSON as the per-frame compatibility list.
+    """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
@@ -184,27 +133,71 @@ def run(candidate_audio_path: str, output_dir: str, timeline: dict) -> dict:
     
     sample_rate = timeline["audio"]["candidate"]["sample_rate"]
     
-    print("Extracting features...")
-    features = extract_features(str(candidate_audio), sample_rate)
+    wall_start = time.perf_counter()
+    timings = {}
+    
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[f"{name}_sec"] = round(time.perf_counter() - start, 3)
+        print(f"  {name} done in {timings[f'{name}_sec']:.2f}s")
+        return result
+    
+    # Single decode shared by features, VAD and Whisper
+    print("Decoding audio...")
+    y = timed("decode", load_audio, str(candidate_audio), ANALYSIS_SAMPLE_RATE)
+    
+    def run_vad():
+        if vad_levels:
+            levels = sorted(set(vad_levels) | {DEFAULT_LEVEL})
+            by_level = detect_levels(y, ANALYSIS_SAMPLE_RATE, levels)
+            return by_level[DEFAULT_LEVEL], by_level
+        return voice_activity_detection(y, ANALYSIS_SAMPLE_RATE), None
+    
+    # Features and VAD (NumPy / C) overlap the long Whisper pass.
+    # Only chunked transcription needs the VAD result before it can start.
+    print("Extracting features, running VAD and transcribing concurrently...")
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        features_future = pool.submit(timed, "features", compute_feature_columns, y, ANALYSIS_SAMPLE_RATE)
+        vad_future = pool.submit(timed, "vad", run_vad)
+        
+        chunked = batch_size <= 0 and transcribe_workers > 1
+        
+        def run_transcription():
+            vad_result = vad_future.result()[0] if chunked else None
+            return transcribe(y, vad_result, transcribe_workers, whisper_threads, batch_size)
+        
+        transcription_future = pool.submit(timed, "transcription", run_transcription)
+        
+        feature_columns = features_future.result()
+        vad_segments, vad_by_level = vad_future.result()
+        transcription = transcription_future.result()
     
-    print("Running VAD...")
-    vad_segments = voice_activity_detection(str(candidate_audio), sample_rate)
+    columns_file = timed("write_columns", save_audio_columns, output_path, feature_columns)
     
-    print("Transcribing...")
-    transcription = transcribe(str(candidate_audio))
+    timings["wall_sec"] = round(time.perf_counter() - wall_start, 3)
+    print(f"Stage 1A timings: {timings}")
     
     output = {
         "dataset_id": candidate_audio.stem.split('_')[0],  # Extract from filename
         "source_file": str(candidate_audio),
         "sample_rate": sample_rate,
-        "features": features,
+        "analysis_sample_rate": ANALYSIS_SAMPLE_RATE,
+        "decode": decode_stats(),
+        "timings": timings,
+        "feature_columns": AUDIO_COLUMNS_FILE,
         "vad_segments": vad_segments,
         "transcription": transcription
     }
+    if json_frames:
+        output["features"] = features_to_list(feature_columns)
+    if vad_by_level:
+        output["vad_segments_by_level"] = {str(k): v for k, v in vad_by_level.items()}
     
     output_file = output_path / "candidate_audio_raw.json"
     with open(output_file, 'w') as f:
         json.dump(output, f, indent=2)
     
     print(f"Stage 1A complete: {output_file}")
+    print(f"  Feature columns: {columns_file}")
     return output
@@ -2,17 +2,163 @@
 Stage 1C: Candidate Video Feature Extraction (DIRECT PATH VERSION)
 """
 import json
+import queue
+import threading
 from pathlib import Path
 import cv2
 import numpy as np
+from stage1_extraction.frame_reader import iter_sampled_frames, working_size
+from stage1_extraction.face_tracking import FaceTracker
+from stage1_extraction.columnar import VIDEO_COLUMNS_FILE, save_video_columns, video_columns_from_frames
 
-def extract_video_features(video_path: str, fps: float, frame_sample_interval: int = 10) -> list:
-    """Extract features from video every N frames."""
+DETECT_WORKERS = 4
+MIN_FACE_PX = 30          # minSize in source pixels
+CASCADE_WINDOW_PX = 24    # Haar training window; smaller minSize has no effect
+QUEUE_SIZE = 32   # sampled frames buffered between decoder and detectors
+SPEECH_PAD_SEC = 0.5      # speech-gated sampling keeps this much video around each segment
+
+def build_frame_feature(frame_idx: int, timestamp: float, faces, frame_shape) -> dict:
+    """Per-frame feature dict from Haar detections (first face wins)."""
+    feature = {
+        "frame_idx": frame_idx,
+        "timestamp_sec": round(timestamp, 3),
+        "face_detected": len(faces) > 0,
+        "face_bbox": None,
+        "head_pose": None,
+        "gaze": None,
+        "landmarks": []
+    }
+    
+    if len(faces) > 0:
+        x, y, w, h = faces[0]
+        h_frame, w_frame = frame_shape[:2]
+        
+        feature["face_bbox"] = {
+            "x": int(x),
+            "y": int(y),
+            "width": int(w),
+            "height": int(h),
+            "x_normalized": round(x / w_frame, 4),
+            "y_normalized": round(y / h_frame, 4),
+            "width_normalized": round(w / w_frame, 4),
+            "height_normalized": round(h / h_frame, 4)
+        }
+        
+        face_center_x = x + w / 2
+        face_center_y = y + h / 2
+        frame_center_x = w_frame / 2
+        frame_center_y = h_frame / 2
+        
+        yaw = (face_center_x - frame_center_x) / frame_center_x * 45
+        pitch = (face_center_y - frame_center_y) / frame_center_y * 45
+        
+        face_aspect = w / h if h > 0 else 1
+        roll = 0
+        
+        feature["head_pose"] = {
+            "yaw": round(yaw, 2),
+            "pitch": round(pitch, 2),
+            "roll": round(roll, 2),
+            "face_aspect_ratio": round(face_aspect, 4)
+        }
+        
+        gaze_offset_x = (face_center_x - frame_center_x) / frame_center_x
+        gaze_offset_y = (face_center_y - frame_center_y) / frame_center_y
+        feature["gaze"] = {
+            "offset_x": round(gaze_offset_x, 4),
+            "offset_y": round(gaze_offset_y, 4)
+        }
+        
+        feature["landmarks"] = [
+            {"id": "face_center", "x": round(face_center_x / w_frame, 4), "y": round(face_center_y / h_frame, 4)},
+            {"id": "top", "x": round((x + w/2) / w_frame, 4), "y": round(y / h_frame, 4)},
+            {"id": "bottom", "x": round((x + w/2) / w_frame, 4), "y": round((y + h) / h_frame, 4)},
+            {"id": "left", "x": round(x / w_frame, 4), "y": round((y + h/2) / h_frame, 4)},
+            {"id": "right", "x": round((x + w) / w_frame, 4), "y": round((y + h/2) / h_frame, 4)}
+        ]
     
-    face_cascade = cv2.CascadeClassifier(
+    return feature
+
+def load_face_cascade():
+    """A fresh Haar classifier (one per detector thread; instances are not shared)."""
+    return cv2.CascadeClassifier(
         cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
     )
-    
+
+def detect_faces(face_cascade, gray, min_size: int = MIN_FACE_PX):
+    return face_cascade.detectMultiScale(
+        gray,
+        scaleFactor=1.1,
+        minNeighbors=5,
+        minSize=(min_size, min_size)
+    )
+
+def to_source_coords(faces, scale_x: float, scale_y: float):
+    """Map working-resolution (x, y, w, h) boxes back to source pixels."""
+    if len(faces) == 0 or (scale_x == 1.0 and scale_y == 1.0):
+        return faces
+    return np.rint(np.asarray(faces) * [scale_x, scale_y, scale_x, scale_y]).astype(int)
+
+def load_speech_segments(timeline: dict) -> list:
+    """
+    Candidate speaking segments for speech-gated sampling: a webrtcvad pass
+    over the candidate channel with Stage 1A's default settings.
+    Stage 1A's own vad_segments are deliberately not read: 1A runs
+    concurrently and may still be writing them, so the gated frame set would
+    depend on which stage finished first.
+    """
+    from stage1_extraction.audio_buffer import ANALYSIS_SAMPLE_RATE, load_audio
+    from stage1_extraction.vad import iter_speaking_segments
+    audio_path = timeline["audio"]["candidate"]["file"]
+    y = load_audio(audio_path, ANALYSIS_SAMPLE_RATE)
+    return list(iter_speaking_segments(y, ANALYSIS_SAMPLE_RATE))
+
+def plan_sample_indices(total_frames: int, video_fps: float, speech_segments: list,
+                        speech_sample_interval: int = 10, silence_sample_interval: int = 0,
+                        pad_sec: float = SPEECH_PAD_SEC) -> np.ndarray:
+    """
+    Sorted frame indices to analyse: every `speech_sample_interval`th frame
+    inside (padded) speaking segments, every `silence_sample_interval`th frame
+    elsewhere (0 = skip silence entirely).
+    Both grids are anchored at frame 0, so with the default interval the
+    speech frames are exactly the ones the ungated pass would have produced.
+    """
+    grid = np.arange(0, total_frames, max(1, speech_sample_interval))
+    speech = sorted(
+        (s["start_sec"], s["end_sec"]) for s in speech_segments
+        if s.get("type", "speaking") == "speaking"
+    )
+    if speech:
+        starts = np.array([s for s, _ in speech]) - pad_sec
+        ends = np.maximum.accumulate(np.array([e for _, e in speech]) + pad_sec)
+        t = grid / video_fps
+        i = np.searchsorted(starts, t, side="right") - 1
+        inside = (i >= 0) & (t <= ends[np.maximum(i, 0)])
+        planned = grid[inside]
+    else:
+        planned = grid[:0]
+
+    if silence_sample_interval > 0:
+        planned = np.union1d(planned, np.arange(0, total_frames, silence_sample_interval))
+    return planned
+
+def extract_video_features(video_path: str, fps: float, frame_sample_interval: int = 10,
+                           reader: str = "grab", workers: int = DETECT_WORKERS,
+                           queue_size: int = QUEUE_SIZE, tracking: bool = False,
+                           detect_width: int = 0, speech_segments: list = None,
+                           silence_sample_interval: int = 0) -> list:
+    """
+    Extract features from video every N frames.
+    One decoder thread feeds sampled grayscale frames into a bounded queue;
+    `workers` detector threads consume them (OpenCV releases the GIL).
+    Results are reordered by frame_idx.
+    With `tracking`, a single detector runs FaceTracker (ROI + motion gating),
+    which needs frames in order.
+    With `detect_width`, detection runs at that working width (scaled in the
+    decoder) and boxes are mapped back to source resolution.
+    With `speech_segments`, only frames inside speaking intervals are sampled
+    (plus every `silence_sample_interval`th frame outside them, if non-zero).
+    """
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
         raise ValueError(f"Cannot open video: {video_path}")
@@ -20,104 +166,119 @@ def extract_video_features(video_path: str, fps: float, frame_sample_interval: i
     video_fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     duration = total_frames / video_fps
+    src_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    src_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
     
-    frame_features = []
-    frame_idx = 0
-    sampled_idx = 0
+    work_w, work_h = working_size(src_w, src_h, detect_width)
+    scale_x, scale_y = src_w / work_w, src_h / work_h
+    min_size = max(CASCADE_WINDOW_PX, int(round(MIN_FACE_PX / scale_x)))
+    if (work_w, work_h) != (src_w, src_h):
+        print(f"Detecting at {work_w}x{work_h} (source {src_w}x{src_h})")
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        if frame_idx % frame_sample_interval == 0:
-            timestamp = frame_idx / video_fps
-            
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            faces = face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30)
-            )
-            
-            feature = {
-                "frame_idx": frame_idx,
-                "timestamp_sec": round(timestamp, 3),
-                "face_detected": len(faces) > 0,
-                "face_bbox": None,
-                "head_pose": None,
-                "gaze": None,
-                "landmarks": []
-            }
-            
-            if len(faces) > 0:
-                x, y, w, h = faces[0]
-                h_frame, w_frame = gray.shape
-                
-                feature["face_bbox"] = {
-                    "x": int(x),
-                    "y": int(y),
-                    "width": int(w),
-                    "height": int(h),
-                    "x_normalized": round(x / w_frame, 4),
-                    "y_normalized": round(y / h_frame, 4),
-                    "width_normalized": round(w / w_frame, 4),
-                    "height_normalized": round(h / h_frame, 4)
-                }
-                
-                face_center_x = x + w / 2
-                face_center_y = y + h / 2
-                frame_center_x = w_frame / 2
-                frame_center_y = h_frame / 2
-                
-                yaw = (face_center_x - frame_center_x) / frame_center_x * 45
-                pitch = (face_center_y - frame_center_y) / frame_center_y * 45
-                
-                face_aspect = w / h if h > 0 else 1
-                roll = 0
-                
-                feature["head_pose"] = {
-                    "yaw": round(yaw, 2),
-                    "pitch": round(pitch, 2),
-                    "roll": round(roll, 2),
-                    "face_aspect_ratio": round(face_aspect, 4)
-                }
-                
-                gaze_offset_x = (face_center_x - frame_center_x) / frame_center_x
-                gaze_offset_y = (face_center_y - frame_center_y) / frame_center_y
-                feature["gaze"] = {
-                    "offset_x": round(gaze_offset_x, 4),
-                    "offset_y": round(gaze_offset_y, 4)
-                }
-                
-                feature["landmarks"] = [
-                    {"id": "face_center", "x": round(face_center_x / w_frame, 4), "y": round(face_center_y / h_frame, 4)},
-                    {"id": "top", "x": round((x + w/2) / w_frame, 4), "y": round(y / h_frame, 4)},
-                    {"id": "bottom", "x": round((x + w/2) / w_frame, 4), "y": round((y + h) / h_frame, 4)},
-                    {"id": "left", "x": round(x / w_frame, 4), "y": round((y + h/2) / h_frame, 4)},
-                    {"id": "right", "x": round((x + w) / w_frame, 4), "y": round((y + h/2) / h_frame, 4)}
-                ]
-            
-            frame_features.append(feature)
-            sampled_idx += 1
-        
-        frame_idx += 1
+    targets = None
+    if speech_segments is not None:
+        targets = plan_sample_indices(total_frames, video_fps, speech_segments,
+                                      frame_sample_interval, silence_sample_interval)
+        full_grid = len(range(0, total_frames, frame_sample_interval))
+        print(f"Speech-gated sampling: {len(targets)}/{full_grid} frames")
+        targets = targets.tolist()
     
-    cap.release()
+    workers = 1 if tracking else max(1, workers)
+    trackers = []
+    frames_queue = queue.Queue(maxsize=queue_size)   # caps decoded frames held in memory
+    results = {}
+    errors = []
+    stop = threading.Event()
     
-    return {
+    def decode():
+        try:
+            for item in iter_sampled_frames(video_path, frame_sample_interval, reader,
+                                            detect_width, targets):
+                if stop.is_set():
+                    break
+                frames_queue.put(item)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(workers):
+                frames_queue.put(None)
+    
+    def detect():
+        face_cascade = load_face_cascade()
+        find_faces = lambda gray: detect_faces(face_cascade, gray, min_size)
+        if tracking:
+            tracker = FaceTracker(find_faces)
+            trackers.append(tracker)
+            find_faces = tracker.detect
+        while True:
+            item = frames_queue.get()
+            if item is None:
+                return
+            if stop.is_set():
+                continue   # keep draining so the decoder never blocks
+            frame_idx, gray, source_shape = item
+            try:
+                faces = to_source_coords(find_faces(gray), scale_x, scale_y)
+                results[frame_idx] = build_frame_feature(
+                    frame_idx, frame_idx / video_fps, faces, source_shape
+                )
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+    
+    threads = [threading.Thread(target=decode, name="1c-decode", daemon=True)]
+    threads += [
+        threading.Thread(target=detect, name=f"1c-detect-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    if errors:
+        raise errors[0]
+    
+    frame_features = [results[idx] for idx in sorted(results)]
+    
+    extraction = {
         "total_frames": total_frames,
         "video_fps": video_fps,
         "duration_sec": round(duration, 3),
-        "sampled_frames": sampled_idx,
+        "frame_width": src_w,
+        "frame_height": src_h,
+        "sampled_frames": len(frame_features),
         "sample_interval": frame_sample_interval,
         "frames": frame_features
     }
+    if trackers:
+        extraction["detection_stats"] = trackers[0].summary()
+    if targets is not None:
+        full_grid = len(range(0, total_frames, frame_sample_interval))
+        extraction["speech_gating"] = {
+            "speech_segments": len(speech_segments),
+            "speech_sec": round(sum(s["end_sec"] - s["start_sec"] for s in speech_segments), 3),
+            "pad_sec": SPEECH_PAD_SEC,
+            "silence_sample_interval": silence_sample_interval,
+            "planned_frames": len(targets),
+            "ungated_frames": full_grid,
+            "skipped_ratio": round(1 - len(targets) / full_grid, 4) if full_grid else 0.0
+        }
+    return extraction
 
-def run(candidate_video_path: str, output_dir: str, timeline: dict) -> dict:
-    """Execute Stage 1C: Candidate Video Feature Extraction (DIRECT PATH)."""
+def run(candidate_video_path: str, output_dir: str, timeline: dict, reader: str = "grab",
+        workers: int = DETECT_WORKERS, tracking: bool = False, detect_width: int = 0,
+        speech_gating: bool = False, speech_segments: list = None,
+        silence_sample_interval: int = 0, json_frames: bool = True) -> dict:
+    """
+    Execute Stage 1C: Candidate Video Feature Extraction (DIRECT PATH).
+    With `speech_gating`, detection is limited to candidate speaking intervals
+    (from `speech_segments`, else a VAD pre-pass on the candidate audio).
+    Frames always go to the columnar .npz; `json_frames` also keeps the
+    per-frame list in the JSON as a compatibility view.
+    """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
@@ -130,14 +291,33 @@ def run(candidate_video_path: str, output_dir: str, timeline: dict) -> dict:
     
     fps = timeline.get("video", {}).get("fps", 24.0)
     
+    speech_source = None
+    if speech_gating and speech_segments is None:
+        speech_segments, speech_source = load_speech_segments(timeline), "prepass_vad"
+        print(f"Speech gating: {len(speech_segments)} speaking segments ({speech_source})")
+    elif speech_segments is not None:
+        speech_source = "caller"
+    
     print(f"Extracting features at every 10th frame (video FPS: {fps})...")
-    features = extract_video_features(str(candidate_video), fps, frame_sample_interval=10)
+    features = extract_video_features(str(candidate_video), fps, frame_sample_interval=10,
+                                      reader=reader, workers=workers, tracking=tracking,
+                                      detect_width=detect_width, speech_segments=speech_segments,
+                                      silence_sample_interval=silence_sample_interval)
+    if speech_source:
+        features["speech_gating"]["source"] = speech_source
+    
+    columns_file = save_video_columns(output_path, video_columns_from_frames(
+        features["frames"], features["video_fps"], features["frame_width"], features["frame_height"]
+    ))
+    features["frame_columns"] = VIDEO_COLUMNS_FILE
     
     output = {
         "dataset_id": candidate_video.stem.split('_')[0],  # Extract from filename
         "source_file": str(candidate_video),
         "video_fps": fps,
-        "extraction": features
+        "extraction": features if json_frames else {
+            k: v for k, v in features.items() if k != "frames"
+        }
     }
     
     output_file = output_path / "candidate_video_raw.json"
@@ -145,6 +325,13 @@ def run(candidate_video_path: str, output_dir: str, timeline: dict) -> dict:
         json.dump(output, f, indent=2)
     
     print(f"Stage 1C complete: {output_file}")
+    print(f"  Frame columns: {columns_file}")
     print(f"  Total frames: {features['total_frames']}")
     print(f"  Sampled frames: {features['sampled_frames']}")
+    if "detection_stats" in features:
+        stats = features["detection_stats"]
+        print(f"  Detection paths: motion_skip={stats['motion_skip']} "
+              f"roi_hit={stats['roi_hit']} full_frame={stats['full_frame']}")
+    if "speech_gating" in features:
+        print(f"  Speech gating skipped: {features['speech_gating']['skipped_ratio']:.1%}")
     return output
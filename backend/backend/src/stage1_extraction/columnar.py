@@ -0,0 +1,163 @@
+"""
+Stage 1: Columnar Artifacts
+Per-frame Stage 1 data stored as parallel NumPy arrays in an .npz next to
+the JSON output. Stages 2 and 3 load these directly; the per-frame lists in
+candidate_audio_raw.json / candidate_video_raw.json are only a
+compatibility view and can be left out.
+
+- audio: frame_idx, rms_energy, pitch_hz (+ hop_sec); values are stored
+  fixed-point at the precision the JSON view rounds to, so both views feed
+  Stage 3 the same numbers
+- video: frame_idx, face_detected, bbox (x, y, w, h in source px)
+  (+ video_fps, frame_width, frame_height). Head pose, gaze and landmarks
+  are pure functions of the bbox and are derived on load, rounded as in
+  the JSON view.
+"""
+import json
+from pathlib import Path
+import numpy as np
+
+AUDIO_COLUMNS_FILE = "candidate_audio_features.npz"
+VIDEO_COLUMNS_FILE = "candidate_video_frames.npz"
+RMS_SCALE = 10000         # rms_energy is rounded to 4 decimals in the JSON view
+PITCH_SCALE = 100         # pitch_hz to 2 decimals
+
+def save_audio_columns(output_dir, columns: dict) -> Path:
+    path = Path(output_dir) / AUDIO_COLUMNS_FILE
+    np.savez(
+        path,
+        frame_idx=columns["frame_idx"].astype(np.int32),
+        rms_energy=np.round(columns["rms_energy"] * RMS_SCALE).astype(np.uint32),
+        pitch_hz=np.round(columns["pitch_hz"] * PITCH_SCALE).astype(np.uint16),
+        hop_sec=np.float64(columns["hop_sec"])
+    )
+    return path
+
+def video_columns_from_frames(frames: list, video_fps: float, frame_width: int,
+                              frame_height: int) -> dict:
+    """Pack Stage 1C frame dicts into bbox columns (zeros where no face)."""
+    bbox = np.zeros((len(frames), 4), dtype=np.int32)
+    for i, f in enumerate(frames):
+        b = f.get("face_bbox")
+        if b:
+            bbox[i] = (b["x"], b["y"], b["width"], b["height"])
+    return {
+        "frame_idx": np.array([f["frame_idx"] for f in frames], dtype=np.int32),
+        "face_detected": np.array([f["face_detected"] for f in frames], dtype=bool),
+        "bbox": bbox,
+        "video_fps": video_fps,
+        "frame_width": frame_width,
+        "frame_height": frame_height
+    }
+
+def save_video_columns(output_dir, columns: dict) -> Path:
+    path = Path(output_dir) / VIDEO_COLUMNS_FILE
+    np.savez(
+        path,
+        frame_idx=columns["frame_idx"].astype(np.int32),
+        face_detected=columns["face_detected"].astype(bool),
+        bbox=columns["bbox"].astype(np.int32),
+        video_fps=np.float64(columns["video_fps"]),
+        frame_width=np.int32(columns["frame_width"]),
+        frame_height=np.int32(columns["frame_height"])
+    )
+    return path
+
+def derive_video_columns(columns: dict) -> dict:
+    """
+    Same quantities Stage 1C writes per frame (yaw/pitch/roll, gaze offsets,
+    landmark centroid), vectorised from the bbox. NaN where no face.
+    """
+    x, y, w, h = columns["bbox"].astype(np.float64).T
+    face = columns["face_detected"]
+    w_frame = float(columns["frame_width"])
+    h_frame = float(columns["frame_height"])
+
+    cx = x + w / 2
+    cy = y + h / 2
+    offset_x = (cx - w_frame / 2) / (w_frame / 2)
+    offset_y = (cy - h_frame / 2) / (h_frame / 2)
+
+    # Centroid of the five rounded bbox landmarks (centre, top, bottom, left, right)
+    lm_cx, lm_cy = np.round(cx / w_frame, 4), np.round(cy / h_frame, 4)
+    centroid_x = (3 * lm_cx + np.round(x / w_frame, 4) + np.round((x + w) / w_frame, 4)) / 5
+    centroid_y = (3 * lm_cy + np.round(y / h_frame, 4) + np.round((y + h) / h_frame, 4)) / 5
+
+    def masked(values):
+        return np.where(face, values, np.nan)
+
+    return {
+        "frame_idx": columns["frame_idx"],
+        "timestamp_sec": np.round(columns["frame_idx"] / float(columns["video_fps"]), 3),
+        "face_detected": face,
+        "yaw": masked(np.round(offset_x * 45, 2)),
+        "pitch": masked(np.round(offset_y * 45, 2)),
+        "roll": masked(np.zeros(len(face))),
+        "gaze_x": masked(np.round(offset_x, 4)),
+        "gaze_y": masked(np.round(offset_y, 4)),
+        "centroid_x": masked(centroid_x),
+        "centroid_y": masked(centroid_y)
+    }
+
+def _video_view_from_json(frames: list) -> dict:
+    """Derived video columns from the JSON compatibility view."""
+    n = len(frames)
+    view = {k: np.full(n, np.nan) for k in
+            ("yaw", "pitch", "roll", "gaze_x", "gaze_y", "centroid_x", "centroid_y")}
+    for i, f in enumerate(frames):
+        pose = f.get("head_pose")
+        if pose:
+            view["yaw"][i] = pose.get("yaw", 0)
+            view["pitch"][i] = pose.get("pitch", 0)
+            view["roll"][i] = pose.get("roll", 0)
+        gaze = f.get("gaze")
+        if gaze:
+            view["gaze_x"][i] = gaze.get("offset_x", 0)
+            view["gaze_y"][i] = gaze.get("offset_y", 0)
+        landmarks = f.get("landmarks", [])
+        if landmarks:
+            view["centroid_x"][i], view["centroid_y"][i] = np.mean(
+                [(lm.get("x", 0), lm.get("y", 0)) for lm in landmarks], axis=0
+            )
+    view["frame_idx"] = np.array([f.get("frame_idx", 0) for f in frames], dtype=np.int32)
+    view["timestamp_sec"] = np.array([f.get("timestamp_sec", 0) for f in frames], dtype=np.float64)
+    view["face_detected"] = np.array([f.get("face_detected", False) for f in frames], dtype=bool)
+    return view
+
+def load_audio_columns(output_dir) -> dict:
+    """frame_idx / timestamp_sec / rms_energy / pitch_hz arrays, from the .npz or the JSON."""
+    path = Path(output_dir) / AUDIO_COLUMNS_FILE
+    if path.exists():
+        with np.load(path) as data:
+            frame_idx = data["frame_idx"]
+            return {
+                "frame_idx": frame_idx,
+                "timestamp_sec": np.round(frame_idx * float(data["hop_sec"]), 3),
+                "rms_energy": data["rms_energy"] / RMS_SCALE,
+                "pitch_hz": data["pitch_hz"] / PITCH_SCALE
+            }
+
+    with open(Path(output_dir) / "candidate_audio_raw.json") as f:
+        features = json.load(f).get("features", [])
+    return {
+        "frame_idx": np.array([f.get("frame_idx", 0) for f in features], dtype=np.int32),
+        "timestamp_sec": np.array([f.get("timestamp_sec", 0) for f in features], dtype=np.float64),
+        "rms_energy": np.array([f.get("rms_energy", 0) for f in features], dtype=np.float64),
+        "pitch_hz": np.array([f.get("pitch_hz", 0) for f in features], dtype=np.float64)
+    }
+
+def load_video_file(path) -> dict:
+    """Derived per-frame video arrays from one file: a frames .npz or a Stage 1C JSON."""
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path) as data:
+            return derive_video_columns({k: data[k] for k in data.files})
+
+    with open(path) as f:
+        frames = json.load(f).get("extraction", {}).get("frames", [])
+    return _video_view_from_json(frames)
+
+def load_video_columns(output_dir) -> dict:
+    """Derived per-frame video arrays (see derive_video_columns), from the .npz or the JSON."""
+    path = Path(output_dir) / VIDEO_COLUMNS_FILE
+    return load_video_file(path if path.exists() else Path(output_dir) / "candidate_video_raw.json")
@@ -0,0 +1,80 @@
+"""
+Stage 1C: Temporal Face Tracking with Motion Gating
+Interview video is a mostly static head-and-shoulders shot, so most
+sampled frames do not need a full-frame Haar pass:
+
+- motion gate: if a downscaled frame barely differs from the last frame
+  that was actually detected on, the previous result is reused
+- ROI: otherwise detect inside an expanded box around the previous face,
+  falling back to the full frame only on a miss
+"""
+import cv2
+import numpy as np
+
+THUMB_WIDTH = 64          # motion-gate thumbnail width (px)
+MOTION_THRESHOLD = 2.0    # mean absolute grey-level difference on the thumbnail
+ROI_EXPAND = 0.5          # ROI grows the previous bbox by this fraction on every side
+
+class FaceTracker:
+    """Sequential detector; feed frames in frame_idx order."""
+
+    def __init__(self, detect_fn, motion_threshold: float = MOTION_THRESHOLD,
+                 roi_expand: float = ROI_EXPAND):
+        self.detect_fn = detect_fn
+        self.motion_threshold = motion_threshold
+        self.roi_expand = roi_expand
+        self.last_faces = ()
+        self.reference_thumb = None
+        self.stats = {"motion_skip": 0, "roi_hit": 0, "full_frame": 0}
+
+    def _thumbnail(self, gray):
+        h, w = gray.shape[:2]
+        size = (THUMB_WIDTH, max(1, round(h * THUMB_WIDTH / w)))
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+
+    def _detect_roi(self, gray):
+        x, y, w, h = (int(v) for v in self.last_faces[0])
+        pad_x, pad_y = int(w * self.roi_expand), int(h * self.roi_expand)
+        x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+        x1 = min(gray.shape[1], x + w + pad_x)
+        y1 = min(gray.shape[0], y + h + pad_y)
+
+        faces = self.detect_fn(gray[y0:y1, x0:x1])
+        if len(faces) == 0:
+            return ()
+        return np.asarray(faces) + np.array([x0, y0, 0, 0])
+
+    def detect(self, gray):
+        """Faces for this frame, via motion skip, ROI or full-frame detection."""
+        thumb = self._thumbnail(gray)
+        if self.reference_thumb is not None:
+            motion = float(cv2.absdiff(thumb, self.reference_thumb).mean())
+            if motion < self.motion_threshold:
+                self.stats["motion_skip"] += 1
+                return self.last_faces
+
+        # Compare future frames against the last frame we actually detected on,
+        # so slow drift still triggers a fresh detection
+        self.reference_thumb = thumb
+
+        if len(self.last_faces) > 0:
+            faces = self._detect_roi(gray)
+            if len(faces) > 0:
+                self.stats["roi_hit"] += 1
+                self.last_faces = faces
+                return faces
+
+        self.stats["full_frame"] += 1
+        self.last_faces = self.detect_fn(gray)
+        return self.last_faces
+
+    def summary(self) -> dict:
+        total = sum(self.stats.values())
+        return {
+            **self.stats,
+            "frames": total,
+            **{
+                f"{k}_ratio": round(v / total, 4) if total else 0.0
+                for k, v in self.stats.items()
+            }
+        }
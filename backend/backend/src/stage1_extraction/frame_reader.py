@@ -0,0 +1,194 @@
+"""
+Stage 1C: Sampled Frame Readers
+Yield (frame_idx, gray_frame, source_shape) for every Nth frame (or an
+explicit sorted list of target frame indices) without paying colour
+conversion (and, with PyAV, decode) for frames that are thrown away.
+With `detect_width`, frames come out at that working width;
+source_shape (h, w) is what bboxes must be mapped back to.
+
+- "grab": OpenCV; grab() skips unsampled frames, retrieve() only the sampled
+  ones. Pixel-identical to the old read-every-frame loop. Downscaling
+  happens on the grey frame after retrieve().
+- "av":   PyAV with threaded decode; seeks to the keyframe before a target
+  when the next target is far ahead and converts only the targeted frames.
+  At native size frames go through BGR and cv2.cvtColor like "grab", so the
+  two readers are pixel-identical (swscale's own grey output uses different
+  luma coefficients and range handling). With `detect_width`, scaling and
+  grey conversion happen in one swscale pass inside the decoder (no
+  full-size BGR copy).
+  Only gaps longer than SEEK_THRESHOLD_SEC are skipped by seeking: a seek
+  lands on the previous keyframe, so for gaps shorter than the keyframe
+  interval it would decode more, not less. Sparse (speech-gated) target
+  lists therefore still decode every frame across short silences; only
+  conversion is skipped there. Streams without frame timestamps fall back
+  to counting decoded frames and never seek.
+"""
+import itertools
+import time
+import cv2
+
+READERS = ("grab", "av")
+SEEK_THRESHOLD_SEC = 2.0   # PyAV seeks only when the next target is further ahead than this
+
+def working_size(src_w: int, src_h: int, detect_width: int = 0) -> tuple:
+    """(w, h) to detect at; native size when detect_width is 0 or not smaller."""
+    if not detect_width or detect_width >= src_w:
+        return src_w, src_h
+    h = int(round(src_h * detect_width / src_w / 2)) * 2   # keep even for swscale
+    return detect_width, max(2, h)
+
+def _iter_targets(frame_sample_interval: int, targets=None):
+    """Sorted target frame indices: explicit list, or every Nth frame."""
+    if targets is not None:
+        return iter(targets)
+    return itertools.count(0, frame_sample_interval)
+
+def iter_sampled_frames_grab(video_path: str, frame_sample_interval: int = 10,
+                             detect_width: int = 0, targets=None):
+    """OpenCV reader: grab() every frame, retrieve()+gray only sampled ones."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    targets = _iter_targets(frame_sample_interval, targets)
+    target = next(targets, None)
+    frame_idx = 0
+    try:
+        while target is not None:
+            if not cap.grab():
+                break
+            if frame_idx == target:
+                target = next(targets, None)
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                src_h, src_w = gray.shape
+                size = working_size(src_w, src_h, detect_width)
+                if size != (src_w, src_h):
+                    gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+                yield frame_idx, gray, (src_h, src_w)
+            frame_idx += 1
+    finally:
+        cap.release()
+
+def iter_sampled_frames_av(video_path: str, frame_sample_interval: int = 10,
+                           detect_width: int = 0, targets=None,
+                           seek_threshold_sec: float = SEEK_THRESHOLD_SEC):
+    """PyAV reader: keyframe seeks for long jumps, conversion only on target frames."""
+    try:
+        import av
+    except ImportError as e:
+        raise ImportError("The 'av' frame reader requires PyAV (pip install av)") from e
+
+    container = av.open(video_path)
+    try:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+
+        fps = float(stream.average_rate or stream.guessed_rate)
+        time_base = float(stream.time_base)
+        start_pts = stream.start_time or 0
+        seek_threshold = max(int(seek_threshold_sec * fps), frame_sample_interval + 1)
+
+        src_w, src_h = stream.codec_context.width, stream.codec_context.height
+        out_w, out_h = working_size(src_w, src_h, detect_width)
+        native = (out_w, out_h) == (src_w, src_h)
+
+        targets = _iter_targets(frame_sample_interval, targets)
+        target = next(targets, None)
+        seek = False
+        can_seek = True
+        last_idx = -1       # index of the previous decoded frame; None right after a seek
+        while target is not None:
+            if seek:
+                # Far-ahead target: jump to the preceding keyframe instead of decoding the gap
+                target_pts = int(round(target / fps / time_base)) + start_pts
+                container.seek(target_pts, stream=stream, backward=True, any_frame=False)
+                seek = False
+                last_idx = None
+
+            restart = False
+            for frame in container.decode(stream):
+                if frame.pts is not None:
+                    idx = int(round((frame.pts - start_pts) * time_base * fps))
+                elif last_idx is not None:
+                    # No timestamp (some WebM/MKV remuxes): count frames in output order,
+                    # which only holds while decoding straight through
+                    idx = last_idx + 1
+                    can_seek = False
+                else:
+                    # Untimed frame right after a seek: position unknown, decode from the start
+                    can_seek = False
+                    restart = True
+                    break
+                last_idx = idx
+                if idx < target:
+                    continue
+                if idx == target:
+                    if native:
+                        # Same BGR -> grey path as the "grab" reader
+                        gray = cv2.cvtColor(frame.to_ndarray(format="bgr24"), cv2.COLOR_BGR2GRAY)
+                    else:
+                        # swscale: scale + luma extraction in a single pass
+                        gray = frame.reformat(width=out_w, height=out_h, format="gray",
+                                              interpolation="AREA").to_ndarray()
+                    yield idx, gray, (src_h, src_w)
+
+                while target is not None and target <= idx:
+                    target = next(targets, None)
+                if target is None:
+                    return
+                if can_seek and target - idx > seek_threshold:
+                    seek = True
+                    break
+
+            if restart:
+                container.seek(0)
+                last_idx = -1
+            elif not seek:
+                return   # end of stream
+    finally:
+        container.close()
+
+def iter_sampled_frames(video_path: str, frame_sample_interval: int = 10, reader: str = "grab",
+                        detect_width: int = 0, targets=None):
+    """Dispatch to the selected reader. `targets` overrides the fixed interval."""
+    if reader == "grab":
+        return iter_sampled_frames_grab(video_path, frame_sample_interval, detect_width, targets)
+    if reader == "av":
+        return iter_sampled_frames_av(video_path, frame_sample_interval, detect_width, targets)
+    raise ValueError(f"Unknown frame reader: {reader} (expected one of {READERS})")
+
+def benchmark(video_path: str, frame_sample_interval: int = 10, readers=READERS,
+              detect_width: int = 0) -> dict:
+    """Decode throughput of each reader over the whole video."""
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    results = {}
+    for reader in readers:
+        start = time.perf_counter()
+        sampled = sum(1 for _ in iter_sampled_frames(video_path, frame_sample_interval, reader,
+                                                      detect_width))
+        elapsed = time.perf_counter() - start
+        results[reader] = {
+            "sampled_frames": sampled,
+            "seconds": round(elapsed, 3),
+            "sampled_fps": round(sampled / elapsed, 1) if elapsed > 0 else 0.0,
+            "source_fps": round(total_frames / elapsed, 1) if elapsed > 0 else 0.0
+        }
+    return results
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python frame_reader.py <video_path> [frame_sample_interval] [detect_width]")
+        sys.exit(1)
+
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    width = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    for name, stats in benchmark(sys.argv[1], interval, detect_width=width).items():
+        print(f"{name:>5}: {stats['sampled_frames']} frames in {stats['seconds']:.2f}s "
+              f"({stats['source_fps']:.0f} source fps, {stats['sampled_fps']:.0f} sampled fps)")
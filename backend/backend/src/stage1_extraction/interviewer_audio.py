@@ -4,7 +4,10 @@ Stage 1B: Interviewer Audio Transcription (DIRECT PATH VERSION - FIXED SPLITTING
 import json
 from pathlib import Path
 from typing import Dict
-from faster_whisper import WhisperModel
+from stage1_extraction.audio_buffer import ANALYSIS_SAMPLE_RATE, load_audio
+from stage1_extraction.vad import iter_speaking_segments
+from stage1_extraction.transcription import segments_to_dicts, transcribe_chunked
+from stage1_extraction.whisper_service import get_model, transcribe_batched
 
 def normalize_text(text: str) -> str:
     return " ".join(text.lower().strip().split())
@@ -137,41 +140,43 @@ def split_and_merge_questions(segments, pause_split_sec=1.0, max_merge_gap=3.0):
 #
 #     return result
 
-def transcribe(audio_path: str) -> dict:
-    print(f"Loading Whisper model for {audio_path}...")
-    model = WhisperModel("small", device="cpu", compute_type="int8")
-    
-    print("Transcribing interviewer audio...")
-    segments, info = model.transcribe(
-        audio_path, 
-        word_timestamps=True,
-        vad_filter=True,
-        vad_parameters=dict(
-            min_silence_duration_ms=500,  # Back to 500ms
-            speech_pad_ms=200              # Back to 200ms
-        ),
-        condition_on_previous_text=False,
-        compression_ratio_threshold=2.0,
-        log_prob_threshold=-0.8,
-        no_speech_threshold=0.5
-    )
-    
-    raw_segments = []
-    for seg in segments:
-        raw_segments.append({
-            "start_sec": round(seg.start, 3),
-            "end_sec": round(seg.end, 3),
-            "text": seg.text.strip(),
-            "words": [
-                {
-                    "word": w.word,
-                    "start_sec": round(w.start, 3),
-                    "end_sec": round(w.end, 3),
-                    "probability": w.probability
-                }
-                for w in (seg.words or [])
-            ]
-        })
+TRANSCRIBE_OPTIONS = dict(
+    word_timestamps=True,
+    vad_filter=True,
+    vad_parameters=dict(
+        min_silence_duration_ms=500,  # Back to 500ms
+        speech_pad_ms=200              # Back to 200ms
+    ),
+    condition_on_previous_text=False,
+    compression_ratio_threshold=2.0,
+    log_prob_threshold=-0.8,
+    no_speech_threshold=0.5
+)
+
+def transcribe(audio_path: str, workers: int = 1, cpu_threads: int = 4, batch_size: int = 0) -> dict:
+    if batch_size > 0:
+        print("Transcribing interviewer audio (batched, shared model)...")
+        raw_segments, info = transcribe_batched(audio_path, TRANSCRIBE_OPTIONS, batch_size)
+    elif workers > 1:
+        # Chunk at webrtcvad silences of the decoded buffer
+        audio = load_audio(audio_path, ANALYSIS_SAMPLE_RATE)
+        speech = list(iter_speaking_segments(audio, ANALYSIS_SAMPLE_RATE))
+        
+        print("Transcribing interviewer audio (chunked)...")
+        raw_segments, info = transcribe_chunked(
+            audio, speech, TRANSCRIBE_OPTIONS,
+            sample_rate=ANALYSIS_SAMPLE_RATE, workers=workers, cpu_threads=cpu_threads
+        )
+    else:
+        model = get_model(cpu_threads=cpu_threads)
+        
+        print("Transcribing interviewer audio...")
+        segments, info = model.transcribe(audio_path, **TRANSCRIBE_OPTIONS)
+        raw_segments = segments_to_dicts(segments)
+        info = {
+            "language": info.language if hasattr(info, "language") else "unknown",
+            "language_probability": getattr(info, "language_probability", 0.0)
+        }
     
     # Split segments at pauses >= 1 second
     # split_segments = split_long_segments(raw_segments, min_gap=1.0)
@@ -199,12 +204,13 @@ def transcribe(audio_path: str) -> dict:
         recent_window.append((norm, current_time))
     
     return {
-        "language": info.language if hasattr(info, "language") else "unknown",
-        "language_probability": getattr(info, "language_probability", 0.0),
+        "language": info["language"],
+        "language_probability": info["language_probability"],
         "segments": final_segments
     }
 
-def run(interviewer_audio_path: str, output_dir: str) -> dict:
+def run(interviewer_audio_path: str, output_dir: str,
+        transcribe_workers: int = 1, whisper_threads: int = 4, batch_size: int = 0) -> dict:
     """Execute Stage 1B: Interviewer Audio Transcription (DIRECT PATH)."""
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
@@ -214,7 +220,7 @@ def run(interviewer_audio_path: str, output_dir: str) -> dict:
     if not interviewer_audio.exists():
         raise FileNotFoundError(f"Interviewer audio not found: {interviewer_audio}")
     
-    transcription = transcribe(str(interviewer_audio))
+    transcription = transcribe(str(interviewer_audio), transcribe_workers, whisper_threads, batch_size)
     
     output = {
         "dataset_id": interviewer_audio.stem.split('_')[0],
@@ -0,0 +1,154 @@
+"""
+Stage 1: Chunked Whisper Transcription
+Splits audio at VAD-detected silences into independent chunks, transcribes
+them in a process pool and stitches word timestamps back onto the global
+timeline so downstream splitting sees one continuous segment list.
+"""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+MODEL_SIZE = "small"
+DEVICE = "cpu"
+COMPUTE_TYPE = "int8"
+
+TARGET_CHUNK_SEC = 60.0   # cut at the first silence after this much audio
+MAX_CHUNK_SEC = 120.0     # hard cut if no silence shows up
+CHUNK_PAD_SEC = 0.3       # context kept around the first/last speech of a chunk
+
+def segments_to_dicts(segments, offset_sec: float = 0.0) -> list:
+    """Convert faster-whisper segments to the pipeline's dict format on the global timeline."""
+    raw_segments = []
+    for seg in segments:
+        raw_segments.append({
+            "start_sec": round(seg.start + offset_sec, 3),
+            "end_sec": round(seg.end + offset_sec, 3),
+            "text": seg.text.strip(),
+            "words": [
+                {
+                    "word": w.word,
+                    "start_sec": round(w.start + offset_sec, 3),
+                    "end_sec": round(w.end + offset_sec, 3),
+                    "probability": w.probability
+                }
+                for w in (seg.words or [])
+            ]
+        })
+    return raw_segments
+
+def plan_chunks(speech_segments: list, duration_sec: float,
+                target_chunk_sec: float = TARGET_CHUNK_SEC,
+                max_chunk_sec: float = MAX_CHUNK_SEC,
+                pad_sec: float = CHUNK_PAD_SEC) -> list:
+    """
+    Group VAD speech segments into (start_sec, end_sec) chunks.
+    Cuts fall in the middle of silences; pure-silence spans are not transcribed.
+    """
+    speech = sorted(
+        (s["start_sec"], s["end_sec"]) for s in speech_segments
+        if s.get("type", "speaking") == "speaking"
+    )
+    if not speech:
+        return []
+
+    # Split over-long speech runs so no chunk exceeds max_chunk_sec
+    pieces = []
+    for start, end in speech:
+        while end - start > max_chunk_sec:
+            pieces.append((start, start + max_chunk_sec))
+            start += max_chunk_sec
+        pieces.append((start, end))
+
+    groups = []
+    group_start, group_end = pieces[0]
+    for start, end in pieces[1:]:
+        if end - group_start > max_chunk_sec or group_end - group_start >= target_chunk_sec:
+            groups.append((group_start, group_end))
+            group_start = start
+        group_end = end
+    groups.append((group_start, group_end))
+
+    # Pad each group but never past the midpoint of the neighbouring silence
+    chunks = []
+    for i, (start, end) in enumerate(groups):
+        lo = (groups[i - 1][1] + start) / 2 if i > 0 else 0.0
+        hi = (end + groups[i + 1][0]) / 2 if i + 1 < len(groups) else duration_sec
+        chunks.append((max(lo, start - pad_sec), min(hi, end + pad_sec)))
+    return chunks
+
+# -------------------------------------------------
+# Process-pool workers (one WhisperModel per worker)
+# -------------------------------------------------
+_worker_model = None
+
+def _init_worker(model_size: str, device: str, compute_type: str, cpu_threads: int):
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                                 cpu_threads=cpu_threads)
+
+def _transcribe_chunk(job):
+    audio_chunk, offset_sec, options, sample_rate = job
+    segments, info = _worker_model.transcribe(audio_chunk, **options)
+    return {
+        "segments": segments_to_dicts(segments, offset_sec),
+        "language": getattr(info, "language", "unknown"),
+        "language_probability": getattr(info, "language_probability", 0.0),
+        "duration_sec": len(audio_chunk) / sample_rate
+    }
+
+def transcribe_chunked(
+    audio: np.ndarray,
+    speech_segments: list,
+    options: dict,
+    sample_rate: int = 16000,
+    workers: int = 4,
+    cpu_threads: int = 4,
+    target_chunk_sec: float = TARGET_CHUNK_SEC
+) -> tuple:
+    """
+    Transcribe VAD-delimited chunks of `audio` in parallel.
+    Returns (raw_segments, info) where info carries language and timing.
+    """
+    start = time.perf_counter()
+    duration_sec = len(audio) / sample_rate
+    chunks = plan_chunks(speech_segments, duration_sec, target_chunk_sec)
+    print(f"Chunked transcription: {len(chunks)} chunks, {workers} workers x {cpu_threads} threads")
+
+    jobs = [
+        (audio[int(s * sample_rate):int(e * sample_rate)], s, options, sample_rate)
+        for s, e in chunks
+    ]
+
+    results = []
+    if jobs:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(MODEL_SIZE, DEVICE, COMPUTE_TYPE, cpu_threads)
+        ) as pool:
+            results = list(pool.map(_transcribe_chunk, jobs))
+
+    # Chunks are disjoint and in time order, so concatenation is already sorted
+    raw_segments = [seg for r in results for seg in r["segments"]]
+
+    # Language = the one covering the most audio
+    votes = {}
+    for r in results:
+        votes[r["language"]] = votes.get(r["language"], 0.0) + r["duration_sec"]
+    language = max(votes, key=votes.get) if votes else "unknown"
+    language_probability = max(
+        (r["language_probability"] for r in results if r["language"] == language),
+        default=0.0
+    )
+
+    info = {
+        "language": language,
+        "language_probability": language_probability,
+        "chunks": len(chunks),
+        "wall_sec": round(time.perf_counter() - start, 3)
+    }
+    return raw_segments, info
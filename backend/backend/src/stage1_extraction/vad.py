@@ -0,0 +1,130 @@
+"""
+Stage 1A: Streaming webrtcvad Front-end
+Converts the shared buffer to int16 PCM once, walks 30 ms frames as
+zero-copy memoryview slices and emits speaking segments lazily.
+A hangover stage keeps short dropouts from fragmenting segments.
+"""
+import numpy as np
+import webrtcvad
+
+FRAME_MS = 30            # webrtcvad accepts 10/20/30 ms frames
+DEFAULT_LEVEL = 2
+HANGOVER_MS = 300        # silence shorter than this does not close a segment
+MIN_SPEECH_MS = 0        # drop segments shorter than this (0 = keep all)
+
+def to_pcm16(y: np.ndarray) -> bytes:
+    """Convert a float buffer in [-1, 1] to little-endian int16 PCM, once."""
+    return (np.clip(y, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+def iter_frames(pcm: bytes, sample_rate: int, frame_ms: int = FRAME_MS):
+    """Yield (start_sample, memoryview) for every complete frame; no copies."""
+    frame_samples = int(sample_rate * frame_ms / 1000)
+    frame_bytes = frame_samples * 2
+    view = memoryview(pcm)
+    for offset in range(0, len(view) - frame_bytes + 1, frame_bytes):
+        yield offset // 2, view[offset:offset + frame_bytes]
+
+class SegmentBuilder:
+    """Turns per-frame speech flags into speaking segments with hangover/merge."""
+
+    def __init__(self, sample_rate: int, frame_samples: int,
+                 hangover_ms: int = HANGOVER_MS, min_speech_ms: int = MIN_SPEECH_MS):
+        self.sample_rate = sample_rate
+        self.frame_samples = frame_samples
+        self.hangover_frames = int(hangover_ms / (1000 * frame_samples / sample_rate))
+        self.min_speech_sec = min_speech_ms / 1000
+        self.speaking = False
+        self.start = 0
+        self.last_speech_end = 0
+        self.silence_frames = 0
+
+    def _segment(self, start: int, end: int):
+        start_sec = start / self.sample_rate
+        end_sec = end / self.sample_rate
+        if end_sec - start_sec < self.min_speech_sec:
+            return None
+        return {
+            "start_sec": round(start_sec, 3),
+            "end_sec": round(end_sec, 3),
+            "type": "speaking"
+        }
+
+    def push(self, frame_start: int, is_speech: bool):
+        """Feed one frame; returns a closed segment or None."""
+        if is_speech:
+            if not self.speaking:
+                self.speaking = True
+                self.start = frame_start
+            self.silence_frames = 0
+            self.last_speech_end = frame_start + self.frame_samples
+            return None
+
+        if not self.speaking:
+            return None
+
+        self.silence_frames += 1
+        if self.silence_frames > self.hangover_frames:
+            self.speaking = False
+            return self._segment(self.start, self.last_speech_end)
+        return None
+
+    def finish(self, total_samples: int):
+        """Close a segment still open at end of audio."""
+        if not self.speaking:
+            return None
+        self.speaking = False
+        end = total_samples if self.silence_frames == 0 else self.last_speech_end
+        return self._segment(self.start, end)
+
+def iter_speaking_segments(
+    y: np.ndarray,
+    sample_rate: int,
+    level: int = DEFAULT_LEVEL,
+    hangover_ms: int = HANGOVER_MS,
+    min_speech_ms: int = MIN_SPEECH_MS,
+    pcm: bytes = None
+):
+    """Lazily yield speaking segments for one aggressiveness level."""
+    pcm = to_pcm16(y) if pcm is None else pcm
+    vad = webrtcvad.Vad(level)
+    frame_samples = int(sample_rate * FRAME_MS / 1000)
+    builder = SegmentBuilder(sample_rate, frame_samples, hangover_ms, min_speech_ms)
+
+    for frame_start, frame in iter_frames(pcm, sample_rate):
+        seg = builder.push(frame_start, vad.is_speech(frame, sample_rate))
+        if seg:
+            yield seg
+
+    seg = builder.finish(len(pcm) // 2)
+    if seg:
+        yield seg
+
+def detect_levels(
+    y: np.ndarray,
+    sample_rate: int,
+    levels=(DEFAULT_LEVEL,),
+    hangover_ms: int = HANGOVER_MS,
+    min_speech_ms: int = MIN_SPEECH_MS
+) -> dict:
+    """Run several aggressiveness levels in a single pass over the frames."""
+    pcm = to_pcm16(y)
+    frame_samples = int(sample_rate * FRAME_MS / 1000)
+    vads = {level: webrtcvad.Vad(level) for level in levels}
+    builders = {
+        level: SegmentBuilder(sample_rate, frame_samples, hangover_ms, min_speech_ms)
+        for level in levels
+    }
+    segments = {level: [] for level in levels}
+
+    for frame_start, frame in iter_frames(pcm, sample_rate):
+        for level, vad in vads.items():
+            seg = builders[level].push(frame_start, vad.is_speech(frame, sample_rate))
+            if seg:
+                segments[level].append(seg)
+
+    for level, builder in builders.items():
+        seg = builder.finish(len(pcm) // 2)
+        if seg:
+            segments[level].append(seg)
+
+    return segments
@@ -0,0 +1,70 @@
+"""
+Stage 1A/1B: Shared Whisper Service (in-process)
+Loads the Whisper model once per process and transcribes both audio
+channels concurrently through faster-whisper's batched inference.
+Each channel keeps its own VAD parameters and initial_prompt.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from faster_whisper import BatchedInferencePipeline, WhisperModel
+from stage1_extraction.transcription import MODEL_SIZE, DEVICE, COMPUTE_TYPE, segments_to_dicts
+
+BATCH_SIZE = 8
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_model(num_workers: int = 1, cpu_threads: int = 0) -> WhisperModel:
+    """
+    Return the process-wide WhisperModel, loading it on first use.
+    `num_workers` (concurrent transcribe calls) only applies to that first load.
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            print(f"Loading shared Whisper model ({MODEL_SIZE}, {num_workers} workers)...")
+            _model = WhisperModel(
+                MODEL_SIZE,
+                device=DEVICE,
+                compute_type=COMPUTE_TYPE,
+                cpu_threads=cpu_threads,
+                num_workers=num_workers
+            )
+        return _model
+
+def transcribe_batched(audio, options: dict, batch_size: int = BATCH_SIZE) -> tuple:
+    """Batched transcription of one channel on the shared model. Returns (raw_segments, info)."""
+    pipeline = BatchedInferencePipeline(model=get_model())
+    segments, info = pipeline.transcribe(audio, batch_size=batch_size, **options)
+    raw_segments = segments_to_dicts(segments)
+    return raw_segments, {
+        "language": getattr(info, "language", "unknown"),
+        "language_probability": getattr(info, "language_probability", 0.0)
+    }
+
+def run_shared(
+    candidate_audio_path: str,
+    interviewer_audio_path: str,
+    output_dir: str,
+    timeline: dict,
+    batch_size: int = BATCH_SIZE,
+    cpu_threads: int = 0,
+    json_frames: bool = True,
+    vad_levels=None
+) -> dict:
+    """Run Stages 1A and 1B together in one process on a single Whisper model."""
+    from stage1_extraction import candidate_audio, interviewer_audio
+
+    # Load once, sized for both channels transcribing at the same time
+    get_model(num_workers=2, cpu_threads=cpu_threads)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        cand = pool.submit(
+            candidate_audio.run, candidate_audio_path, output_dir, timeline,
+            batch_size=batch_size, json_frames=json_frames, vad_levels=vad_levels
+        )
+        inter = pool.submit(
+            interviewer_audio.run, interviewer_audio_path, output_dir,
+            batch_size=batch_size
+        )
+        return {"candidate": cand.result(), "interviewer": inter.result()}
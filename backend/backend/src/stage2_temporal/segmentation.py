@@ -4,50 +4,52 @@ RULE:
 - Answer for Question i = ALL candidate speech that STARTS between question_i.end_sec and question_(i+1).start_sec
 """
 import json
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from stage1_extraction.columnar import VIDEO_COLUMNS_FILE, load_video_file
+from stage2_temporal.intervals import TimeIndex
+
 # -------------------------------------------------
 # Speaking Segments
 # -------------------------------------------------
 def build_speaking_segments(candidate_audio_path, video_data_path, timeline_path):
     with open(candidate_audio_path) as f:
         cand_audio = json.load(f)
-    with open(video_data_path) as f:
-        video = json.load(f)
     with open(timeline_path) as f:
         timeline = json.load(f)
     
+    # Frame index/timestamp columns from the given file; Stage 1C's own
+    # candidate_video_raw.json is read through the .npz written next to it
+    video_data_path = Path(video_data_path)
+    npz = video_data_path.with_name(VIDEO_COLUMNS_FILE)
+    if video_data_path.name == "candidate_video_raw.json" and npz.exists():
+        video_data_path = npz
+    video = load_video_file(video_data_path)
+    
     vad_segments = cand_audio.get("vad_segments", [])
-    video_frames = video.get("extraction", {}).get("frames", [])
     video_duration = timeline.get("video", {}).get("duration_sec", 0)
     
-    frame_lookup = {
-        f["timestamp_sec"]: f["frame_idx"]
-        for f in video_frames
-        if "timestamp_sec" in f
-    }
+    # Interval join over sorted frame timestamps: all segments in one batch query
+    speaking = [v for v in vad_segments if v.get("type") == "speaking"]
+    frame_positions = TimeIndex(video["timestamp_sec"]).batch(
+        [v["start_sec"] for v in speaking],
+        [v["end_sec"] for v in speaking]
+    )
     
     segments = []
-    idx = 1
-    for vad in vad_segments:
-        if vad.get("type") != "speaking":
-            continue
+    for idx, (vad, positions) in enumerate(zip(speaking, frame_positions), start=1):
         start = vad["start_sec"]
         end = vad["end_sec"]
-        frames = [
-            frame_lookup[t]
-            for t in frame_lookup
-            if start <= t <= end
-        ]
         segments.append({
             "segment_id": f"SEG{idx}",
             "type": "speaking",
             "start_time": start,
             "end_time": end,
             "duration_sec": round(end - start, 3),
-            "video_frames": frames
+            "video_frames": video["frame_idx"][positions].tolist()
         })
-        idx += 1
     
     return {
         "dataset_id": cand_audio.get("dataset_id", "2"),
@@ -82,6 +84,9 @@ def build_qa_pairs(interviewer_path, candidate_audio_path):
         if duration > 10.0:
             q["end_sec"] = q["start_sec"] + 10.0
     
+    # Index over candidate segment starts; each answer window is one range query
+    cand_index = TimeIndex([seg["start_sec"] for seg in cand_segments])
+    
     qa_pairs = []
     for i, q in enumerate(questions):
         q_start = q["start_sec"]
@@ -98,15 +103,11 @@ def build_qa_pairs(interviewer_path, candidate_audio_path):
             answer_end = cand_segments[-1]["end_sec"] if cand_segments else q_end + 60
         
         # Collect candidate segments - ONLY if they START in the window
-        answer_parts = []
-        used_segments = []
-        for seg in cand_segments:
-            seg_start = seg["start_sec"]
-            
-            # Include ONLY if segment STARTS in our window
-            if answer_start <= seg_start < answer_end:
-                answer_parts.append(seg["text"].strip())
-                used_segments.append(seg)
+        used_segments = [
+            cand_segments[j]
+            for j in cand_index.range(answer_start, answer_end, closed="left").tolist()
+        ]
+        answer_parts = [seg["text"].strip() for seg in used_segments]
         
         if answer_parts:
             answer = {
@@ -140,27 +141,31 @@ def build_qa_pairs(interviewer_path, candidate_audio_path):
 # -------------------------------------------------
 # Runner
 # -------------------------------------------------
-def run(output_dir):
+def run_speaking_segments(output_dir):
+    """Speaking segments only (needs Stage 0, 1A and 1C)."""
     out = Path(output_dir)
-    candidate_audio = out / "candidate_audio_raw.json"
-    interviewer = out / "interviewer_transcript.json"
-    video = out / "candidate_video_raw.json"
-    timeline = out / "timeline.json"
-    
     print("Building speaking segments...")
-    segments = build_speaking_segments(candidate_audio, video, timeline)
-    
-    print("Building Q&A pairs...")
-    qa = build_qa_pairs(interviewer, candidate_audio)
-    
+    segments = build_speaking_segments(
+        out / "candidate_audio_raw.json", out / "candidate_video_raw.json", out / "timeline.json"
+    )
     with open(out / "speaking_segments.json", "w") as f:
         json.dump(segments, f, indent=2)
-    
+    return segments
+
+def run_qa_pairs(output_dir):
+    """Q&A pairs only (needs Stage 1A and 1B)."""
+    out = Path(output_dir)
+    print("Building Q&A pairs...")
+    qa = build_qa_pairs(out / "interviewer_transcript.json", out / "candidate_audio_raw.json")
     with open(out / "qa_pairs.json", "w") as f:
         json.dump(qa, f, indent=2)
-    
-    print("Stage 2 complete")
     print("Questions:", qa["total_pairs"])
+    return qa
+
+def run(output_dir):
+    run_speaking_segments(output_dir)
+    run_qa_pairs(output_dir)
+    print("Stage 2 complete")
 
 if __name__ == "__main__":
     import sys
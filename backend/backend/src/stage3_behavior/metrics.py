@@ -5,179 +5,243 @@ Computes NUMERIC behavioral proxies from audio/video signals.
 No emotion detection, no semantic inference, no evaluation.
 """
 import json
+import sys
 from pathlib import Path
 import numpy as np
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from stage1_extraction.columnar import load_audio_columns, load_video_columns
+from stage2_temporal.intervals import TimeIndex
 
-def compute_audio_metrics(audio_features: list, segment_start: float, segment_end: float) -> dict:
-    """Compute audio metrics for a speaking segment."""
-    
-    # Filter features to this segment
-    seg_features = [
-        f for f in audio_features
-        if segment_start <= f.get("timestamp_sec", 0) <= segment_end
-    ]
-    
-    if not seg_features:
-        return {
-            "pitch_mean": 0.0,
-            "pitch_variance": 0.0,
-            "energy_mean": 0.0,
-            "energy_variance": 0.0,
-            "speech_rate": 0.0,
-            "pause_density": 0.0,
-            "prosodic_variability": 0.0
-        }
-    
-    # Extract pitch and energy values
-    pitches = [f.get("pitch_hz", 0) for f in seg_features if f.get("pitch_hz", 0) > 0]
-    energies = [f.get("rms_energy", 0) for f in seg_features]
-    
-    # Pitch metrics
-    pitch_mean = float(np.mean(pitches)) if pitches else 0.0
-    pitch_variance = float(np.var(pitches)) if len(pitches) > 1 else 0.0
-    
-    # Energy metrics
-    energy_mean = float(np.mean(energies)) if energies else 0.0
-    energy_variance = float(np.var(energies)) if len(energies) > 1 else 0.0
+
+# Output metrics and the decimals each is rounded to
+AUDIO_METRIC_DECIMALS = {
+    "pitch_mean": 2, "pitch_variance": 2, "energy_mean": 6, "energy_variance": 8,
+    "speech_rate": 4, "pause_density": 4, "prosodic_variability": 6
+}
+VIDEO_METRIC_DECIMALS = {
+    "face_presence_ratio": 4, "head_motion_mean": 4, "head_motion_variance": 4,
+    "gaze_stability": 6, "facial_motion_intensity": 6, "expression_change_rate": 6
+}
+
+SERIES_WINDOW_SEC = 5.0   # rolling-window length
+SERIES_STEP_SEC = 1.0     # rolling-window step
+
+
+# -------------------------------------------------
+# Prefix-sum range statistics
+# All helpers take [lo, hi) bounds arrays, one pair per segment, into a
+# time-sorted array and return one value per segment.
+# -------------------------------------------------
+def _range_mean_var(values: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> tuple:
+    """Count, mean and population variance of values[lo:hi] from cumulative sums."""
+    # Shift by the global mean so sum-of-squares does not cancel catastrophically
+    shift = float(values.mean()) if len(values) else 0.0
+    x = values - shift
+    c1 = np.concatenate(([0.0], np.cumsum(x)))
+    c2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    n = hi - lo
+    safe_n = np.maximum(n, 1)
+    mean = (c1[hi] - c1[lo]) / safe_n
+    var = np.maximum((c2[hi] - c2[lo]) / safe_n - mean * mean, 0.0)
+    return n, mean + shift, var
+
+def _subset_bounds(mask: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> tuple:
+    """Map bounds into an array onto bounds into array[mask]."""
+    c = np.concatenate(([0], np.cumsum(mask)))
+    return c[lo], c[hi]
+
+def _delta_bounds(lo: np.ndarray, hi: np.ndarray) -> tuple:
+    """Bounds into np.diff(values) covering consecutive pairs inside [lo, hi)."""
+    # Empty ranges at the very end (lo == hi == len(values)) must stay inside the diff array
+    d_lo = np.minimum(lo, np.maximum(hi - 1, 0))
+    return d_lo, np.maximum(hi - 1, d_lo)
+
+def _range_abs_delta_mean(values: np.ndarray, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Mean |x[i+1] - x[i]| over consecutive pairs inside each [lo, hi); 0 if < 2 values."""
+    d_lo, d_hi = _delta_bounds(lo, hi)
+    n, mean, _ = _range_mean_var(np.abs(np.diff(values)), d_lo, d_hi)
+    return np.where(n > 0, mean, 0.0)
+
+def _range_count_below(values: np.ndarray, lo: np.ndarray, hi: np.ndarray,
+                       thresholds: np.ndarray) -> np.ndarray:
+    """Per-segment count of values[lo:hi] < threshold, via one flat repeated mask."""
+    lengths = hi - lo
+    if lengths.sum() == 0:
+        return np.zeros(len(lo), dtype=np.int64)
+    seg = np.repeat(np.arange(len(lo)), lengths)
+    pos = np.arange(len(seg)) - np.repeat(np.cumsum(lengths) - lengths - lo, lengths)
+    below = values[pos] < thresholds[seg]
+    return np.bincount(seg, weights=below, minlength=len(lo)).astype(np.int64)
+
+def _sorted_bounds(columns: dict, index: TimeIndex, starts, ends) -> tuple:
+    """Time-sorted copies of the columns plus [lo, hi) bounds for every segment."""
+    if not index.identity:
+        columns = {k: v[index.order] for k, v in columns.items()}
+    lo, hi = index.bounds(np.asarray(starts, dtype=np.float64), np.asarray(ends, dtype=np.float64))
+    return columns, lo, hi
+
+
+def _to_dicts(arrays: dict, decimals: dict) -> list:
+    """Per-segment rounded metric dicts from metric arrays."""
+    columns = [[round(v, decimals[k]) for v in arrays[k].tolist()] for k in decimals]
+    return [dict(zip(decimals, row)) for row in zip(*columns)]
+
+def audio_metric_arrays(audio_features: dict, starts, ends, index: TimeIndex = None) -> dict:
+    """Unrounded audio metrics for every [start, end] interval in one vectorised pass."""
+    index = index or TimeIndex(audio_features["timestamp_sec"])
+    cols, lo, hi = _sorted_bounds(
+        {"rms": audio_features["rms_energy"], "pitch": audio_features["pitch_hz"]},
+        index, starts, ends
+    )
+    rms, pitch = cols["rms"], cols["pitch"]
+    
+    # Energy over all frames in the segment
+    count, energy_mean, energy_var = _range_mean_var(rms, lo, hi)
+    energy_variability = _range_abs_delta_mean(rms, lo, hi)
+    
+    # Pitch over voiced frames only (deltas between consecutive voiced frames)
+    voiced = pitch > 0
+    v_lo, v_hi = _subset_bounds(voiced, lo, hi)
+    pitch_count, pitch_mean, pitch_var = _range_mean_var(pitch[voiced], v_lo, v_hi)
+    pitch_variability = _range_abs_delta_mean(pitch[voiced], v_lo, v_hi)
     
     # Speech rate (approximate using segment duration / feature count)
-    duration = segment_end - segment_start
-    feature_count = len(seg_features)
-    speech_rate = feature_count / duration if duration > 0 else 0.0
+    duration = np.asarray(ends, dtype=np.float64) - np.asarray(starts, dtype=np.float64)
+    speech_rate = np.where(duration > 0, count / np.where(duration > 0, duration, 1.0), 0.0)
     
     # Pause density (low energy frames / total frames)
-    energy_threshold = energy_mean * 0.1 if energy_mean > 0 else 0.001
-    pause_count = sum(1 for e in energies if e < energy_threshold)
-    pause_density = pause_count / len(energies) if energies else 0.0
-    
-    # Prosodic variability (Δ pitch + Δ energy)
-    if len(pitches) > 1:
-        pitch_deltas = np.diff(pitches)
-        pitch_variability = float(np.mean(np.abs(pitch_deltas)))
-    else:
-        pitch_variability = 0.0
-    
-    if len(energies) > 1:
-        energy_deltas = np.diff(energies)
-        energy_variability = float(np.mean(np.abs(energy_deltas)))
-    else:
-        energy_variability = 0.0
-    
-    prosodic_variability = pitch_variability + energy_variability
+    thresholds = np.where(energy_mean > 0, energy_mean * 0.1, 0.001)
+    pause_density = _range_count_below(rms, lo, hi, thresholds) / np.maximum(count, 1)
     
+    voiced_any = pitch_count > 0
     return {
-        "pitch_mean": round(pitch_mean, 2),
-        "pitch_variance": round(pitch_variance, 2),
-        "energy_mean": round(energy_mean, 6),
-        "energy_variance": round(energy_variance, 8),
-        "speech_rate": round(speech_rate, 4),
-        "pause_density": round(pause_density, 4),
-        "prosodic_variability": round(prosodic_variability, 6)
+        "pitch_mean": np.where(voiced_any, pitch_mean, 0.0),
+        "pitch_variance": np.where(pitch_count > 1, pitch_var, 0.0),
+        "energy_mean": np.where(count > 0, energy_mean, 0.0),
+        "energy_variance": np.where(count > 1, energy_var, 0.0),
+        "speech_rate": np.where(count > 0, speech_rate, 0.0),
+        "pause_density": np.where(count > 0, pause_density, 0.0),
+        "prosodic_variability": pitch_variability + energy_variability
     }
 
 
-def compute_video_metrics(video_frames: list, segment_start: float, segment_end: float) -> dict:
-    """Compute video metrics for a speaking segment."""
-    
-    # Filter frames to this segment
-    seg_frames = [
-        f for f in video_frames
-        if segment_start <= f.get("timestamp_sec", 0) <= segment_end
-    ]
-    
-    total_frames = len(seg_frames)
-    
-    if total_frames == 0:
-        return {
-            "face_presence_ratio": 0.0,
-            "head_motion_mean": 0.0,
-            "head_motion_variance": 0.0,
-            "gaze_stability": 0.0,
-            "facial_motion_intensity": 0.0,
-            "expression_change_rate": 0.0
-        }
+def video_metric_arrays(video_frames: dict, starts, ends, index: TimeIndex = None) -> dict:
+    """Unrounded video metrics for every [start, end] interval in one vectorised pass."""
+    index = index or TimeIndex(video_frames["timestamp_sec"])
+    cols, lo, hi = _sorted_bounds(
+        {k: video_frames[k] for k in ("face_detected", "yaw", "pitch", "roll",
+                                      "gaze_x", "gaze_y", "centroid_x", "centroid_y")},
+        index, starts, ends
+    )
+    total = hi - lo
     
     # Face presence ratio
-    face_detected_count = sum(1 for f in seg_frames if f.get("face_detected", False))
-    face_presence_ratio = face_detected_count / total_frames
-    
-    # Head motion (yaw + pitch + roll deltas)
-    head_poses = []
-    for f in seg_frames:
-        pose = f.get("head_pose")
-        if pose:
-            head_poses.append([
-                pose.get("yaw", 0),
-                pose.get("pitch", 0),
-                pose.get("roll", 0)
-            ])
-    
-    head_motions = []
-    if len(head_poses) > 1:
-        for i in range(1, len(head_poses)):
-            delta = np.linalg.norm(
-                np.array(head_poses[i]) - np.array(head_poses[i-1])
-            )
-            head_motions.append(delta)
-    
-    head_motion_mean = float(np.mean(head_motions)) if head_motions else 0.0
-    head_motion_variance = float(np.var(head_motions)) if len(head_motions) > 1 else 0.0
+    face_count, face_ratio, _ = _range_mean_var(cols["face_detected"].astype(np.float64), lo, hi)
     
-    # Gaze stability (variance of gaze offsets)
-    gaze_x = [f.get("gaze", {}).get("offset_x", 0) for f in seg_frames if f.get("gaze")]
-    gaze_y = [f.get("gaze", {}).get("offset_y", 0) for f in seg_frames if f.get("gaze")]
-    
-    gaze_x_var = float(np.var(gaze_x)) if len(gaze_x) > 1 else 0.0
-    gaze_y_var = float(np.var(gaze_y)) if len(gaze_y) > 1 else 0.0
-    gaze_stability = gaze_x_var + gaze_y_var
-    
-    # Facial motion intensity (landmark movement)
-    landmark_positions = []
-    for f in seg_frames:
-        landmarks = f.get("landmarks", [])
-        if landmarks:
-            positions = [(lm.get("x", 0), lm.get("y", 0)) for lm in landmarks]
-            if positions:
-                centroid = np.mean(positions, axis=0)
-                landmark_positions.append(centroid)
-    
-    facial_motions = []
-    if len(landmark_positions) > 1:
-        for i in range(1, len(landmark_positions)):
-            delta = np.linalg.norm(
-                landmark_positions[i] - landmark_positions[i-1]
-            )
-            facial_motions.append(delta)
-    
-    facial_motion_intensity = float(np.mean(facial_motions)) if facial_motions else 0.0
-    
-    # Expression change rate (frame-to-frame landmark deltas)
-    expression_change_rate = float(np.mean(facial_motions)) if facial_motions else 0.0
+    # Head motion: |Δ(yaw, pitch, roll)| between consecutive frames that have a pose
+    has_pose = ~np.isnan(cols["yaw"])
+    poses = np.stack([cols["yaw"], cols["pitch"], cols["roll"]], axis=1)[has_pose]
+    p_lo, p_hi = _subset_bounds(has_pose, lo, hi)
+    head_motions = np.linalg.norm(np.diff(poses, axis=0), axis=1)
+    motion_count, motion_mean, motion_var = _range_mean_var(head_motions, *_delta_bounds(p_lo, p_hi))
     
+    # Gaze stability (variance of gaze offsets)
+    gaze_var = []
+    for key in ("gaze_x", "gaze_y"):
+        has_gaze = ~np.isnan(cols[key])
+        g_lo, g_hi = _subset_bounds(has_gaze, lo, hi)
+        n, _, var = _range_mean_var(cols[key][has_gaze], g_lo, g_hi)
+        gaze_var.append(np.where(n > 1, var, 0.0))
+    gaze_stability = gaze_var[0] + gaze_var[1]
+    
+    # Facial motion intensity / expression change rate (landmark centroid movement)
+    has_landmarks = ~np.isnan(cols["centroid_x"])
+    centroids = np.stack([cols["centroid_x"], cols["centroid_y"]], axis=1)[has_landmarks]
+    l_lo, l_hi = _subset_bounds(has_landmarks, lo, hi)
+    facial_motions = np.linalg.norm(np.diff(centroids, axis=0), axis=1)
+    facial_count, facial_mean, _ = _range_mean_var(facial_motions, *_delta_bounds(l_lo, l_hi))
+    
+    facial = np.where(facial_count > 0, facial_mean, 0.0)
     return {
-        "face_presence_ratio": round(face_presence_ratio, 4),
-        "head_motion_mean": round(head_motion_mean, 4),
-        "head_motion_variance": round(head_motion_variance, 4),
-        "gaze_stability": round(gaze_stability, 6),
-        "facial_motion_intensity": round(facial_motion_intensity, 6),
-        "expression_change_rate": round(expression_change_rate, 6)
+        "face_presence_ratio": np.where(total > 0, face_ratio, 0.0),
+        "head_motion_mean": np.where(motion_count > 0, motion_mean, 0.0),
+        "head_motion_variance": np.where(motion_count > 1, motion_var, 0.0),
+        "gaze_stability": gaze_stability,
+        "facial_motion_intensity": facial,
+        "expression_change_rate": facial
     }
 
 
-def run(output_dir: str) -> dict:
-    """Execute Stage 3: Behavioral Metrics Extraction."""
+def compute_audio_metrics_batch(audio_features: dict, starts, ends,
+                                index: TimeIndex = None) -> list:
+    """Audio metrics for every [start, end] segment in one vectorised pass."""
+    return _to_dicts(audio_metric_arrays(audio_features, starts, ends, index), AUDIO_METRIC_DECIMALS)
+
+
+def compute_video_metrics_batch(video_frames: dict, starts, ends,
+                                index: TimeIndex = None) -> list:
+    """Video metrics for every [start, end] segment in one vectorised pass."""
+    return _to_dicts(video_metric_arrays(video_frames, starts, ends, index), VIDEO_METRIC_DECIMALS)
+
+
+def compute_rolling_series(audio_features: dict, video_frames: dict,
+                           window_sec: float = SERIES_WINDOW_SEC,
+                           step_sec: float = SERIES_STEP_SEC) -> dict:
+    """
+    Fixed-step rolling-window series of every audio/video metric over the
+    whole interview. Windows are [t, t + window_sec] for t = 0, step, 2*step...
+    and go through the same prefix-sum pass as the segments, so cost is
+    O(n + windows * log n). Stored as parallel arrays; window i starts at
+    start_sec + i * step_sec.
+    """
+    last = max(
+        float(audio_features["timestamp_sec"].max()) if len(audio_features["timestamp_sec"]) else 0.0,
+        float(video_frames["timestamp_sec"].max()) if len(video_frames["timestamp_sec"]) else 0.0
+    )
+    starts = np.round(np.arange(0.0, max(last - window_sec, 0.0) + step_sec / 2, step_sec), 3)
+    ends = starts + window_sec
+    
+    audio = audio_metric_arrays(audio_features, starts, ends)
+    video = video_metric_arrays(video_frames, starts, ends)
+    return {
+        "window_sec": window_sec,
+        "step_sec": step_sec,
+        "start_sec": 0.0,
+        "count": len(starts),
+        "audio": {k: np.round(audio[k], d).tolist() for k, d in AUDIO_METRIC_DECIMALS.items()},
+        "video": {k: np.round(video[k], d).tolist() for k, d in VIDEO_METRIC_DECIMALS.items()}
+    }
+
+
+def compute_audio_metrics(audio_features: dict, segment_start: float, segment_end: float,
+                          index: TimeIndex = None) -> dict:
+    """Compute audio metrics for a speaking segment from the audio feature columns."""
+    return compute_audio_metrics_batch(audio_features, [segment_start], [segment_end], index)[0]
+
+
+def compute_video_metrics(video_frames: dict, segment_start: float, segment_end: float,
+                          index: TimeIndex = None) -> dict:
+    """Compute video metrics for a speaking segment from the derived video columns."""
+    return compute_video_metrics_batch(video_frames, [segment_start], [segment_end], index)[0]
+
+
+def run(output_dir: str, series: bool = True, window_sec: float = SERIES_WINDOW_SEC,
+        step_sec: float = SERIES_STEP_SEC) -> dict:
+    """
+    Execute Stage 3: Behavioral Metrics Extraction.
+    With `series`, also writes rolling-window metric series to
+    candidate_behavior_series.json.
+    """
     output_path = Path(output_dir)
     
     # Load inputs
     with open(output_path / "speaking_segments.json") as f:
         segments_data = json.load(f)
     
-    with open(output_path / "candidate_audio_raw.json") as f:
-        audio_data = json.load(f)
-    
-    with open(output_path / "candidate_video_raw.json") as f:
-        video_data = json.load(f)
+    # Per-frame columns (.npz written by Stage 1, or the JSON frame lists)
+    audio_features = load_audio_columns(output_path)
+    video_frames = load_video_columns(output_path)
     
     # Get speaking segments only
     speaking_segments = [
@@ -185,28 +249,22 @@ def run(output_dir: str) -> dict:
         if s.get("type") == "speaking"
     ]
     
-    # Get audio features and video frames
-    audio_features = audio_data.get("features", [])
-    video_frames = video_data.get("extraction", {}).get("frames", [])
-    
-    # Compute metrics for each speaking segment
-    segment_metrics = []
-    
-    for seg in speaking_segments:
-        seg_id = seg.get("segment_id")
-        seg_start = seg.get("start_time")
-        seg_end = seg.get("end_time")
-        
-        audio_metrics = compute_audio_metrics(audio_features, seg_start, seg_end)
-        video_metrics = compute_video_metrics(video_frames, seg_start, seg_end)
-        
-        segment_metrics.append({
-            "segment_id": seg_id,
-            "start_time": seg_start,
-            "end_time": seg_end,
-            "audio_metrics": audio_metrics,
-            "video_metrics": video_metrics
-        })
+    # Compute metrics for all speaking segments in one vectorised pass
+    starts = [s.get("start_time") for s in speaking_segments]
+    ends = [s.get("end_time") for s in speaking_segments]
+    audio_metrics = compute_audio_metrics_batch(audio_features, starts, ends)
+    video_metrics = compute_video_metrics_batch(video_frames, starts, ends)
+    
+    segment_metrics = [
+        {
+            "segment_id": seg.get("segment_id"),
+            "start_time": seg.get("start_time"),
+            "end_time": seg.get("end_time"),
+            "audio_metrics": audio,
+            "video_metrics": video
+        }
+        for seg, audio, video in zip(speaking_segments, audio_metrics, video_metrics)
+    ]
     
     # Build output
     output = {
@@ -215,6 +273,18 @@ def run(output_dir: str) -> dict:
         "segments": segment_metrics
     }
     
+    if series:
+        rolling = compute_rolling_series(audio_features, video_frames, window_sec, step_sec)
+        # Parallel arrays, no indentation: one list per metric instead of one dict per window
+        with open(output_path / "candidate_behavior_series.json", "w") as f:
+            json.dump(rolling, f, separators=(",", ":"))
+        output["series"] = {
+            "file": "candidate_behavior_series.json",
+            "window_sec": window_sec,
+            "step_sec": step_sec,
+            "count": rolling["count"]
+        }
+    
     # Save output
     with open(output_path / "candidate_behavior_metrics.json", "w") as f:
         json.dump(output, f, indent=2)
@@ -222,6 +292,9 @@ def run(output_dir: str) -> dict:
     print(f"Stage 3 complete:")
     print(f"  Speaking segments processed: {len(segment_metrics)}")
     print(f"  Output: candidate_behavior_metrics.json")
+    if series:
+        print(f"  Rolling series: {output['series']['count']} windows "
+              f"({window_sec:g}s window, {step_sec:g}s step)")
     
     return output
 
@@ -0,0 +1,298 @@
+"""
+Stage 3: Online Behavioral Metrics
+Incremental version of metrics.run for live or just-finished recordings.
+Audio features, video frames and speaking segments are fed as they
+arrive; each segment keeps streaming accumulators (Welford mean/variance,
+running deltas) and only segments touched since the last call are
+re-emitted.
+
+Output dicts match metrics.compute_audio_metrics / compute_video_metrics
+within rounding.
+
+Memory stays bounded for arbitrarily long recordings: received samples are
+kept for replay only for the last `replay_sec` seconds (segments must be
+registered within that long of their start), and a segment's energy list
+is reduced to a pause count once audio has moved past its end.
+"""
+import heapq
+import math
+from bisect import bisect_left, bisect_right
+import numpy as np
+from stage3_behavior.metrics import AUDIO_METRIC_DECIMALS, VIDEO_METRIC_DECIMALS
+
+REPLAY_SEC = 300.0        # how far back a newly registered segment may start
+TRIM_MIN_SAMPLES = 1024   # drop expired samples in chunks of at least this many
+
+class Welford:
+    """Streaming count / mean / population variance."""
+
+    __slots__ = ("count", "mean", "m2")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def push(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / self.count if self.count else 0.0
+
+class RunningDelta:
+    """Welford stats of |x[i] - x[i-1]| (Euclidean norm for vectors) over a stream."""
+
+    __slots__ = ("last", "stats")
+
+    def __init__(self):
+        self.last = None
+        self.stats = Welford()
+
+    def push(self, x):
+        if self.last is not None:
+            if isinstance(x, tuple):
+                self.stats.push(math.sqrt(sum((a - b) ** 2 for a, b in zip(x, self.last))))
+            else:
+                self.stats.push(abs(x - self.last))
+        self.last = x
+
+class SegmentAccumulator:
+    """Streaming state for one speaking segment."""
+
+    def __init__(self, segment_id: str, start: float, end: float):
+        self.segment_id = segment_id
+        self.start = start
+        self.end = end
+        # Audio
+        self.energy = Welford()
+        self.energy_delta = RunningDelta()
+        self.pitch = Welford()
+        self.pitch_delta = RunningDelta()
+        # Pause density compares every frame against 10% of the *final* mean
+        # energy, so the per-segment energy list is kept for re-counting until
+        # the segment is closed (see close_audio)
+        self.energies = []
+        self.pauses = None
+        # Video
+        self.frames = 0
+        self.faces = 0
+        self.head_motion = RunningDelta()
+        self.gaze_x = Welford()
+        self.gaze_y = Welford()
+        self.facial_motion = RunningDelta()
+
+    def push_audio(self, rms: float, pitch: float):
+        self.energy.push(rms)
+        self.energy_delta.push(rms)
+        self.energies.append(rms)
+        if pitch > 0:
+            self.pitch.push(pitch)
+            self.pitch_delta.push(pitch)
+
+    def push_video(self, face_detected: bool, pose=None, gaze=None, centroid=None):
+        self.frames += 1
+        self.faces += bool(face_detected)
+        if pose is not None:
+            self.head_motion.push(tuple(pose))
+        if gaze is not None:
+            self.gaze_x.push(gaze[0])
+            self.gaze_y.push(gaze[1])
+        if centroid is not None:
+            self.facial_motion.push(tuple(centroid))
+
+    def _count_pauses(self) -> int:
+        threshold = self.energy.mean * 0.1 if self.energy.mean > 0 else 0.001
+        return sum(1 for e in self.energies if e < threshold)
+
+    def close_audio(self):
+        """No more audio can fall inside the segment: fix the pause count, drop the energies."""
+        if self.energies is not None:
+            self.pauses = self._count_pauses()
+            self.energies = None
+
+    def audio_metrics(self) -> dict:
+        n = self.energy.count
+        if n == 0:
+            return {k: 0.0 for k in AUDIO_METRIC_DECIMALS}
+        duration = self.end - self.start
+        pauses = self.pauses if self.energies is None else self._count_pauses()
+        values = {
+            "pitch_mean": self.pitch.mean if self.pitch.count else 0.0,
+            "pitch_variance": self.pitch.variance if self.pitch.count > 1 else 0.0,
+            "energy_mean": self.energy.mean,
+            "energy_variance": self.energy.variance if n > 1 else 0.0,
+            "speech_rate": n / duration if duration > 0 else 0.0,
+            "pause_density": pauses / n,
+            "prosodic_variability": self.pitch_delta.stats.mean + self.energy_delta.stats.mean
+        }
+        return {k: round(values[k], d) for k, d in AUDIO_METRIC_DECIMALS.items()}
+
+    def video_metrics(self) -> dict:
+        if self.frames == 0:
+            return {k: 0.0 for k in VIDEO_METRIC_DECIMALS}
+        motion = self.head_motion.stats
+        gaze_x_var = self.gaze_x.variance if self.gaze_x.count > 1 else 0.0
+        gaze_y_var = self.gaze_y.variance if self.gaze_y.count > 1 else 0.0
+        facial = self.facial_motion.stats.mean
+        values = {
+            "face_presence_ratio": self.faces / self.frames,
+            "head_motion_mean": motion.mean,
+            "head_motion_variance": motion.variance if motion.count > 1 else 0.0,
+            "gaze_stability": gaze_x_var + gaze_y_var,
+            "facial_motion_intensity": facial,
+            "expression_change_rate": facial
+        }
+        return {k: round(values[k], d) for k, d in VIDEO_METRIC_DECIMALS.items()}
+
+    def to_dict(self) -> dict:
+        return {
+            "segment_id": self.segment_id,
+            "start_time": self.start,
+            "end_time": self.end,
+            "audio_metrics": self.audio_metrics(),
+            "video_metrics": self.video_metrics()
+        }
+
+def _finite(*values):
+    """The values as a tuple, or None when any is missing/NaN (no face)."""
+    if any(v is None or v != v for v in values):
+        return None
+    return tuple(float(v) for v in values)
+
+class OnlineBehaviorMetrics:
+    """
+    Incremental Stage 3. Feed samples in time order per stream:
+
+        online = OnlineBehaviorMetrics()
+        online.add_segment("SEG1", 0.0, 4.2)
+        online.push_audio(t, rms, pitch)
+        online.push_video(t, face_detected, yaw, pitch, roll, gaze_x, gaze_y, cx, cy)
+        changed = online.updated_metrics()
+
+    Segments may be added after their samples arrived (VAD closes a segment
+    only once speech has ended); buffered samples are replayed into them, as
+    long as the segment starts within `replay_sec` of the newest sample.
+    """
+
+    def __init__(self, segments=None, replay_sec: float = REPLAY_SEC):
+        self.segments = {}        # segment_id -> SegmentAccumulator
+        self._seg_starts = []     # sorted segment starts ...
+        self._seg_order = []      # ... and the accumulators in that order
+        self._max_duration = 0.0
+        self._dirty = set()
+        self._open_audio = []     # heap of (end, segment_id) not yet closed for audio
+        # Received samples, kept for replay into segments registered later
+        self.replay_sec = replay_sec
+        self._horizon = float("-inf")             # samples before this may be gone
+        self._audio_times, self._audio = [], []   # (rms, pitch)
+        self._video_times, self._video = [], []   # (face_detected, pose, gaze, centroid)
+        for seg in segments or []:
+            self.add_segment(seg["segment_id"], seg["start_time"], seg["end_time"])
+
+    def _containing(self, t: float) -> list:
+        """Segments whose [start, end] contains t."""
+        hits = []
+        i = bisect_right(self._seg_starts, t)
+        while i > 0:
+            i -= 1
+            acc = self._seg_order[i]
+            if t - acc.start > self._max_duration:
+                break
+            if t <= acc.end:
+                hits.append(acc)
+        return hits
+
+    def add_segment(self, segment_id: str, start: float, end: float):
+        """Register a speaking segment and replay already-received samples into it."""
+        if segment_id in self.segments:
+            raise ValueError(f"Duplicate segment_id: {segment_id}")
+        if start < self._horizon:
+            raise ValueError(
+                f"Segment {segment_id} starts at {start}s, before the replay horizon "
+                f"({self._horizon:.3f}s); register segments within {self.replay_sec}s"
+            )
+        acc = SegmentAccumulator(segment_id, start, end)
+        self.segments[segment_id] = acc
+        i = bisect_right(self._seg_starts, start)
+        self._seg_starts.insert(i, start)
+        self._seg_order.insert(i, acc)
+        self._max_duration = max(self._max_duration, end - start)
+
+        lo = bisect_left(self._audio_times, start)
+        hi = bisect_right(self._audio_times, end, lo)
+        for rms, pitch in self._audio[lo:hi]:
+            acc.push_audio(rms, pitch)
+        lo = bisect_left(self._video_times, start)
+        hi = bisect_right(self._video_times, end, lo)
+        for sample in self._video[lo:hi]:
+            acc.push_video(*sample)
+        if self._audio_times and self._audio_times[-1] > end:
+            acc.close_audio()
+        else:
+            heapq.heappush(self._open_audio, (end, segment_id))
+        self._dirty.add(segment_id)
+
+    def _trim(self, timestamp: float):
+        """Advance the replay horizon and drop samples that fell behind it."""
+        self._horizon = max(self._horizon, timestamp - self.replay_sec)
+        for times, samples in ((self._audio_times, self._audio), (self._video_times, self._video)):
+            k = bisect_left(times, self._horizon)
+            if k >= TRIM_MIN_SAMPLES and k * 2 >= len(times):
+                del times[:k]
+                del samples[:k]
+
+    def push_audio(self, timestamp: float, rms_energy: float, pitch_hz: float):
+        if self._audio_times and timestamp < self._audio_times[-1]:
+            raise ValueError("Audio features must be pushed in time order")
+        sample = (float(rms_energy), float(pitch_hz))
+        self._audio_times.append(float(timestamp))
+        self._audio.append(sample)
+        for acc in self._containing(timestamp):
+            acc.push_audio(*sample)
+            self._dirty.add(acc.segment_id)
+        while self._open_audio and self._open_audio[0][0] < timestamp:
+            self.segments[heapq.heappop(self._open_audio)[1]].close_audio()
+        self._trim(timestamp)
+
+    def push_video(self, timestamp: float, face_detected: bool, yaw=None, pitch=None, roll=None,
+                   gaze_x=None, gaze_y=None, centroid_x=None, centroid_y=None):
+        if self._video_times and timestamp < self._video_times[-1]:
+            raise ValueError("Video frames must be pushed in time order")
+        sample = (
+            bool(face_detected),
+            _finite(yaw, pitch, roll), _finite(gaze_x, gaze_y), _finite(centroid_x, centroid_y)
+        )
+        self._video_times.append(float(timestamp))
+        self._video.append(sample)
+        for acc in self._containing(timestamp):
+            acc.push_video(*sample)
+            self._dirty.add(acc.segment_id)
+        self._trim(timestamp)
+
+    def push_audio_columns(self, columns: dict):
+        """Feed a block of audio feature columns (see columnar.load_audio_columns)."""
+        for t, rms, pitch in zip(columns["timestamp_sec"].tolist(),
+                                 columns["rms_energy"].tolist(),
+                                 columns["pitch_hz"].tolist()):
+            self.push_audio(t, rms, pitch)
+
+    def push_video_columns(self, columns: dict):
+        """Feed a block of derived video columns (see columnar.load_video_columns)."""
+        keys = ("timestamp_sec", "face_detected", "yaw", "pitch", "roll",
+                "gaze_x", "gaze_y", "centroid_x", "centroid_y")
+        for row in zip(*(np.asarray(columns[k]).tolist() for k in keys)):
+            self.push_video(*row)
+
+    def updated_metrics(self) -> list:
+        """Metrics for segments changed since the last call, in time order."""
+        changed = sorted((self.segments[s] for s in self._dirty), key=lambda a: a.start)
+        self._dirty.clear()
+        return [acc.to_dict() for acc in changed]
+
+    def all_metrics(self) -> list:
+        """Metrics for every registered segment, in time order."""
+        return [acc.to_dict() for acc in self._seg_order]
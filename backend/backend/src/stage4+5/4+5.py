@@ -2,78 +2,28 @@
 Stage 4+5: Combined Relevance Scoring + Incremental Verdict Aggregation (4-BIT QUANTIZED)
 Single-pass LLM evaluation with progressive interview profiling
 WITH GPU MEMORY MANAGEMENT
+
+The model is not loaded at import: scoring goes through llm_service, which
+uses a running model server (python -m llm_service.server) or loads the
+model in this process on the first request.
 """
 import json
-from pathlib import Path
-from transformers import AutoTokenizer, AutoModelForCausalLM, BitsAndBytesConfig
-import torch
-import gc
 import sys
 import time
+from pathlib import Path
 
-MODEL_ID = "Qwen/Qwen2.5-3B-Instruct"
-
-# -------------------------------
-# CLEAR GPU MEMORY FIRST
-# -------------------------------
-def clear_gpu_memory():
-    """Clear GPU memory before loading model."""
-    gc.collect()
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-        torch.cuda.ipc_collect()
-        total_mem = torch.cuda.get_device_properties(0).total_memory / 1024**3
-        allocated = torch.cuda.memory_allocated(0) / 1024**3
-        reserved = torch.cuda.memory_reserved(0) / 1024**3
-        print(f"GPU Memory - Total: {total_mem:.2f}GB, Allocated: {allocated:.2f}GB, Reserved: {reserved:.2f}GB", flush=True)
-
-print("Clearing GPU memory...", flush=True)
-clear_gpu_memory()
-
-# -------------------------------
-# Load Model (4-BIT QUANTIZED - MEMORY OPTIMIZED)
-# -------------------------------
-print("Loading tokenizer...", flush=True)
-tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, trust_remote_code=True)
-tokenizer.model_max_length = 8192
-
-print("Loading model (4-bit quantized with memory optimization)...", flush=True)
-quantization_config = BitsAndBytesConfig(
-    load_in_4bit=True,
-    bnb_4bit_compute_dtype=torch.float16,
-    bnb_4bit_use_double_quant=True,
-    bnb_4bit_quant_type="nf4",
-    # llm_int8_enable_fp32_cpu_offload=True
-)
-
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_ID,
-    quantization_config=quantization_config,
-    device_map="auto",
-    torch_dtype=torch.float16,
-    low_cpu_mem_usage=True,
-    max_memory={0: "3.0GB", "cpu": "12GB"}  # Reduced to 3.2GB for safety
-)
-print("Model ready (4-bit quantized, ~2-3GB VRAM)", flush=True)
-
-# Print memory usage after loading
-if torch.cuda.is_available():
-    allocated = torch.cuda.memory_allocated(0) / 1024**3
-    reserved = torch.cuda.memory_reserved(0) / 1024**3
-    print(f"After loading - Allocated: {allocated:.2f}GB, Reserved: {reserved:.2f}GB", flush=True)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from llm_service.client import get_client
+from llm_service.model import MAX_CONTEXT_TOKENS
 
 # -------------------------------
 # Utilities
 # -------------------------------
 def count_tokens(text: str) -> int:
-    return len(tokenizer.encode(text, add_special_tokens=False))
+    return get_client().count_tokens(text)
 
 def truncate_answer_tail(answer: str, max_tokens: int) -> str:
-    ids = tokenizer.encode(answer, add_special_tokens=False)
-    if len(ids) <= max_tokens:
-        return answer
-    truncated_ids = ids[-max_tokens:]
-    return tokenizer.decode(truncated_ids, skip_special_tokens=True)
+    return get_client().truncate_tail(answer, max_tokens)
 
 def extract_last_json(text: str):
     """Extract the LAST valid JSON object from model output."""
@@ -127,6 +77,59 @@ def build_qa_summary(qa_history: list) -> str:
 # -------------------------------
 # Combined Scoring + Incremental Verdict
 # -------------------------------
+def build_assessment_prefix(jd_text: str) -> str:
+    """Per-run invariant start of every score_and_assess prompt."""
+    return f"""You are evaluating a candidate interview for the role defined in the provided Job Description.
+
+Job Description:
+{jd_text}
+
+You will be given the interview progress, a summary of the previous questions, the current question and the candidate's answer.
+
+TASK 1: Score the current answer's relevance to the job description
+- Evaluate semantic overlap (skills, tools, concepts, responsibilities)
+- Extract matched keywords
+- Provide reasoning
+
+Scoring rubric:
+0.0–0.2 → no relevance
+0.2–0.4 → weak relevance
+0.4–0.6 → partial relevance
+0.6–0.8 → strong relevance
+0.8–1.0 → direct relevance
+
+TASK 2: Assess candidate competency SO FAR (question 1 up to the current question)
+Based on CUMULATIVE evidence across all questions so far:
+- technical_depth: ML/AI technical knowledge (0.0-1.0)
+- system_design: Architecture thinking (0.0-1.0)
+- production_experience: Real-world deployment (0.0-1.0)
+- communication_clarity: Explanation quality (0.0-1.0)
+- problem_solving: Analytical approach (0.0-1.0)
+
+Give incremental verdict: "strong_progress", "adequate_progress", "weak_progress", or "no_signal"
+
+Rules:
+- Base ALL scores on demonstrated evidence
+- Lower scores = weak/missing evidence
+- Higher scores = concrete examples + depth
+- Use ONLY provided content, NO hallucination
+
+Respond with ONLY valid JSON:
+{{
+  "relevance_score": float,
+  "matched_keywords": [string],
+  "relevance_reason": string,
+  "technical_depth": float,
+  "system_design": float,
+  "production_experience": float,
+  "communication_clarity": float,
+  "problem_solving": float,
+  "incremental_verdict": string,
+  "assessment_reason": string
+}}
+
+"""
+
 def score_and_assess(
     jd_text: str,
     question: str,
@@ -149,7 +152,7 @@ def score_and_assess(
     a_tokens = count_tokens(answer)
     
     RESERVED_TOKENS = 600
-    available_for_answer = 8192 - jd_tokens - q_tokens - RESERVED_TOKENS
+    available_for_answer = MAX_CONTEXT_TOKENS - jd_tokens - q_tokens - RESERVED_TOKENS
     
     if available_for_answer < 100:
         available_for_answer = 100
@@ -163,12 +166,9 @@ def score_and_assess(
     # Build history summary
     history_summary = build_qa_summary(qa_history)
     
-    prompt = f"""You are evaluating a candidate interview for the role defined in the provided Job Description.
-
-Job Description:
-{jd_text}
-
-Interview Progress: Question {checkpoint_num}
+    # Invariant part first (instructions + JD) so its KV cache is reused across questions
+    prefix = build_assessment_prefix(jd_text)
+    prompt = prefix + f"""Interview Progress: Question {checkpoint_num}
 
 Previous Questions Summary:
 {history_summary}
@@ -179,82 +179,15 @@ Current Question:
 Current Answer:
 {answer}
 
-TASK 1: Score this answer's relevance to the job description
-- Evaluate semantic overlap (skills, tools, concepts, responsibilities)
-- Extract matched keywords
-- Provide reasoning
-
-Scoring rubric:
-0.0–0.2 → no relevance
-0.2–0.4 → weak relevance
-0.4–0.6 → partial relevance
-0.6–0.8 → strong relevance
-0.8–1.0 → direct relevance
-
-TASK 2: Assess candidate competency SO FAR (questions 1 to {checkpoint_num})
-Based on CUMULATIVE evidence across all {checkpoint_num} questions:
-- technical_depth: ML/AI technical knowledge (0.0-1.0)
-- system_design: Architecture thinking (0.0-1.0)
-- production_experience: Real-world deployment (0.0-1.0)
-- communication_clarity: Explanation quality (0.0-1.0)
-- problem_solving: Analytical approach (0.0-1.0)
-
-Give incremental verdict: "strong_progress", "adequate_progress", "weak_progress", or "no_signal"
-
-Rules:
-- Base ALL scores on demonstrated evidence
-- Lower scores = weak/missing evidence
-- Higher scores = concrete examples + depth
-- Use ONLY provided content, NO hallucination
-
-Respond with ONLY valid JSON:
-{{
-  "relevance_score": float,
-  "matched_keywords": [string],
-  "relevance_reason": string,
-  "technical_depth": float,
-  "system_design": float,
-  "production_experience": float,
-  "communication_clarity": float,
-  "problem_solving": float,
-  "incremental_verdict": string,
-  "assessment_reason": string
-}}""".strip()
-    
-    messages = [{"role": "user", "content": prompt}]
-    chat = tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True
-    )
-    
-    inputs = tokenizer(chat, return_tensors="pt").to(model.device)
+Respond with ONLY valid JSON in the format above.""".strip()
     
     print(f"  Running LLM (combined scoring + assessment)...", flush=True)
     
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=500,
-            do_sample=False,
-            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id
-        )
-    
-    # Clear intermediate tensors
-    del inputs
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+    generated_only = get_client().generate(prompt, max_new_tokens=500, prefix=prefix)
     
     elapsed = time.time() - start_time
     print(f"  LLM finished in {elapsed:.2f}s", flush=True)
     
-    decoded = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    if chat in decoded:
-        generated_only = decoded.split(chat)[-1].strip()
-    else:
-        generated_only = decoded
-    
     result = extract_last_json(generated_only)
     
     if result is None:
@@ -278,6 +211,39 @@ Respond with ONLY valid JSON:
 # -------------------------------
 # Final Verdict
 # -------------------------------
+def build_verdict_prefix(jd_text: str) -> str:
+    """JD-dependent start of the final verdict prompt (reused across runs by the model server)."""
+    return f"""You are making a final hiring decision strictly based on the provided Job Description and interview evidence.
+
+Job Description:
+{jd_text}
+
+You will be given a summary of the complete interview and the final cumulative competency scores.
+
+Verdict options:
+- "STRONG_HIRE": Exceeds expectations, clear hire
+- "HIRE": Meets requirements, would hire
+- "BORDERLINE": Mixed signals, need more data
+- "NO_HIRE": Does not meet requirements
+
+Confidence levels: "HIGH", "MEDIUM", "LOW"
+
+Provide:
+1. Final verdict
+2. Confidence level
+3. Overall score (0.0-1.0)
+4. Detailed reason (2-3 sentences)
+
+Respond with ONLY valid JSON:
+{{
+  "verdict": string,
+  "confidence": string,
+  "overall_score": float,
+  "reason": string
+}}
+
+"""
+
 def get_final_verdict(jd_text: str, timeline: list):
     """Ask LLM for final hiring verdict based on complete interview."""
     start_time = time.time()
@@ -302,12 +268,8 @@ def get_final_verdict(jd_text: str, timeline: list):
     final_checkpoint = timeline[-1]
     final_scores = final_checkpoint['competency_scores']
     
-    prompt = f"""You are making a final hiring decision strictly based on the provided Job Description and interview evidence.
-
-Job Description:
-{jd_text}
-
-Complete Interview Summary ({len(timeline)} questions):
+    prefix = build_verdict_prefix(jd_text)
+    prompt = prefix + f"""Complete Interview Summary ({len(timeline)} questions):
 {summary_text}
 
 Final Cumulative Competency Scores:
@@ -317,64 +279,16 @@ Final Cumulative Competency Scores:
 - Communication Clarity: {final_scores['communication_clarity']:.2f}
 - Problem Solving: {final_scores['problem_solving']:.2f}
 
-Based on the COMPLETE interview, make a hiring decision:
-
-Verdict options:
-- "STRONG_HIRE": Exceeds expectations, clear hire
-- "HIRE": Meets requirements, would hire
-- "BORDERLINE": Mixed signals, need more data
-- "NO_HIRE": Does not meet requirements
-
-Confidence levels: "HIGH", "MEDIUM", "LOW"
-
-Provide:
-1. Final verdict
-2. Confidence level
-3. Overall score (0.0-1.0)
-4. Detailed reason (2-3 sentences)
-
-Respond with ONLY valid JSON:
-{{
-  "verdict": string,
-  "confidence": string,
-  "overall_score": float,
-  "reason": string
-}}""".strip()
-    
-    messages = [{"role": "user", "content": prompt}]
-    chat = tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True
-    )
-    
-    inputs = tokenizer(chat, return_tensors="pt").to(model.device)
+Based on the COMPLETE interview, make a hiring decision.
+Respond with ONLY valid JSON in the format above.""".strip()
     
     print("\nRunning final verdict LLM...", flush=True)
     
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=400,
-            do_sample=False,
-            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id
-        )
-    
-    # Clear intermediate tensors
-    del inputs
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+    generated_only = get_client().generate(prompt, max_new_tokens=400, prefix=prefix)
     
     elapsed = time.time() - start_time
     print(f"Final verdict LLM finished in {elapsed:.2f}s", flush=True)
     
-    decoded = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    if chat in decoded:
-        generated_only = decoded.split(chat)[-1].strip()
-    else:
-        generated_only = decoded
-    
     result = extract_last_json(generated_only)
     
     if result is None:
@@ -566,15 +480,8 @@ def run(output_dir: str, jd_path: str):
     print(f"Total time: {total_elapsed/60:.2f} minutes", flush=True)
     print(f"Average per Q&A: {total_elapsed/len(qa_pairs):.2f}s", flush=True)
     
-    # CLEANUP GPU MEMORY
-    print("\nCleaning up GPU memory...", flush=True)
-    gc.collect()
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
-        torch.cuda.ipc_collect()
-        allocated = torch.cuda.memory_allocated(0) / 1024**3
-        print(f"After cleanup - Allocated: {allocated:.2f}GB", flush=True)
-    print("Cleanup complete.", flush=True)
+    # CLEANUP GPU MEMORY (only if the model was loaded in this process)
+    get_client().release()
 
 # -------------------------------
 # Entry Point
@@ -1,48 +1,33 @@
 """
 Stage 4: Semantic Relevance Scoring
 Token-aware, JSON-forced, live output
+(model served by llm_service; nothing is loaded at import)
+Optional batched mode: answers grouped by token length into left-padded
+micro-batches within a token budget
 """
 import json
-from pathlib import Path
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
 import sys
+import time
+from pathlib import Path
 
-MODEL_ID = "Qwen/Qwen2.5-3B-Instruct"
-
-# -------------------------------
-# Load tokenizer & model
-# -------------------------------
-print("Loading tokenizer...", flush=True)
-tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, trust_remote_code=True)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from llm_service.client import get_client
+from llm_service.model import MAX_CONTEXT_TOKENS, TOKEN_BUDGET
 
 # HARD CAP effective context window (CRITICAL)
-EFFECTIVE_MAX_TOKENS = 8192
-tokenizer.model_max_length = EFFECTIVE_MAX_TOKENS
-print(f"Model max tokens (effective): {EFFECTIVE_MAX_TOKENS}", flush=True)
-
-print("Loading model...", flush=True)
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_ID,
-    device_map="auto",
-    torch_dtype="auto"
-)
-print("Model ready", flush=True)
+EFFECTIVE_MAX_TOKENS = MAX_CONTEXT_TOKENS
+MAX_NEW_TOKENS = 300
 
 # -------------------------------
 # Utilities
 # -------------------------------
 def count_tokens(text: str) -> int:
     """Count tokens in text."""
-    return len(tokenizer.encode(text, add_special_tokens=False))
+    return get_client().count_tokens(text)
 
 def truncate_answer_tail(answer: str, max_tokens: int) -> str:
     """Keep the LAST max_tokens of answer (tail-preserving truncation)."""
-    ids = tokenizer.encode(answer, add_special_tokens=False)
-    if len(ids) <= max_tokens:
-        return answer
-    truncated_ids = ids[-max_tokens:]
-    return tokenizer.decode(truncated_ids, skip_special_tokens=True)
+    return get_client().truncate_tail(answer, max_tokens)
 
 def extract_last_json(text: str):
     """
@@ -70,38 +55,14 @@ def extract_last_json(text: str):
 # -------------------------------
 # LLM Scoring
 # -------------------------------
-def score_qa(question: str, answer: str, jd_text: str):
-    """Score a single Q&A pair against the job description."""
-    jd_tokens = count_tokens(jd_text)
-    q_tokens = count_tokens(question)
-    a_tokens = count_tokens(answer)
-    
-    RESERVED_TOKENS = 400  # prompt + JSON response safety buffer
-    available_for_answer = EFFECTIVE_MAX_TOKENS - jd_tokens - q_tokens - RESERVED_TOKENS
-    
-    if available_for_answer < 100:
-        available_for_answer = 100
-    
-    print(
-        f"Tokens | JD={jd_tokens} Q={q_tokens} A={a_tokens} "
-        f"AvailableForAnswer={available_for_answer}",
-        flush=True
-    )
-    
-    if a_tokens > available_for_answer:
-        print(f"Truncating answer from {a_tokens} to {available_for_answer} tokens (tail-preserving)", flush=True)
-        answer = truncate_answer_tail(answer, available_for_answer)
-    
-    prompt = f"""You are a semantic relevance evaluator.
+def build_relevance_prefix(jd_text: str) -> str:
+    """Per-run invariant start of every relevance prompt (instructions + JD)."""
+    return f"""You are a semantic relevance evaluator.
 
 Job Description:
 {jd_text}
 
-Interview Question:
-{question}
-
-Candidate Answer:
-{answer}
+You will be given an interview question and the candidate's answer.
 
 Evaluate relevance STRICTLY based on semantic overlap with the job description:
 - skills
@@ -123,45 +84,51 @@ Rules:
 - DO NOT hallucinate skills
 - DO NOT default scores
 
-Respond with ONLY valid JSON.
-No text before or after JSON.
-
 JSON format:
 {{
   "score": float,
   "keywords": [string],
   "reason": string
-}}""".strip()
-    
-    messages = [{"role": "user", "content": prompt}]
-    chat = tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True
-    )
-    
-    inputs = tokenizer(chat, return_tensors="pt").to(model.device)
+}}
+
+"""
+
+def build_relevance_prompt(question: str, answer: str, jd_text: str) -> tuple:
+    """Token-capped scoring prompt for one Q&A pair. Returns (prompt, approx_tokens)."""
+    jd_tokens = count_tokens(jd_text)
+    q_tokens = count_tokens(question)
+    a_tokens = count_tokens(answer)
     
-    print("Running LLM...", flush=True)
+    RESERVED_TOKENS = 400  # prompt + JSON response safety buffer
+    available_for_answer = EFFECTIVE_MAX_TOKENS - jd_tokens - q_tokens - RESERVED_TOKENS
     
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=300,
-            do_sample=False,
-            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id
-        )
+    if available_for_answer < 100:
+        available_for_answer = 100
     
-    print("LLM finished", flush=True)
+    print(
+        f"Tokens | JD={jd_tokens} Q={q_tokens} A={a_tokens} "
+        f"AvailableForAnswer={available_for_answer}",
+        flush=True
+    )
     
-    decoded = tokenizer.decode(outputs[0], skip_special_tokens=True)
+    if a_tokens > available_for_answer:
+        print(f"Truncating answer from {a_tokens} to {available_for_answer} tokens (tail-preserving)", flush=True)
+        answer = truncate_answer_tail(answer, available_for_answer)
+        a_tokens = available_for_answer
     
-    # Extract only the generated part (after the prompt)
-    if chat in decoded:
-        generated_only = decoded.split(chat)[-1].strip()
-    else:
-        generated_only = decoded
+    prompt = build_relevance_prefix(jd_text) + f"""Interview Question:
+{question}
+
+Candidate Answer:
+{answer}
+
+Respond with ONLY valid JSON in the format above.
+No text before or after JSON.""".strip()
     
+    return prompt, jd_tokens + q_tokens + a_tokens + RESERVED_TOKENS
+
+def parse_relevance(generated_only: str) -> dict:
+    """{"score", "keywords", "reason"} from model output (zeros if not valid JSON)."""
     result = extract_last_json(generated_only)
     
     if result is None:
@@ -175,11 +142,115 @@ JSON format:
     
     return result
 
+def score_qa(question: str, answer: str, jd_text: str):
+    """Score a single Q&A pair against the job description."""
+    prompt, _ = build_relevance_prompt(question, answer, jd_text)
+    
+    print("Running LLM...", flush=True)
+    
+    generated_only = get_client().generate(
+        prompt, max_new_tokens=MAX_NEW_TOKENS, prefix=build_relevance_prefix(jd_text)
+    )
+    
+    print("LLM finished", flush=True)
+    
+    return parse_relevance(generated_only)
+
 # -------------------------------
 # Runner
 # -------------------------------
-def run(output_dir: str, jd_path: str):
-    """Execute Stage 4: Semantic Relevance Scoring."""
+def has_answer(answer: str) -> bool:
+    return bool(answer) and answer.strip().lower() != "no answer"
+
+def to_entry(qa_id: str, question: str, answer: str, llm_result: dict = None) -> dict:
+    """One relevance_scores.json line; `llm_result` None means no answer was given."""
+    if llm_result is None:
+        return {
+            "qa_id": qa_id,
+            "question": question,
+            "answer": answer,
+            "relevance_score": 0.0,
+            "matched_keywords": [],
+            "justification": "No answer provided"
+        }
+    
+    score = max(0.0, min(1.0, float(llm_result.get("score", 0.0))))
+    keywords = llm_result.get("keywords", [])
+    
+    if score > 0.3 and not keywords:
+        print(f"WARNING: {qa_id} score > 0.3 but no keywords identified", flush=True)
+    
+    return {
+        "qa_id": qa_id,
+        "question": question,
+        "answer": answer,
+        "relevance_score": round(score, 2),
+        "matched_keywords": keywords,
+        "justification": llm_result.get("reason", "")
+    }
+
+def score_sequential(qa_pairs: list, jd_text: str):
+    """Yield (index, entry) one Q&A at a time (batch size 1)."""
+    for idx, qa in enumerate(qa_pairs, start=1):
+        qa_id = qa.get("question_id", f"Q{idx}")
+        question = qa.get("question_text", "")
+        answer = qa.get("answer", {}).get("text", "")
+        
+        print(f"\n{'='*60}", flush=True)
+        print(f"[{idx}/{len(qa_pairs)}] {qa_id}", flush=True)
+        print(f"Question: {question[:80]}...", flush=True)
+        
+        if not has_answer(answer):
+            print("Skipping: No answer provided", flush=True)
+            yield idx - 1, to_entry(qa_id, question, answer)
+            continue
+        
+        entry = to_entry(qa_id, question, answer, score_qa(question, answer, jd_text))
+        print(f"Score: {entry['relevance_score']:.2f}", flush=True)
+        print(f"Keywords: {', '.join(entry['matched_keywords'])}", flush=True)
+        yield idx - 1, entry
+
+def score_batched(qa_pairs: list, jd_text: str, batch_size: int, token_budget: int):
+    """
+    Yield (index, entry) as length-grouped micro-batches finish (any order).
+    Unanswered questions are yielded up front without an LLM call.
+    """
+    prompts, lengths, positions = [], [], []
+    for idx, qa in enumerate(qa_pairs):
+        qa_id = qa.get("question_id", f"Q{idx + 1}")
+        question = qa.get("question_text", "")
+        answer = qa.get("answer", {}).get("text", "")
+        if not has_answer(answer):
+            yield idx, to_entry(qa_id, question, answer)
+            continue
+        prompt, tokens = build_relevance_prompt(question, answer, jd_text)
+        prompts.append(prompt)
+        lengths.append(tokens)
+        positions.append(idx)
+    
+    print(f"Scoring {len(prompts)} answers in micro-batches of up to {batch_size} "
+          f"({token_budget} token budget)...", flush=True)
+    
+    for i, generated_only in get_client().iter_generate(
+            prompts, lengths, MAX_NEW_TOKENS, batch_size, token_budget):
+        idx = positions[i]
+        qa = qa_pairs[idx]
+        yield idx, to_entry(
+            qa.get("question_id", f"Q{idx + 1}"),
+            qa.get("question_text", ""),
+            qa.get("answer", {}).get("text", ""),
+            parse_relevance(generated_only)
+        )
+
+def run(output_dir: str, jd_path: str, batch_size: int = 1,
+        token_budget: int = TOKEN_BUDGET) -> dict:
+    """
+    Execute Stage 4: Semantic Relevance Scoring.
+    batch_size > 1 scores answers in left-padded micro-batches; lines are
+    still written to relevance_scores.json in question order, each as soon
+    as every earlier question is done.
+    """
+    start_time = time.time()
     output_dir = Path(output_dir)
     qa_path = output_dir / "qa_pairs.json"
     out_path = output_dir / "relevance_scores.json"
@@ -199,67 +270,65 @@ def run(output_dir: str, jd_path: str):
     qa_pairs = qa_data.get("qa_pairs", [])
     print(f"Found {len(qa_pairs)} Q&A pairs", flush=True)
     
-    # Clear output file
-    out_path.write_text("")
+    if batch_size > 1:
+        results = score_batched(qa_pairs, jd_text, batch_size, token_budget)
+    else:
+        results = score_sequential(qa_pairs, jd_text)
     
-    # Process each Q&A pair
-    for idx, qa in enumerate(qa_pairs, start=1):
-        qa_id = qa.get("question_id", f"Q{idx}")
-        question = qa.get("question_text", "")
-        answer = qa.get("answer", {}).get("text", "")
-        
-        print(f"\n{'='*60}", flush=True)
-        print(f"[{idx}/{len(qa_pairs)}] {qa_id}", flush=True)
-        print(f"Question: {question[:80]}...", flush=True)
-        
-        if not answer or answer.strip().lower() == "no answer":
-            print("Skipping: No answer provided", flush=True)
-            result = {
-                "qa_id": qa_id,
-                "question": question,
-                "answer": answer,
-                "relevance_score": 0.0,
-                "matched_keywords": [],
-                "justification": "No answer provided"
-            }
-        else:
-            llm_result = score_qa(question, answer, jd_text)
-            
-            score = max(0.0, min(1.0, float(llm_result.get("score", 0.0))))
-            keywords = llm_result.get("keywords", [])
-            reason = llm_result.get("reason", "")
-            
-            if score > 0.3 and not keywords:
-                print("WARNING: score > 0.3 but no keywords identified", flush=True)
-            
-            result = {
-                "qa_id": qa_id,
-                "question": question,
-                "answer": answer,
-                "relevance_score": round(score, 2),
-                "matched_keywords": keywords,
-                "justification": reason
-            }
-            
-            print(f"Score: {score:.2f}", flush=True)
-            print(f"Keywords: {', '.join(keywords)}", flush=True)
-        
-        # Append to output file (streaming)
+    # Clear output file, then append (streaming) in question order
+    out_path.write_text("")
+    done = {}
+    next_idx = 0
+    for idx, entry in results:
+        done[idx] = entry
         with open(out_path, "a") as f:
-            f.write(json.dumps(result) + "\n")
+            while next_idx in done:
+                f.write(json.dumps(done.pop(next_idx)) + "\n")
+                next_idx += 1
             f.flush()
     
+    elapsed = time.time() - start_time
+    throughput = len(qa_pairs) / elapsed * 60 if elapsed > 0 else 0.0
+    
     print(f"\n{'='*60}", flush=True)
     print(f"Stage 4 complete: {len(qa_pairs)} QA pairs scored", flush=True)
+    print(f"Throughput: {throughput:.1f} QA pairs/min (batch size {batch_size}, {elapsed:.1f}s)", flush=True)
     print(f"Output: {out_path}", flush=True)
+    return {
+        "qa_pairs": len(qa_pairs),
+        "batch_size": batch_size,
+        "elapsed_sec": round(elapsed, 3),
+        "qa_per_min": round(throughput, 2)
+    }
+
+def benchmark(output_dir: str, jd_path: str, batch_sizes=(1, 2, 4, 8),
+              token_budget: int = TOKEN_BUDGET) -> list:
+    """QA pairs/min for each batch size (relevance_scores.json is rewritten by each pass)."""
+    return [run(output_dir, jd_path, b, token_budget) for b in batch_sizes]
 
 # -------------------------------
 # Entry point
 # -------------------------------
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python relevance.py <output_dir> <jd_path>")
-        print("Example: python relevance.py output config/job_description.txt")
-        sys.exit(1)
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Stage 4 relevance scoring",
+        epilog="Example: python relevance.py output config/job_description.txt --batch-size 4"
+    )
+    parser.add_argument("output_dir")
+    parser.add_argument("jd_path")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Answers per generate() call (1 = one at a time)")
+    parser.add_argument("--token-budget", type=int, default=TOKEN_BUDGET,
+                        help="Max padded tokens (rows x (prompt + new tokens)) per micro-batch")
+    parser.add_argument("--benchmark", metavar="SIZES",
+                        help="Comma-separated batch sizes to time, e.g. 1,2,4,8")
+    args = parser.parse_args()
     
-    run(sys.argv[1], sys.argv[2])
+    if args.benchmark:
+        sizes = [int(b) for b in args.benchmark.split(",")]
+        for stats in benchmark(args.output_dir, args.jd_path, sizes, args.token_budget):
+            print(f"  batch {stats['batch_size']:>3}: {stats['qa_per_min']:8.1f} QA pairs/min "
+                  f"({stats['elapsed_sec']:.1f}s)")
+    else:
+        run(args.output_dir, args.jd_path, args.batch_size, args.token_budget)
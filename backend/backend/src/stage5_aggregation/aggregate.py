@@ -1,29 +1,14 @@
 """
 Stage 5: LLM-Driven Incremental Verdict Aggregation
 Progressive interview profiling with LLM judgments at each checkpoint
+(model served by llm_service; nothing is loaded at import)
 """
 import json
-from pathlib import Path
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
 import sys
+from pathlib import Path
 
-MODEL_ID = "Qwen/Qwen2.5-3B-Instruct"
-
-# -------------------------------
-# Load Model
-# -------------------------------
-print("Loading tokenizer...", flush=True)
-tokenizer = AutoTokenizer.from_pretrained(MODEL_ID, trust_remote_code=True)
-tokenizer.model_max_length = 8192
-
-print("Loading model (full precision)...", flush=True)
-model = AutoModelForCausalLM.from_pretrained(
-    MODEL_ID,
-    device_map="auto",
-    torch_dtype=torch.float16
-)
-print("Model ready", flush=True)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from llm_service.client import get_client
 
 # -------------------------------
 # Utilities
@@ -85,6 +70,46 @@ def build_qa_summary(qa_history: list) -> str:
     
     return "\n\n".join(summary_lines)
 
+def build_incremental_prefix(jd_text: str) -> str:
+    """Per-run invariant start of every checkpoint prompt (instructions + JD)."""
+    return f"""You are an interview evaluator tracking candidate performance progressively.
+
+Job Description:
+{jd_text[:1000]}
+
+You will be given the interview progress, a summary of the previous questions, the current question and answer, and the answer's relevance score.
+
+Based on the interview SO FAR (question 1 up to the current question), evaluate the candidate across these dimensions:
+- technical_depth: ML/AI technical knowledge
+- system_design: Architecture and scalability thinking
+- production_experience: Real-world deployment knowledge
+- communication_clarity: Explanation quality
+- problem_solving: Analytical approach
+
+Provide:
+1. Score (0.0-1.0) for each dimension based on evidence SO FAR
+2. Incremental verdict: "strong_progress", "adequate_progress", "weak_progress", or "no_signal"
+3. Brief reason (1-2 sentences)
+
+Rules:
+- Base scores ONLY on demonstrated evidence in answers
+- Lower scores if evidence is weak or missing
+- Higher scores require concrete examples and depth
+- Consider CUMULATIVE performance across all questions asked so far
+
+Respond with ONLY valid JSON:
+{{
+  "technical_depth": float,
+  "system_design": float,
+  "production_experience": float,
+  "communication_clarity": float,
+  "problem_solving": float,
+  "incremental_verdict": string,
+  "reason": string
+}}
+
+"""
+
 def get_incremental_verdict(
     jd_text: str,
     qa_history: list,
@@ -108,12 +133,9 @@ def get_incremental_verdict(
     checkpoint_num = len(qa_history) + 1
     total_questions = checkpoint_num  # We know this after each question
     
-    prompt = f"""You are an interview evaluator tracking candidate performance progressively.
-
-Job Description:
-{jd_text[:1000]}
-
-Interview Progress: Question {checkpoint_num}
+    # Invariant part first (instructions + JD) so its KV cache is reused across questions
+    prefix = build_incremental_prefix(jd_text)
+    prompt = prefix + f"""Interview Progress: Question {checkpoint_num}
 
 Previous Questions Summary:
 {history_summary}
@@ -127,64 +149,15 @@ Current Answer:
 Current Answer Relevance: {current_rel:.2f}
 Keywords Matched: {current_keywords}
 
-Based on the interview SO FAR (questions 1 to {checkpoint_num}), evaluate the candidate across these dimensions:
-- technical_depth: ML/AI technical knowledge
-- system_design: Architecture and scalability thinking
-- production_experience: Real-world deployment knowledge
-- communication_clarity: Explanation quality
-- problem_solving: Analytical approach
-
-Provide:
-1. Score (0.0-1.0) for each dimension based on evidence SO FAR
-2. Incremental verdict: "strong_progress", "adequate_progress", "weak_progress", or "no_signal"
-3. Brief reason (1-2 sentences)
-
-Rules:
-- Base scores ONLY on demonstrated evidence in answers
-- Lower scores if evidence is weak or missing
-- Higher scores require concrete examples and depth
-- Consider CUMULATIVE performance across all questions asked so far
-
-Respond with ONLY valid JSON:
-{{
-  "technical_depth": float,
-  "system_design": float,
-  "production_experience": float,
-  "communication_clarity": float,
-  "problem_solving": float,
-  "incremental_verdict": string,
-  "reason": string
-}}""".strip()
-    
-    messages = [{"role": "user", "content": prompt}]
-    chat = tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True
-    )
-    
-    inputs = tokenizer(chat, return_tensors="pt").to(model.device)
+Respond with ONLY valid JSON in the format above.""".strip()
     
     print(f"  Running LLM for checkpoint {checkpoint_num}...", flush=True)
     
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=400,
-            do_sample=False,
-            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id
-        )
+    generated_only = get_client().generate(prompt, max_new_tokens=400, prefix=prefix)
     
     elapsed = time.time() - start
     print(f"  LLM finished in {elapsed:.2f}s", flush=True)
     
-    decoded = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    if chat in decoded:
-        generated_only = decoded.split(chat)[-1].strip()
-    else:
-        generated_only = decoded
-    
     result = extract_last_json(generated_only)
     
     if result is None:
@@ -205,6 +178,39 @@ Respond with ONLY valid JSON:
 # -------------------------------
 # Final Verdict
 # -------------------------------
+def build_final_prefix(jd_text: str) -> str:
+    """JD-dependent start of the final verdict prompt."""
+    return f"""You are making a final hiring decision for a Machine Learning Engineer position.
+
+Job Description:
+{jd_text[:1000]}
+
+You will be given a summary of the complete interview and the final cumulative scores.
+
+Verdict options:
+- "STRONG_HIRE": Exceeds expectations, clear hire
+- "HIRE": Meets requirements, would hire
+- "BORDERLINE": Mixed signals, could go either way
+- "NO_HIRE": Does not meet requirements
+
+Confidence levels: "HIGH", "MEDIUM", "LOW"
+
+Provide:
+1. Final verdict (STRONG_HIRE/HIRE/BORDERLINE/NO_HIRE)
+2. Confidence (HIGH/MEDIUM/LOW)
+3. Overall score (0.0-1.0)
+4. Detailed reason (2-3 sentences explaining decision)
+
+Respond with ONLY valid JSON:
+{{
+  "verdict": string,
+  "confidence": string,
+  "overall_score": float,
+  "reason": string
+}}
+
+"""
+
 def get_final_verdict(jd_text: str, timeline: list, all_qa: list):
     """
     Ask LLM for final hiring verdict based on complete interview.
@@ -233,12 +239,8 @@ def get_final_verdict(jd_text: str, timeline: list, all_qa: list):
     final_checkpoint = timeline[-1]
     final_scores = final_checkpoint['scores']
     
-    prompt = f"""You are making a final hiring decision for a Machine Learning Engineer position.
-
-Job Description:
-{jd_text[:1000]}
-
-Complete Interview Summary ({len(timeline)} questions):
+    prefix = build_final_prefix(jd_text)
+    prompt = prefix + f"""Complete Interview Summary ({len(timeline)} questions):
 {summary_text}
 
 Final Cumulative Scores:
@@ -248,59 +250,16 @@ Final Cumulative Scores:
 - Communication Clarity: {final_scores['communication_clarity']:.2f}
 - Problem Solving: {final_scores['problem_solving']:.2f}
 
-Based on the COMPLETE interview, make a hiring decision:
-
-Verdict options:
-- "STRONG_HIRE": Exceeds expectations, clear hire
-- "HIRE": Meets requirements, would hire
-- "BORDERLINE": Mixed signals, could go either way
-- "NO_HIRE": Does not meet requirements
-
-Confidence levels: "HIGH", "MEDIUM", "LOW"
-
-Provide:
-1. Final verdict (STRONG_HIRE/HIRE/BORDERLINE/NO_HIRE)
-2. Confidence (HIGH/MEDIUM/LOW)
-3. Overall score (0.0-1.0)
-4. Detailed reason (2-3 sentences explaining decision)
-
-Respond with ONLY valid JSON:
-{{
-  "verdict": string,
-  "confidence": string,
-  "overall_score": float,
-  "reason": string
-}}""".strip()
-    
-    messages = [{"role": "user", "content": prompt}]
-    chat = tokenizer.apply_chat_template(
-        messages,
-        tokenize=False,
-        add_generation_prompt=True
-    )
-    
-    inputs = tokenizer(chat, return_tensors="pt").to(model.device)
+Based on the COMPLETE interview, make a hiring decision.
+Respond with ONLY valid JSON in the format above.""".strip()
     
     print("\nRunning final verdict LLM...", flush=True)
     
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_new_tokens=400,
-            do_sample=False,
-            pad_token_id=tokenizer.pad_token_id or tokenizer.eos_token_id
-        )
+    generated_only = get_client().generate(prompt, max_new_tokens=400, prefix=prefix)
     
     elapsed = time.time() - start
     print(f"Final verdict LLM finished in {elapsed:.2f}s", flush=True)
     
-    decoded = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    if chat in decoded:
-        generated_only = decoded.split(chat)[-1].strip()
-    else:
-        generated_only = decoded
-    
     result = extract_last_json(generated_only)
     
     if result is None:
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Stage modules import each other as top-level packages (stage1_extraction, pipeline, ...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from stage1_extraction.audio_features import compute_feature_columns, iter_feature_blocks
+
+SR = 16000
+HOP = 160
+
+def tone(freq, seconds=2.0, amplitude=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+@pytest.mark.parametrize("freq", [90.0, 110.0, 150.0, 220.0, 300.0, 375.0, 440.0, 450.0])
+def test_tone_pitch(freq):
+    f0 = compute_feature_columns(tone(freq), SR)["pitch_hz"]
+    # Edge frames are half zero-padded
+    assert np.abs(f0[2:-2] - freq).max() < 0.1
+
+def test_rms_matches_librosa():
+    librosa = pytest.importorskip("librosa")
+    y = np.random.default_rng(0).normal(0, 0.1, SR * 3 + 77).astype(np.float32)
+    rms = compute_feature_columns(y, SR)["rms_energy"]
+    expected = librosa.feature.rms(y=y, frame_length=400, hop_length=HOP)[0][::10]
+    assert rms.shape == expected.shape
+    assert np.abs(rms - expected).max() < 1e-8
+
+@pytest.mark.parametrize("y", [
+    np.random.default_rng(1).normal(0, 0.1, SR * 5).astype(np.float32),
+    np.zeros(SR * 2, dtype=np.float32)
+], ids=["noise", "silence"])
+def test_unvoiced_has_zero_pitch(y):
+    assert not compute_feature_columns(y, SR)["pitch_hz"].any()
+
+@pytest.mark.parametrize("n", [0, 1, HOP - 1, HOP, 10 * HOP, 10 * HOP + 1, SR * 3 + 77])
+def test_frame_count(n):
+    frame_idx = compute_feature_columns(np.zeros(n, dtype=np.float32) + 0.01, SR)["frame_idx"]
+    # Centred framing like librosa: 1 + len(y) // hop hops, every 10th kept
+    assert frame_idx.tolist() == list(range(0, 1 + n // HOP, 10))
+
+def test_block_size_does_not_change_results():
+    rng = np.random.default_rng(2)
+    y = np.concatenate([tone(180.0, 3.0), rng.normal(0, 0.05, SR * 2), tone(260.0, 4.0)])
+    y = y.astype(np.float32)
+    reference = compute_feature_columns(y, SR, block_frames=1000)
+    for block_frames in (1, 7, 30):
+        blocks = list(iter_feature_blocks(y, SR, block_frames=block_frames))
+        assert all(len(b[0]) <= block_frames for b in blocks)
+        columns = compute_feature_columns(y, SR, block_frames=block_frames)
+        assert np.array_equal(columns["frame_idx"], reference["frame_idx"])
+        assert np.array_equal(columns["rms_energy"], reference["rms_energy"])
+        # Batched FFTs over a different number of rows may differ in the last ulp
+        np.testing.assert_allclose(columns["pitch_hz"], reference["pitch_hz"], rtol=1e-12, atol=0)
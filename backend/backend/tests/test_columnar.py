@@ -0,0 +1,56 @@
+import json
+import numpy as np
+from stage1_extraction.audio_features import features_to_list
+from stage1_extraction.candidate_video import build_frame_feature
+from stage1_extraction.columnar import (
+    load_audio_columns, load_video_columns, save_audio_columns, save_video_columns,
+    video_columns_from_frames
+)
+
+def audio_columns(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    pitch = rng.uniform(80, 300, n)
+    pitch[rng.random(n) < 0.3] = 0.0
+    return {
+        "frame_idx": np.arange(n, dtype=np.int32),
+        "rms_energy": rng.uniform(0, 0.5, n),
+        "pitch_hz": pitch,
+        "hop_sec": 0.1
+    }
+
+def video_frames(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(n):
+        faces = [] if rng.random() < 0.2 else [tuple(rng.integers(0, 400, 2)) + (120, 140)]
+        frames.append(build_frame_feature(i * 10, i * 10 / 25.0, faces, (720, 1280, 3)))
+    return frames
+
+def test_audio_npz_round_trip_matches_json_view(tmp_path):
+    columns = audio_columns()
+    save_audio_columns(tmp_path, columns)
+    from_npz = load_audio_columns(tmp_path)
+
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    with open(json_dir / "candidate_audio_raw.json", "w") as f:
+        json.dump({"features": features_to_list(columns)}, f)
+    from_json = load_audio_columns(json_dir)
+
+    for key in ("frame_idx", "timestamp_sec", "rms_energy", "pitch_hz"):
+        np.testing.assert_array_equal(from_npz[key], from_json[key], err_msg=key)
+
+def test_video_npz_round_trip_matches_json_view(tmp_path):
+    frames = video_frames()
+    save_video_columns(tmp_path, video_columns_from_frames(frames, 25.0, 1280, 720))
+    from_npz = load_video_columns(tmp_path)
+
+    json_dir = tmp_path / "json"
+    json_dir.mkdir()
+    with open(json_dir / "candidate_video_raw.json", "w") as f:
+        json.dump({"extraction": {"frames": frames}}, f)
+    from_json = load_video_columns(json_dir)
+
+    assert set(from_npz) == set(from_json)
+    for key in from_npz:
+        np.testing.assert_allclose(from_npz[key], from_json[key], atol=1e-9, err_msg=key)
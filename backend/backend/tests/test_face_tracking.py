@@ -0,0 +1,65 @@
+import numpy as np
+from stage1_extraction.face_tracking import FaceTracker
+
+class StubDetector:
+    """detect_fn that records the image shapes it saw and replays queued results."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.shapes = []
+
+    def __call__(self, gray):
+        self.shapes.append(gray.shape)
+        return self.results.pop(0)
+
+def frame(level=100):
+    gray = np.full((240, 320), level, np.uint8)
+    gray[:, ::8] = 0        # some structure, so the thumbnail is not flat
+    return gray
+
+def test_static_frames_reuse_the_last_detection():
+    detect = StubDetector([(100, 60, 40, 40)])
+    tracker = FaceTracker(detect)
+    first = tracker.detect(frame())
+    assert np.array_equal(tracker.detect(frame()), first)
+    assert np.array_equal(tracker.detect(frame(101)), first)    # below the motion threshold
+    assert detect.shapes == [(240, 320)]
+    assert tracker.stats == {"motion_skip": 2, "roi_hit": 0, "full_frame": 1}
+
+def test_roi_detections_are_mapped_back_to_frame_coordinates():
+    detect = StubDetector([(100, 60, 40, 40)], [(5, 7, 30, 30)])
+    tracker = FaceTracker(detect, roi_expand=0.5)
+    tracker.detect(frame())
+    faces = tracker.detect(frame(180))
+    # ROI = bbox grown by 20 px per side: x 80..160, y 40..120
+    assert detect.shapes[1] == (80, 80)
+    assert faces.tolist() == [[85, 47, 30, 30]]
+    assert tracker.stats == {"motion_skip": 0, "roi_hit": 1, "full_frame": 1}
+
+def test_roi_is_clipped_at_the_frame_border():
+    detect = StubDetector([(0, 0, 40, 40)], [(1, 2, 10, 10)])
+    tracker = FaceTracker(detect)
+    tracker.detect(frame())
+    assert tracker.detect(frame(180)).tolist() == [[1, 2, 10, 10]]
+    assert detect.shapes[1] == (60, 60)
+
+def test_roi_miss_falls_back_to_the_full_frame():
+    detect = StubDetector([(100, 60, 40, 40)], (), [(200, 100, 50, 50)])
+    tracker = FaceTracker(detect)
+    tracker.detect(frame())
+    faces = tracker.detect(frame(180))
+    assert np.array_equal(faces, [(200, 100, 50, 50)])
+    assert detect.shapes == [(240, 320), (80, 80), (240, 320)]
+    assert tracker.stats == {"motion_skip": 0, "roi_hit": 0, "full_frame": 2}
+
+def test_summary_ratios():
+    detect = StubDetector((), ())
+    tracker = FaceTracker(detect)
+    tracker.detect(frame())
+    tracker.detect(frame())
+    tracker.detect(frame(180))      # no previous face: straight to a full-frame pass
+    summary = tracker.summary()
+    assert summary["frames"] == 3
+    assert summary["motion_skip_ratio"] == round(1 / 3, 4)
+    assert summary["full_frame_ratio"] == round(2 / 3, 4)
+    assert summary["roi_hit_ratio"] == 0.0
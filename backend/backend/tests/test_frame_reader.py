@@ -0,0 +1,36 @@
+import cv2
+import numpy as np
+import pytest
+from stage1_extraction.frame_reader import iter_sampled_frames
+
+pytest.importorskip("av")
+
+@pytest.fixture(scope="module")
+def clip(tmp_path_factory):
+    """300 frames of blurred noise plus a moving bright block, 25 fps."""
+    path = tmp_path_factory.mktemp("clip") / "clip.mp4"
+    rng = np.random.default_rng(0)
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, (160, 120))
+    for i in range(300):
+        frame = cv2.GaussianBlur(rng.integers(0, 256, (120, 160, 3), dtype=np.uint8), (9, 9), 3)
+        cv2.rectangle(frame, (i % 140, 40), (i % 140 + 20, 70), (40, 200, 255), -1)
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+@pytest.mark.parametrize("targets", [None, [0, 5, 6, 120, 121, 250, 299]])
+def test_av_reader_matches_grab_at_native_size(clip, targets):
+    grab = list(iter_sampled_frames(clip, 10, "grab", targets=targets))
+    av = list(iter_sampled_frames(clip, 10, "av", targets=targets))
+    assert [i for i, *_ in av] == [i for i, *_ in grab]
+    for (idx, a, a_shape), (_, g, g_shape) in zip(av, grab):
+        assert a_shape == g_shape == (120, 160)
+        assert np.array_equal(a, g), idx
+
+def test_av_reader_downscales_in_swscale(clip):
+    for (_, a, shape), (_, g, _) in zip(iter_sampled_frames(clip, 50, "av", detect_width=80),
+                                        iter_sampled_frames(clip, 50, "grab", detect_width=80)):
+        assert a.shape == g.shape == (60, 80)
+        assert shape == (120, 160)
+        # Different resampling and luma coefficients; close, not identical
+        assert np.abs(a.astype(int) - g).mean() < 8
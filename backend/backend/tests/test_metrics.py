@@ -0,0 +1,89 @@
+import json
+import numpy as np
+from stage1_extraction.audio_features import features_to_list
+from stage1_extraction.candidate_video import build_frame_feature
+from stage1_extraction.columnar import load_audio_columns, load_video_columns
+from stage3_behavior.metrics import audio_metric_arrays, video_metric_arrays
+
+def naive_audio(features, start, end):
+    """Per-segment reference: the original filter-then-reduce loop, unrounded."""
+    seg = [f for f in features if start <= f["timestamp_sec"] <= end]
+    if not seg:
+        return dict.fromkeys(("pitch_mean", "pitch_variance", "energy_mean", "energy_variance",
+                              "speech_rate", "pause_density", "prosodic_variability"), 0.0)
+    pitches = [f["pitch_hz"] for f in seg if f["pitch_hz"] > 0]
+    energies = [f["rms_energy"] for f in seg]
+    energy_mean = float(np.mean(energies))
+    threshold = energy_mean * 0.1 if energy_mean > 0 else 0.001
+    duration = end - start
+    pitch_var = float(np.mean(np.abs(np.diff(pitches)))) if len(pitches) > 1 else 0.0
+    energy_var = float(np.mean(np.abs(np.diff(energies)))) if len(energies) > 1 else 0.0
+    return {
+        "pitch_mean": float(np.mean(pitches)) if pitches else 0.0,
+        "pitch_variance": float(np.var(pitches)) if len(pitches) > 1 else 0.0,
+        "energy_mean": energy_mean,
+        "energy_variance": float(np.var(energies)) if len(energies) > 1 else 0.0,
+        "speech_rate": len(seg) / duration if duration > 0 else 0.0,
+        "pause_density": sum(e < threshold for e in energies) / len(energies),
+        "prosodic_variability": pitch_var + energy_var
+    }
+
+def naive_video(frames, start, end):
+    seg = [f for f in frames if start <= f["timestamp_sec"] <= end]
+    if not seg:
+        return dict.fromkeys(("face_presence_ratio", "head_motion_mean", "head_motion_variance",
+                              "gaze_stability", "facial_motion_intensity",
+                              "expression_change_rate"), 0.0)
+    poses = [[f["head_pose"][k] for k in ("yaw", "pitch", "roll")] for f in seg if f["head_pose"]]
+    motions = np.linalg.norm(np.diff(poses, axis=0), axis=1) if len(poses) > 1 else []
+    gx = [f["gaze"]["offset_x"] for f in seg if f["gaze"]]
+    gy = [f["gaze"]["offset_y"] for f in seg if f["gaze"]]
+    centroids = [np.mean([(lm["x"], lm["y"]) for lm in f["landmarks"]], axis=0)
+                 for f in seg if f["landmarks"]]
+    facial = np.linalg.norm(np.diff(centroids, axis=0), axis=1) if len(centroids) > 1 else []
+    facial_mean = float(np.mean(facial)) if len(facial) else 0.0
+    return {
+        "face_presence_ratio": sum(f["face_detected"] for f in seg) / len(seg),
+        "head_motion_mean": float(np.mean(motions)) if len(motions) else 0.0,
+        "head_motion_variance": float(np.var(motions)) if len(motions) > 1 else 0.0,
+        "gaze_stability": (float(np.var(gx)) if len(gx) > 1 else 0.0)
+                          + (float(np.var(gy)) if len(gy) > 1 else 0.0),
+        "facial_motion_intensity": facial_mean,
+        "expression_change_rate": facial_mean
+    }
+
+def make_inputs(tmp_path, seed=0):
+    rng = np.random.default_rng(seed)
+    n = 3000
+    pitch = rng.uniform(80, 300, n)
+    pitch[rng.random(n) < 0.4] = 0.0
+    features = features_to_list({
+        "frame_idx": np.arange(n), "rms_energy": rng.uniform(0, 0.3, n) ** 2,
+        "pitch_hz": pitch, "hop_sec": 0.1
+    })
+    frames = []
+    for i in range(0, 7500, 10):
+        faces = [] if rng.random() < 0.25 else [tuple(rng.integers(200, 600, 2)) + (150, 150)]
+        frames.append(build_frame_feature(i, i / 25.0, faces, (720, 1280, 3)))
+    with open(tmp_path / "candidate_audio_raw.json", "w") as f:
+        json.dump({"features": features}, f)
+    with open(tmp_path / "candidate_video_raw.json", "w") as f:
+        json.dump({"extraction": {"frames": frames}}, f)
+
+    # Unsorted, overlapping, zero-length and empty (past the end) intervals
+    starts = np.round(rng.uniform(0, 320, 80), 3)
+    ends = np.round(starts + rng.choice([0.0, 0.05, 2.0, 15.0, 60.0], 80), 3)
+    return features, frames, starts.tolist(), ends.tolist()
+
+def test_prefix_sum_metrics_match_naive(tmp_path):
+    features, frames, starts, ends = make_inputs(tmp_path)
+    audio = audio_metric_arrays(load_audio_columns(tmp_path), starts, ends)
+    video = video_metric_arrays(load_video_columns(tmp_path), starts, ends)
+
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        expected_audio = naive_audio(features, start, end)
+        expected_video = naive_video(frames, start, end)
+        for key, value in expected_audio.items():
+            assert np.isclose(audio[key][i], value, rtol=1e-7, atol=1e-9), (key, start, end)
+        for key, value in expected_video.items():
+            assert np.isclose(video[key][i], value, rtol=1e-7, atol=1e-9), (key, start, end)
@@ -0,0 +1,94 @@
+import json
+import numpy as np
+import pytest
+from stage1_extraction.audio_features import features_to_list
+from stage1_extraction.candidate_video import build_frame_feature
+from stage1_extraction.columnar import load_audio_columns, load_video_columns
+from stage3_behavior import metrics
+from stage3_behavior.metrics import AUDIO_METRIC_DECIMALS, VIDEO_METRIC_DECIMALS
+from stage3_behavior.online import OnlineBehaviorMetrics
+
+DURATION = 1200.0
+
+def make_stream(tmp_path, seed=0):
+    """Stage 1/2 outputs for a 20-minute recording with back-to-back speaking segments."""
+    rng = np.random.default_rng(seed)
+    n = int(DURATION / 0.1)
+    pitch = rng.uniform(80, 300, n)
+    pitch[rng.random(n) < 0.4] = 0.0
+    energy = rng.uniform(0, 0.3, n) ** 2
+    energy[rng.random(n) < 0.1] = 0.0
+    features = features_to_list({
+        "frame_idx": np.arange(n), "rms_energy": energy, "pitch_hz": pitch, "hop_sec": 0.1
+    })
+    frames = []
+    for i in range(0, int(DURATION * 25), 10):
+        faces = [] if rng.random() < 0.25 else [tuple(rng.integers(200, 600, 2)) + (150, 150)]
+        frames.append(build_frame_feature(i, i / 25.0, faces, (720, 1280, 3)))
+    with open(tmp_path / "candidate_audio_raw.json", "w") as f:
+        json.dump({"features": features}, f)
+    with open(tmp_path / "candidate_video_raw.json", "w") as f:
+        json.dump({"extraction": {"frames": frames}}, f)
+
+    segments, t = [], 0.5
+    while t < DURATION - 30:
+        start = round(t, 3)
+        end = round(start + rng.uniform(1.0, 25.0), 3)
+        segments.append({"segment_id": f"SEG{len(segments) + 1}", "type": "speaking",
+                         "start_time": start, "end_time": end})
+        t = end + rng.uniform(0.3, 5.0)
+    with open(tmp_path / "speaking_segments.json", "w") as f:
+        json.dump({"segments": segments}, f)
+    return segments
+
+def assert_close(online, batch):
+    assert online["segment_id"] == batch["segment_id"]
+    for group, decimals in (("audio_metrics", AUDIO_METRIC_DECIMALS),
+                            ("video_metrics", VIDEO_METRIC_DECIMALS)):
+        for key, d in decimals.items():
+            # Streaming and prefix-sum sums round differently in the last digit
+            assert online[group][key] == pytest.approx(batch[group][key], abs=1.5 * 10 ** -d), \
+                (online["segment_id"], key)
+
+def test_streamed_metrics_match_batch_run(tmp_path):
+    segments = make_stream(tmp_path)
+    metrics.run(tmp_path, series=False)
+    with open(tmp_path / "candidate_behavior_metrics.json") as f:
+        expected = {s["segment_id"]: s for s in json.load(f)["segments"]}
+
+    audio = load_audio_columns(tmp_path)
+    video = load_video_columns(tmp_path)
+    online = OnlineBehaviorMetrics(replay_sec=60.0)
+    emitted, pending, peak = {}, list(segments), 0
+    for tick in np.arange(1.0, DURATION + 1.0, 1.0):
+        a = (audio["timestamp_sec"] >= tick - 1.0) & (audio["timestamp_sec"] < tick)
+        v = (video["timestamp_sec"] >= tick - 1.0) & (video["timestamp_sec"] < tick)
+        online.push_audio_columns({k: audio[k][a] for k in ("timestamp_sec", "rms_energy", "pitch_hz")})
+        online.push_video_columns({k: np.asarray(col)[v] for k, col in video.items()
+                                   if np.ndim(col) == 1 and len(col) == len(v)})
+        # VAD hands over a segment a couple of seconds after it ends
+        while pending and pending[0]["end_time"] + 2.0 < tick:
+            seg = pending.pop(0)
+            online.add_segment(seg["segment_id"], seg["start_time"], seg["end_time"])
+        for seg in online.updated_metrics():
+            emitted[seg["segment_id"]] = seg
+        peak = max(peak, len(online._audio_times), len(online._video_times))
+
+    assert not pending
+    assert emitted.keys() == expected.keys()
+    for segment_id, seg in emitted.items():
+        assert_close(seg, expected[segment_id])
+    for seg in online.all_metrics():
+        assert_close(seg, expected[seg["segment_id"]])
+
+    # Replay buffers stay bounded instead of holding the whole recording
+    assert peak < len(audio["timestamp_sec"]) / 2
+    assert all(acc.energies is None for acc in online.segments.values())
+
+def test_segment_behind_replay_horizon_is_rejected():
+    online = OnlineBehaviorMetrics(replay_sec=10.0)
+    for i in range(300):
+        online.push_audio(i * 0.1, 0.01, 120.0)
+    online.add_segment("SEG1", 20.0, 29.0)
+    with pytest.raises(ValueError):
+        online.add_segment("SEG0", 5.0, 8.0)
@@ -0,0 +1,86 @@
+import importlib.util
+import json
+import pytest
+from llm_service import client, model
+from pipeline.stages import SRC_DIR
+from stage4_semantic import relevance
+from stage5_aggregation import aggregate
+
+ASSESSMENT = json.dumps({
+    "relevance_score": 0.6, "matched_keywords": ["python"], "relevance_reason": "r",
+    "technical_depth": 0.5, "system_design": 0.5, "production_experience": 0.5,
+    "communication_clarity": 0.5, "problem_solving": 0.5,
+    "incremental_verdict": "adequate_progress", "assessment_reason": "r", "reason": "r"
+})
+VERDICT = json.dumps({"verdict": "HIRE", "confidence": "HIGH", "overall_score": 0.7, "reason": "r"})
+
+@pytest.fixture
+def calls(monkeypatch):
+    """In-process model that records (prompt, prefix) for every generate() call."""
+    recorded = []
+    def generate(prompt, max_new_tokens, prefix=None):
+        recorded.append((prompt, prefix))
+        return VERDICT if "final hiring decision" in prompt else ASSESSMENT
+    monkeypatch.setattr(model, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(model, "truncate_tail", lambda text, n: " ".join(text.split()[-n:]))
+    monkeypatch.setattr(model, "generate", generate)
+    monkeypatch.setattr(client, "_client", client.LLMClient("http://127.0.0.1:9"))
+    return recorded
+
+@pytest.fixture
+def inputs(tmp_path):
+    qa_pairs = [
+        {"question_id": f"Q{i}", "question_text": f"Question {i}?",
+         "answer": {"text": f"Answer number {i} about python and serving."}}
+        for i in range(1, 5)
+    ]
+    (tmp_path / "qa_pairs.json").write_text(json.dumps({"qa_pairs": qa_pairs}))
+    jd = tmp_path / "jd.md"
+    jd.write_text("ML engineer: Python, PyTorch, model serving.")
+    return tmp_path, jd
+
+def assert_shared_prefixes(calls, expected_families):
+    prefixes = {}
+    for prompt, prefix in calls:
+        assert prefix and prompt.startswith(prefix)
+        assert "ML engineer: Python" in prefix
+        prefixes.setdefault(prefix.split("\n", 1)[0], set()).add(prefix)
+    # One identical prefix per prompt family, however many questions were asked
+    assert len(prefixes) == expected_families
+    assert all(len(p) == 1 for p in prefixes.values())
+
+def test_stage_4_5_prompts_share_a_per_run_prefix(calls, inputs):
+    output_dir, jd = inputs
+    spec = importlib.util.spec_from_file_location("stage4_5", SRC_DIR / "stage4+5" / "4+5.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.run(output_dir, jd)
+    assert len(calls) == 5
+    assert_shared_prefixes(calls, expected_families=2)
+
+def test_relevance_prompts_share_a_per_run_prefix(calls, inputs):
+    output_dir, jd = inputs
+    relevance.run(output_dir, jd)
+    assert len(calls) == 4
+    assert_shared_prefixes(calls, expected_families=1)
+
+def test_stage_5_prompts_share_a_per_run_prefix(calls, inputs):
+    output_dir, jd = inputs
+    relevance.run(output_dir, jd)
+    calls.clear()
+    aggregate.run(output_dir, jd)
+    assert len(calls) == 5
+    assert_shared_prefixes(calls, expected_families=2)
+
+def test_prefix_cache_keeps_one_jd_prefix_per_family(monkeypatch):
+    class Ids:
+        def __init__(self, n):
+            self.shape = (1, n)
+    # A long JD puts each family's prefix at ~7k tokens
+    cache = model.OrderedDict(assessment=(Ids(7000), None))
+    monkeypatch.setattr(model, "_prefix_cache", cache)
+    assert 7000 <= min(model.MAX_CONTEXT_TOKENS, model.PREFIX_CACHE_MAX_TOKENS)
+    # Making room for the verdict prefix must not evict the assessment prefix
+    model._evict_prefixes(model.PREFIX_CACHE_MAX_TOKENS - 7000)
+    assert list(cache) == ["assessment"]
+    assert model.PREFIX_CACHE_SIZE >= 2
@@ -0,0 +1,74 @@
+import json
+import pytest
+from llm_service import client, model
+from llm_service.model import plan_batches
+from stage4_semantic import relevance
+
+def test_parse_relevance_takes_json_out_of_surrounding_text():
+    text = 'Sure, here it is:\n{"score": 0.7, "keywords": ["pytorch"], "reason": "ok"}\nDone.'
+    assert relevance.parse_relevance(text) == {"score": 0.7, "keywords": ["pytorch"], "reason": "ok"}
+
+def test_parse_relevance_nested_json():
+    text = '{"score": 0.5, "keywords": [], "reason": "r", "detail": {"a": 1}}'
+    assert relevance.parse_relevance(text)["detail"] == {"a": 1}
+
+@pytest.mark.parametrize("text", ["", "no json here", '{"score": 0.5,', "{not json}"])
+def test_parse_relevance_invalid_output_scores_zero(text):
+    assert relevance.parse_relevance(text) == {
+        "score": 0.0, "keywords": [], "reason": "LLM output invalid JSON"
+    }
+
+@pytest.mark.parametrize("max_batch_size,token_budget", [(1, 16384), (4, 4000), (8, 16384), (8, 900)])
+def test_plan_batches_respects_limits(max_batch_size, token_budget):
+    lengths = [((i * 7919) % 600) + 50 for i in range(100)]
+    max_new = 300
+    batches = plan_batches(lengths, max_new, max_batch_size, token_budget)
+
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    window = max_batch_size * model.SORT_WINDOW_BATCHES
+    for batch in batches:
+        assert len(batch) <= max_batch_size
+        # batch[0] is the longest row and sets the padded width
+        assert lengths[batch[0]] == max(lengths[i] for i in batch)
+        if len(batch) > 1:
+            assert len(batch) * (lengths[batch[0]] + max_new) <= token_budget
+        # Length sorting never moves a prompt out of its window, so output can stream
+        assert len({i // window for i in batch}) == 1
+
+def test_plan_batches_empty():
+    assert plan_batches([], 300) == []
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Deterministic in-process model: the reply depends only on the prompt."""
+    def generate_batch(prompts, max_new_tokens):
+        return [json.dumps({"score": (len(p) % 97) / 100, "keywords": [str(len(p))], "reason": "r"})
+                for p in prompts]
+    monkeypatch.setattr(model, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(model, "truncate_tail", lambda text, n: " ".join(text.split()[-n:]))
+    monkeypatch.setattr(model, "generate_batch", generate_batch)
+    monkeypatch.setattr(model, "generate",
+                        lambda prompt, n, prefix=None: generate_batch([prompt], n)[0])
+    monkeypatch.setattr(client, "_client", client.LLMClient("http://127.0.0.1:9"))
+
+def test_batched_scoring_matches_sequential(tmp_path, fake_model):
+    qa_pairs = [
+        {
+            "question_id": f"Q{i}",
+            "question_text": "question " * (i % 5 + 1),
+            "answer": {"text": "word " * (i * 37 % 400) if i % 6 else ""}
+        }
+        for i in range(1, 31)
+    ]
+    (tmp_path / "qa_pairs.json").write_text(json.dumps({"qa_pairs": qa_pairs}))
+    jd = tmp_path / "jd.md"
+    jd.write_text("Machine learning engineer: PyTorch, serving, MLOps.")
+
+    relevance.run(tmp_path, jd, batch_size=1)
+    sequential = (tmp_path / "relevance_scores.json").read_text()
+    relevance.run(tmp_path, jd, batch_size=4, token_budget=3000)
+    batched = (tmp_path / "relevance_scores.json").read_text()
+
+    assert batched == sequential
+    rows = [json.loads(line) for line in sequential.splitlines()]
+    assert [r["qa_id"] for r in rows] == [qa["question_id"] for qa in qa_pairs]
@@ -0,0 +1,89 @@
+import json
+import os
+from pipeline import runs
+
+def test_runs_are_numbered_and_the_output_link_follows_success(tmp_path):
+    results, output = tmp_path / "results", tmp_path / "output"
+    first = runs.create_run(results, run_id="a")
+    second = runs.create_run(results, run_id="b")
+    assert (first.name, second.name) == ("001-a", "002-b")
+
+    (first / "x.json").write_text("same")
+    runs.finish_run(results, first, output, success=True)
+    (second / "x.json").write_text("same")
+    (second / "y.json").write_text("new")
+    runs.finish_run(results, second, output, success=True)
+    assert output.resolve() == second.resolve()
+
+    failed = runs.create_run(results)
+    runs.finish_run(results, failed, output, success=False)
+    assert output.resolve() == second.resolve()
+
+    third = runs.create_run(results, run_id="c")
+    (third / "x.json").write_text("same")
+    runs.finish_run(results, third, output, success=True)
+    # Once superseded, identical artifacts are hardlinked to the run before instead of duplicated
+    assert os.path.samefile(first / "x.json", second / "x.json")
+    assert not os.path.samefile(first / "x.json", second / "y.json")
+    assert not os.path.samefile(second / "x.json", third / "x.json")
+    assert (first / "x.json").stat().st_mode & 0o777 == runs.READ_ONLY
+
+    index = json.loads((results / runs.INDEX_FILE).read_text())
+    assert [r["status"] for r in index["runs"]] == ["complete", "complete", "failed", "complete"]
+    assert index["latest"] == third.name
+
+def test_writes_through_output_leave_snapshots_intact(tmp_path):
+    results, output = tmp_path / "results", tmp_path / "output"
+    cached = tmp_path / "cache_entry.json"
+    cached.write_text("cached")
+    snapshots = []
+    for run_id in ("a", "b", "c"):
+        run_dir = runs.create_run(results, run_id=run_id)
+        (run_dir / "qa_pairs.json").write_text("same")
+        os.link(cached, run_dir / "restored.json")      # as StageCache.restore places it
+        runs.finish_run(results, run_dir, output, success=True)
+        snapshots.append(run_dir)
+    assert os.path.samefile(snapshots[0] / "qa_pairs.json", snapshots[1] / "qa_pairs.json")
+
+    (output / "qa_pairs.json").write_text("EDITED")
+    (output / "restored.json").write_text("EDITED")
+    for run_dir in snapshots[:2]:
+        assert (run_dir / "qa_pairs.json").read_text() == "same"
+        assert (run_dir / "restored.json").read_text() == "cached"
+    assert cached.read_text() == "cached"
+
+def test_migrate_moves_a_real_output_dir(tmp_path):
+    results, output = tmp_path / "results", tmp_path / "output"
+    output.mkdir()
+    (output / "timeline.json").write_text("{}")
+    runs.migrate_output_dir(output, results)
+    assert not output.exists()
+    (migrated,) = [d for d in results.iterdir() if d.is_dir()]
+    assert (migrated / "timeline.json").read_text() == "{}"
+
+
+def test_workspace_is_removed_by_its_last_user(tmp_path):
+    media = []
+    for name in ("video.mp4", "candidate.wav", "interviewer.wav"):
+        (tmp_path / name).write_bytes(name.encode())
+        media.append(str(tmp_path / name))
+    root = tmp_path / "temp_input"
+
+    class Cache:
+        @staticmethod
+        def source_digest(path):
+            return open(path, "rb").read().hex()
+
+    with runs.use_workspace(root, "7", *media, cache=Cache()) as first:
+        assert sorted(p.name for p in first.iterdir()) == [
+            "7_candidate_audio.wav", "7_candidate_video.mp4", "7_interviewer_audio.wav"
+        ]
+        # A concurrent run of the same recording shares the content-named directory
+        with runs.use_workspace(root, "7", *media, cache=Cache()) as second:
+            assert second == first
+        assert first.exists()
+    assert list(root.iterdir()) == []
+
+    with runs.use_workspace(root, "7", *media) as a, runs.use_workspace(root, "7", *media) as b:
+        assert a != b
+    assert list(root.iterdir()) == []
@@ -0,0 +1,44 @@
+import json
+from stage1_extraction.candidate_video import build_frame_feature
+from stage1_extraction.columnar import save_video_columns, video_columns_from_frames
+from stage2_temporal.segmentation import build_speaking_segments
+
+def write_frames(path, frame_indices):
+    frames = [build_frame_feature(i, i / 25.0, [], (720, 1280, 3)) for i in frame_indices]
+    with open(path, "w") as f:
+        json.dump({"extraction": {"frames": frames}}, f)
+    return frames
+
+def inputs(tmp_path):
+    audio = tmp_path / "candidate_audio_raw.json"
+    audio.write_text(json.dumps({"vad_segments": [
+        {"type": "speaking", "start_sec": 1.0, "end_sec": 2.0},
+        {"type": "silence", "start_sec": 2.0, "end_sec": 3.0},
+        {"type": "speaking", "start_sec": 3.0, "end_sec": 3.5}
+    ]}))
+    timeline = tmp_path / "timeline.json"
+    timeline.write_text(json.dumps({"video": {"duration_sec": 4.0}}))
+    return audio, timeline
+
+def test_frames_come_from_the_given_video_file(tmp_path):
+    audio, timeline = inputs(tmp_path)
+    # Stage 1C output for a different sampling sits in the same directory
+    stage1c = write_frames(tmp_path / "candidate_video_raw.json", range(0, 100, 10))
+    save_video_columns(tmp_path, video_columns_from_frames(stage1c, 25.0, 1280, 720))
+    other = tmp_path / "resampled_video.json"
+    write_frames(other, range(0, 100, 5))
+
+    segments = build_speaking_segments(audio, other, timeline)["segments"]
+    assert [s["video_frames"] for s in segments] == [[25, 30, 35, 40, 45, 50], [75, 80, 85]]
+
+    segments = build_speaking_segments(audio, tmp_path / "candidate_video_raw.json", timeline)
+    assert [s["video_frames"] for s in segments["segments"]] == [[30, 40, 50], [80]]
+
+def test_stage_1c_json_without_npz(tmp_path):
+    audio, timeline = inputs(tmp_path)
+    video_dir = tmp_path / "elsewhere"
+    video_dir.mkdir()
+    write_frames(video_dir / "candidate_video_raw.json", range(0, 100, 10))
+    segments = build_speaking_segments(audio, video_dir / "candidate_video_raw.json", timeline)
+    assert [s["segment_id"] for s in segments["segments"]] == ["SEG1", "SEG2"]
+    assert [s["video_frames"] for s in segments["segments"]] == [[30, 40, 50], [80]]
@@ -0,0 +1,29 @@
+import numpy as np
+from stage1_extraction.candidate_video import plan_sample_indices
+
+def test_no_gating_needed_when_all_speech():
+    planned = plan_sample_indices(250, 25.0, [{"start_sec": 0.0, "end_sec": 10.0}], 10, pad_sec=0.0)
+    np.testing.assert_array_equal(planned, np.arange(0, 250, 10))
+
+def test_speech_frames_are_the_ungated_grid_inside_padded_segments():
+    segments = [
+        {"start_sec": 2.0, "end_sec": 3.0, "type": "speaking"},
+        {"start_sec": 6.0, "end_sec": 6.5, "type": "silence"},
+        {"start_sec": 8.0, "end_sec": 9.0, "type": "speaking"}
+    ]
+    planned = plan_sample_indices(300, 25.0, segments, 10, pad_sec=0.5)
+    t = planned / 25.0
+    assert set(planned) <= set(range(0, 300, 10))
+    assert all((1.5 <= x <= 3.5) or (7.5 <= x <= 9.5) for x in t)
+    np.testing.assert_array_equal(planned, [40, 50, 60, 70, 80, 190, 200, 210, 220, 230])
+
+def test_silence_sampling_adds_a_sparse_grid():
+    segments = [{"start_sec": 2.0, "end_sec": 3.0}]
+    planned = plan_sample_indices(300, 25.0, segments, 10, silence_sample_interval=100,
+                                  pad_sec=0.0)
+    np.testing.assert_array_equal(planned, [0, 50, 60, 70, 100, 200])
+
+def test_nested_segments_do_not_hide_later_speech():
+    segments = [{"start_sec": 0.0, "end_sec": 10.0}, {"start_sec": 1.0, "end_sec": 2.0}]
+    planned = plan_sample_indices(300, 25.0, segments, 10, pad_sec=0.0)
+    np.testing.assert_array_equal(planned, np.arange(0, 251, 10))
@@ -0,0 +1,102 @@
+import shutil
+from pathlib import Path
+import pytest
+from pipeline.cache import StageCache
+from pipeline.dag import Pipeline, Stage
+from pipeline.stages import SRC_DIR, TIMELINE, build_pipeline
+
+def double(output_dir, factor=2):
+    text = (Path(output_dir) / "in.txt").read_text()
+    (Path(output_dir) / "out.txt").write_text(text * factor)
+
+def make_stage(source, output_dir=".", **kwargs):
+    return Stage("DOUBLE", double, (str(output_dir),), kwargs, inputs=["in.txt"], outputs=["out.txt"],
+                 key="D", sources=[source])
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(tmp_path / "cache", SRC_DIR)
+
+@pytest.fixture
+def run_dir(tmp_path):
+    d = tmp_path / "run"
+    d.mkdir()
+    (d / "in.txt").write_text("abc")
+    (tmp_path / "source.txt").write_text("jd")
+    return d
+
+def test_fingerprint_tracks_content_not_paths(cache, run_dir, tmp_path):
+    stage = make_stage(tmp_path / "source.txt")
+    base = cache.fingerprint(stage, run_dir)
+
+    other = tmp_path / "other"
+    shutil.copytree(run_dir, other)
+    shutil.copy(tmp_path / "source.txt", tmp_path / "source_copy.txt")
+    assert cache.fingerprint(make_stage(tmp_path / "source_copy.txt"), other) == base
+
+    assert cache.fingerprint(make_stage(tmp_path / "source.txt", factor=3), run_dir) != base
+    (other / "in.txt").write_text("abd")
+    assert cache.fingerprint(stage, other) != base
+    (tmp_path / "source_copy.txt").write_text("jd2")
+    assert cache.fingerprint(make_stage(tmp_path / "source_copy.txt"), run_dir) != base
+
+def test_pipeline_restores_unchanged_stages(cache, run_dir, tmp_path):
+    def pipeline(force=()):
+        p = Pipeline(run_dir, cache=cache, force=force)
+        p.add(make_stage(tmp_path / "source.txt", run_dir))
+        p.run(provided=["in.txt"])
+        return p
+
+    assert pipeline().cached == []
+    (run_dir / "out.txt").unlink()
+    assert pipeline().cached == ["DOUBLE"]
+    assert (run_dir / "out.txt").read_text() == "abcabc"
+    assert pipeline(force=["D"]).cached == []
+
+def test_entries_survive_writes_to_run_files(cache, run_dir, tmp_path):
+    stage = make_stage(tmp_path / "source.txt", run_dir)
+    fingerprint = cache.fingerprint(stage, run_dir)
+    double(run_dir)
+    cache.store(stage, fingerprint, run_dir)
+    entry = cache._entry(stage, fingerprint)
+    assert (entry / "out.txt").stat().st_mode & 0o777 == 0o444
+
+    # The producing run's file is not linked into the entry
+    (run_dir / "out.txt").write_text("EDITED")
+    assert cache.restore(stage, fingerprint, run_dir)
+    assert (run_dir / "out.txt").read_text() == "abcabc"
+
+    # A restored file is a hardlink; an in-place write through it is caught by the digest
+    (run_dir / "out.txt").write_text("EDITED")
+    assert not cache.restore(stage, fingerprint, run_dir)
+    assert not entry.exists()
+
+def build(tmp_path, **video_options):
+    media = {}
+    for name in ("video.mp4", "candidate.wav", "interviewer.wav", "jd.md"):
+        media[name] = tmp_path / name
+        media[name].write_bytes(name.encode())
+    pipeline = build_pipeline(
+        tmp_path / "workspace", tmp_path / "run", "1", str(media["video.mp4"]),
+        str(media["candidate.wav"]), str(media["interviewer.wav"]), str(media["jd.md"]),
+        video_options=video_options
+    )
+    return {s.key: s for s in pipeline.stages}, media
+
+def test_ungated_1c_depends_only_on_video(tmp_path):
+    stages, media = build(tmp_path)
+    assert stages["1C"].sources == (str(media["video.mp4"]),)
+
+def test_speech_gated_1c_fingerprints_candidate_audio(cache, tmp_path):
+    stages, media = build(tmp_path, speech_gating=True)
+    stage = stages["1C"]
+    assert set(stage.sources) == {str(media["video.mp4"]), str(media["candidate.wav"])}
+    # Gated 1C runs its own VAD pre-pass, so it still does not wait for Stage 1A
+    assert stage.inputs == (TIMELINE,)
+
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    (run_dir / TIMELINE).write_text("{}")
+    before = cache.fingerprint(stage, run_dir)
+    media["candidate.wav"].write_bytes(b"different take")
+    assert cache.fingerprint(stage, run_dir) != before
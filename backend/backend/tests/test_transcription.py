@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from stage1_extraction.transcription import plan_chunks, segments_to_dicts
+
+def speaking(*spans):
+    return [{"start_sec": s, "end_sec": e, "type": "speaking"} for s, e in spans]
+
+def test_no_speech_means_no_chunks():
+    assert plan_chunks([], 30.0) == []
+    assert plan_chunks([{"start_sec": 0.0, "end_sec": 5.0, "type": "silence"}], 30.0) == []
+
+def test_chunks_cover_all_speech_and_cut_in_silence():
+    spans = [(t, t + 5.0) for t in range(0, 300, 10)]
+    chunks = plan_chunks(speaking(*spans), 300.0, target_chunk_sec=60, max_chunk_sec=120,
+                         pad_sec=0.3)
+    assert len(chunks) > 1
+    assert chunks == sorted(chunks)
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end <= start
+    for s, e in spans:
+        assert any(lo <= s and e <= hi for lo, hi in chunks)
+    for lo, hi in chunks:
+        assert hi - lo <= 120 + 2 * 0.3
+        # Every cut lies in a silence, never inside a speech span
+        assert not any(s < lo < e or s < hi < e for s, e in spans)
+
+def test_long_speech_is_hard_split():
+    chunks = plan_chunks(speaking((0.0, 300.0)), 300.0, max_chunk_sec=120, pad_sec=0.0)
+    assert chunks == [(0.0, 120.0), (120.0, 240.0), (240.0, 300.0)]
+
+def test_padding_stops_at_silence_midpoint_and_audio_bounds():
+    chunks = plan_chunks(speaking((0.1, 60.0), (60.4, 70.0)), 70.2, target_chunk_sec=50,
+                         pad_sec=0.3)
+    assert chunks == [(0.0, 60.2), (60.2, 70.2)]
+
+def test_segments_to_dicts_shifts_onto_global_timeline():
+    word = SimpleNamespace(word=" hi", start=0.5, end=0.9, probability=0.8)
+    seg = SimpleNamespace(start=0.4, end=1.0, text=" hi ", words=[word])
+    assert segments_to_dicts([seg], offset_sec=60.0) == [{
+        "start_sec": 60.4,
+        "end_sec": 61.0,
+        "text": "hi",
+        "words": [{"word": " hi", "start_sec": 60.5, "end_sec": 60.9, "probability": 0.8}]
+    }]
@@ -0,0 +1,48 @@
+import numpy as np
+from stage1_extraction.vad import SegmentBuilder, detect_levels, iter_speaking_segments
+
+SR = 16000
+FRAME = 480     # 30 ms at 16 kHz
+
+def feed(builder, flags):
+    segments = []
+    for i, is_speech in enumerate(flags):
+        seg = builder.push(i * FRAME, is_speech)
+        if seg:
+            segments.append(seg)
+    seg = builder.finish(len(flags) * FRAME)
+    if seg:
+        segments.append(seg)
+    return segments
+
+def test_hangover_merges_short_dropouts():
+    # 300 ms hangover = 10 frames; a 5-frame dropout stays inside the segment
+    flags = [True] * 10 + [False] * 5 + [True] * 10 + [False] * 20
+    segments = feed(SegmentBuilder(SR, FRAME, hangover_ms=300), flags)
+    assert segments == [{"start_sec": 0.0, "end_sec": 0.75, "type": "speaking"}]
+
+def test_long_silence_closes_segment():
+    flags = [True] * 10 + [False] * 15 + [True] * 10
+    segments = feed(SegmentBuilder(SR, FRAME, hangover_ms=300), flags)
+    assert [(s["start_sec"], s["end_sec"]) for s in segments] == [(0.0, 0.3), (0.75, 1.05)]
+
+def test_segment_open_at_end_runs_to_end_of_audio():
+    segments = feed(SegmentBuilder(SR, FRAME), [False] * 3 + [True] * 4)
+    assert segments == [{"start_sec": 0.09, "end_sec": 0.21, "type": "speaking"}]
+
+def test_min_speech_drops_short_segments():
+    flags = [True] * 2 + [False] * 20 + [True] * 10 + [False] * 20
+    segments = feed(SegmentBuilder(SR, FRAME, hangover_ms=300, min_speech_ms=100), flags)
+    assert [(s["start_sec"], s["end_sec"]) for s in segments] == [(0.66, 0.96)]
+
+def test_detect_levels_matches_single_level_passes():
+    rng = np.random.default_rng(0)
+    t = np.arange(SR * 4) / SR
+    y = np.zeros_like(t)
+    for start, end in ((0.5, 1.2), (1.4, 2.0), (3.0, 3.6)):
+        mask = (t >= start) & (t < end)
+        y[mask] = 0.5 * np.sin(2 * np.pi * 220 * t[mask]) + 0.1 * rng.standard_normal(mask.sum())
+    by_level = detect_levels(y, SR, levels=(0, 2, 3))
+    for level, segments in by_level.items():
+        assert segments == list(iter_speaking_segments(y, SR, level))
+    assert by_level[2]
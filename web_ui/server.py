@@ -586,10 +586,10 @@ async def execute_pipeline(
     try:
         session_id = str(uuid.uuid4())[:8]
         
-        # Create session directory
+        # Create session directory (one per upload so concurrent runs never share inputs)
         backend_dir = _BASE_DIR.parent / "backend" / "backend"
-        temp_input_dir = backend_dir / "temp_input"
-        temp_input_dir.mkdir(exist_ok=True)
+        temp_input_dir = backend_dir / "uploads" / session_id
+        temp_input_dir.mkdir(parents=True, exist_ok=True)
         
         # Save uploaded files
         interviewer_path = temp_input_dir / f"{session_id}_interviewer_audio.wav"
@@ -661,7 +661,8 @@ async def run_pipeline_async(session_id, interviewer_audio, candidate_video, can
             "--video", candidate_video,
             "--candidate-audio", candidate_audio if candidate_audio else candidate_video,  # Use video if no separate audio
             "--interviewer-audio", interviewer_audio,
-            "--jd", jd_path
+            "--jd", jd_path,
+            "--run-id", session_id
         ]
         
         # Run pipeline
@@ -721,21 +722,12 @@ async def run_pipeline_async(session_id, interviewer_audio, candidate_video, can
         return_code = process.poll()
         
         if return_code == 0:
-            # Copy results to output directory
+            # Each run writes into results/NNN-<session_id>; backend/output points
+            # at whichever run finished last, so report this session's own directory
             results_dir = backend_dir / "results"
-            output_dir = backend_dir / "output"
-            output_dir.mkdir(exist_ok=True)
-            
-            # Find the latest session directory (or specific session_id)
-            session_dirs = sorted(results_dir.glob(f"*{session_id}*")) if results_dir.exists() else []
-            if not session_dirs:
-                # Try numbered directories
-                session_dirs = sorted(results_dir.glob("*-*")) if results_dir.exists() else []
-            
+            session_dirs = sorted(results_dir.glob(f"*-{session_id}")) if results_dir.exists() else []
             if session_dirs:
-                latest_dir = session_dirs[-1]
-                for file in latest_dir.glob("*.json"):
-                    shutil.copy(file, output_dir / file.name)
+                pipeline_status[session_id]["results_dir"] = str(session_dirs[-1])
             
             pipeline_status[session_id]["status"] = "completed"
             pipeline_status[session_id]["message"] = "Pipeline completed successfully"
@@ -748,6 +740,9 @@ async def run_pipeline_async(session_id, interviewer_audio, candidate_video, can
     except Exception as e:
         pipeline_status[session_id]["status"] = "failed"
         pipeline_status[session_id]["error"] = str(e)
+    finally:
+        # Results live in results/NNN-<session_id> (and the stage cache); the uploads are no longer needed
+        shutil.rmtree(Path(backend_dir) / "uploads" / session_id, ignore_errors=True)
 
 
 @app.get("/api/pipeline/status/{session_id}")